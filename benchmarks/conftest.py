@@ -0,0 +1,18 @@
+import numpy as np
+import pandas as pd
+import plotly
+import statsmodels
+import ts_app
+
+
+def pytest_benchmark_update_machine_info(config, machine_info):
+    """Record library versions with the results, to compare runs between
+    versions of the app.
+    """
+    machine_info["versions"] = {
+        "ts_app": ts_app.__version__,
+        "numpy": np.__version__,
+        "pandas": pd.__version__,
+        "plotly": plotly.__version__,
+        "statsmodels": statsmodels.__version__,
+    }
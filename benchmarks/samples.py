@@ -0,0 +1,10 @@
+import numpy as np
+import pandas as pd
+
+
+def make_series(size: int, freq: str = "h") -> pd.Series:
+    """Get a reproducible random walk with a regular DatetimeIndex."""
+    return pd.Series(
+        np.random.default_rng(0).standard_normal(size).cumsum(),
+        index=pd.date_range("2000-01-01", periods=size, freq=freq),
+    )
@@ -0,0 +1,65 @@
+"""Compare streamed exports of a model's outputs, chunk by chunk, with
+encoding the whole table at once, and time saving a model bundle.
+
+Run with `pytest benchmarks/`. Export sizes and peak memory are recorded in
+each benchmark's `extra_info`. Parquet and Arrow exports need pyarrow.
+"""
+import tracemalloc
+
+import pandas as pd
+import pytest
+from ts_app.export import dump_model, export_chunks, export_frames
+from ts_app.ts_functions import get_arima_fit
+
+from benchmarks.samples import make_series
+
+
+def exported_fit(size: int):
+    """Get a fit whose predictions cover `size` periods. The model is
+    fitted on the latest values only, since only the table's size matters.
+    """
+    data = make_series(size)
+    fit = get_arima_fit(data.iloc[-1000:])
+    return data, fit._replace(predictions=data)
+
+
+def measure(benchmark, export) -> None:
+    """Record an export's size and peak memory, then time it."""
+    tracemalloc.start()
+    benchmark.extra_info["bytes"] = export()
+    benchmark.extra_info["peak_bytes"] = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    benchmark.pedantic(export, rounds=3)
+
+
+@pytest.mark.parametrize("size", [1_000, 100_000, 1_000_000])
+@pytest.mark.parametrize("export_format", ["csv", "parquet", "arrow"])
+def test_streamed_export(benchmark, export_format, size):
+    if export_format != "csv":
+        pytest.importorskip("pyarrow")
+    data, fit = exported_fit(size)
+
+    def export():
+        chunks = export_chunks(export_frames(fit, data), export_format)
+        return sum(len(chunk) for chunk in chunks)
+
+    measure(benchmark, export)
+
+
+@pytest.mark.parametrize("size", [1_000, 100_000, 1_000_000])
+def test_whole_csv_export(benchmark, size):
+    data, fit = exported_fit(size)
+
+    def export():
+        rows = size + len(fit.forecast)
+        table = pd.concat(export_frames(fit, data, rows=rows))
+        return len(table.to_csv().encode())
+
+    measure(benchmark, export)
+
+
+def test_dump_model(benchmark):
+    _, fit = exported_fit(1_000)
+
+    bundle = benchmark(dump_model, fit, (1, 0, 1))
+    benchmark.extra_info["bytes"] = len(bundle)
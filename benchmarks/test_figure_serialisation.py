@@ -0,0 +1,34 @@
+"""Compare figure serialisation as plain JSON lists with binary-encoded
+WebGL figures. Figures are built outside the timed section.
+
+Run with `pytest benchmarks/`. Serialised sizes are recorded in each
+benchmark's `extra_info`.
+"""
+import plotly.io as pio
+import pytest
+from ts_app.plotting import plot_forecast, serialise_figure
+
+from benchmarks.samples import make_series
+
+
+@pytest.mark.parametrize("size", [1_000, 100_000, 1_000_000])
+def test_json_lists(benchmark, size):
+    data = make_series(size, freq="min")
+
+    fig = plot_forecast(data, data, data, "", "", max_points=None, webgl=False)
+
+    result = benchmark.pedantic(fig.to_json, rounds=3)
+    benchmark.extra_info["bytes"] = len(result)
+
+
+@pytest.mark.parametrize("size", [1_000, 100_000, 1_000_000])
+def test_binary_webgl(benchmark, size):
+    data = make_series(size, freq="min")
+
+    fig = plot_forecast(data, data, data, "", "", max_points=None, webgl=True)
+
+    def serialise():
+        return pio.to_json(serialise_figure(fig, binary=True), validate=False)
+
+    result = benchmark.pedantic(serialise, rounds=3)
+    benchmark.extra_info["bytes"] = len(result)
@@ -0,0 +1,114 @@
+"""Time reading and validating uploaded CSV and Excel files. The peak
+memory allocated while reading is recorded in each upload benchmark's
+`extra_info`.
+"""
+import io
+import tracemalloc
+from base64 import b64encode
+
+import pandas as pd
+import pytest
+from ts_app.dates import infer_frequency, parse_dates
+from ts_app.file_upload import process_upload, read_upload
+
+from benchmarks.samples import make_series
+
+MIME_TYPES = {
+    "csv": "text/csv",
+    "xlsx": (
+        "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
+    ),
+}
+
+
+# Date formats with a fast path in pandas (ISO 8601) and without one
+DATE_FORMATS = ["%Y-%m-%d %H:%M:%S", "%d/%m/%Y %H:%M"]
+
+
+def _as_upload(
+    size: int, extension: str, date_format: str = DATE_FORMATS[0]
+) -> str:
+    """Encode a sample file as a data-URL, as given by `dcc.Upload`."""
+    frame = make_series(size).to_frame("value")
+    if extension == "csv":
+        content = frame.to_csv(date_format=date_format).encode()
+    else:
+        buffer = io.BytesIO()
+        frame.to_excel(buffer)
+        content = buffer.getvalue()
+    encoded = b64encode(content).decode()
+    return f"data:{MIME_TYPES[extension]};base64,{encoded}"
+
+
+def _record_peak_memory(benchmark, contents: str, filename: str) -> None:
+    """Read an upload once, recording the peak memory allocated."""
+    tracemalloc.start()
+    read_upload(contents, filename)
+    benchmark.extra_info["peak_bytes"] = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+
+
+@pytest.mark.parametrize(
+    "extension, size",
+    [
+        ("csv", 1_000),
+        ("csv", 100_000),
+        ("csv", 1_000_000),
+        ("xlsx", 1_000),
+        ("xlsx", 10_000),
+    ],
+)
+def test_read_upload(benchmark, extension, size):
+    contents = _as_upload(size, extension)
+    _record_peak_memory(benchmark, contents, f"sample.{extension}")
+
+    result = benchmark.pedantic(
+        read_upload, (contents, f"sample.{extension}"), rounds=3
+    )
+    assert result.error is None
+
+
+@pytest.mark.parametrize("date_format", DATE_FORMATS)
+def test_read_large_csv_upload(benchmark, date_format):
+    contents = _as_upload(1_000_000, "csv", date_format)
+    _record_peak_memory(benchmark, contents, "sample.csv")
+
+    result = benchmark.pedantic(
+        read_upload, (contents, "sample.csv"), rounds=3
+    )
+    assert result.error is None
+
+
+@pytest.mark.parametrize("size", [1_000, 100_000, 1_000_000])
+def test_process_upload(benchmark, size):
+    frame = make_series(size).to_frame("value")
+    # As read from a file
+    frame.index = frame.index.strftime(DATE_FORMATS[0])
+
+    def setup():
+        return (frame.copy(),), {}
+
+    benchmark.pedantic(process_upload, setup=setup, rounds=3)
+
+
+@pytest.mark.parametrize("date_format", DATE_FORMATS)
+@pytest.mark.parametrize("parser", ["parse_dates", "to_datetime"])
+def test_parse_dates(benchmark, parser, date_format):
+    dates = make_series(1_000_000).index
+    strings = pd.Index(dates.strftime(date_format), name="date")
+    if parser == "parse_dates":
+        index, _ = benchmark(parse_dates, strings)
+    else:
+        # What uploads did before: pandas guesses the format from the first
+        # value, so day-first dates need telling apart
+        index = benchmark(
+            pd.to_datetime, strings, dayfirst=date_format.startswith("%d")
+        )
+    assert index.equals(dates.rename("date").as_unit("ns"))
+
+
+@pytest.mark.parametrize("infer", [infer_frequency, pd.infer_freq])
+def test_infer_frequency(benchmark, infer):
+    dates = pd.DatetimeIndex(make_series(1_000_000).index.to_numpy())
+
+    assert benchmark(infer, dates) == "h"
@@ -0,0 +1,40 @@
+"""Time the model callback end to end: loading the dataset, fitting the
+model in a worker process, plotting and serialising the figure.
+"""
+import pytest
+from ts_app import cache
+from ts_app.cache import LRUCache
+from ts_app.components import modelling
+from ts_app.datasets import DATASETS
+from ts_app.jobs import JOB_MANAGER
+from ts_app.ts_functions import FORECAST_HORIZON
+
+from benchmarks.samples import make_series
+
+
+@pytest.fixture(scope="module", autouse=True)
+def shutdown_workers():
+    yield
+    JOB_MANAGER.shutdown()
+
+
+@pytest.mark.parametrize("cached", [False, True], ids=["fit", "cached"])
+@pytest.mark.parametrize("size", [100, 10_000])
+def test_model_and_predict(benchmark, monkeypatch, size, cached):
+    sample = {
+        "filename": "sample",
+        "dataset_id": DATASETS.put(make_series(size)),
+    }
+    args = (
+        (1, 1, 1, "/sample", sample, None, FORECAST_HORIZON)
+        + (0, 0, 0, 0, "benchmark")
+    )
+
+    def setup():
+        if not cached:
+            monkeypatch.setattr(modelling, "FIT_CACHE", LRUCache())
+            monkeypatch.setattr(cache, "FIT_CACHE", modelling.FIT_CACHE)
+        return args, {}
+
+    modelling.model_and_predict(*args)  # start the worker processes
+    benchmark.pedantic(modelling.model_and_predict, setup=setup, rounds=3)
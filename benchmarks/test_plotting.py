@@ -0,0 +1,38 @@
+"""Time building and serialising the component and forecast plots."""
+import plotly.io as pio
+import pytest
+from ts_app.plotting import plot_forecast, plot_ts_components, serialise_figure
+
+from benchmarks.samples import make_series
+
+SIZES = [1_000, 100_000, 1_000_000]
+
+
+def _to_json(fig):
+    return pio.to_json(serialise_figure(fig), validate=False)
+
+
+@pytest.mark.parametrize("size", SIZES)
+def test_plot_ts_components(benchmark, size):
+    data = make_series(size)
+
+    fig = benchmark(plot_ts_components, data, data, data, "sample")
+    benchmark.extra_info["bytes"] = len(_to_json(fig))
+
+
+@pytest.mark.parametrize("size", SIZES)
+def test_plot_forecast(benchmark, size):
+    data = make_series(size)
+
+    fig = benchmark(plot_forecast, data, data, data, "ARIMA", "sample")
+    benchmark.extra_info["bytes"] = len(_to_json(fig))
+
+
+@pytest.mark.parametrize("size", SIZES)
+def test_plot_and_serialise(benchmark, size):
+    data = make_series(size)
+
+    def plot_and_serialise():
+        return _to_json(plot_forecast(data, data, data, "ARIMA", "sample"))
+
+    benchmark.extra_info["bytes"] = len(benchmark(plot_and_serialise))
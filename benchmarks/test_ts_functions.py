@@ -0,0 +1,218 @@
+"""Time sample creation, exact and conditional sum-of-squares model fitting
+across the order grid, prediction intervals and forecast extension, seasonal
+period detection and seasonal models, the seasonal decomposition (by
+moving averages, STL and MSTL, with their peak memory in the benchmark's
+`extra_info`), backtesting and the diagnostics panel's correlograms and
+stationarity tests.
+"""
+import tracemalloc
+from functools import partial
+from itertools import product
+
+import numpy as np
+import pandas as pd
+import pytest
+from statsmodels.tsa.api import seasonal_decompose
+from statsmodels.tsa.arima.model import ARIMA
+from statsmodels.tsa.stattools import acf
+from ts_app.samples import SampleBank
+from ts_app.ts_functions import (
+    autocorrelation,
+    backtest,
+    create_arma_sample,
+    create_arma_samples,
+    decompose,
+    decomposition_periods,
+    detect_period,
+    diagnose,
+    extend_forecast,
+    fit_arima_model,
+    forecast_state,
+    get_arima_fit,
+    normal_intervals,
+    propagate_forecast,
+    simulate_forecast_errors,
+)
+
+from benchmarks.samples import make_series
+
+SAMPLE = create_arma_sample(size=500)
+
+
+# Daily samples can't go beyond the year 2262
+@pytest.mark.parametrize("size", [100, 10_000, 50_000])
+def test_create_arma_sample(benchmark, size):
+    benchmark(create_arma_sample, 2, 2, size)
+
+
+@pytest.mark.parametrize("batched", [False, True], ids=["loop", "batch"])
+def test_create_64_samples(benchmark, batched):
+    def create():
+        if batched:
+            return create_arma_samples(2, 2, 365, seeds=range(64))
+        return [create_arma_sample(2, 2, 365, seed) for seed in range(64)]
+
+    benchmark(create)
+
+
+def test_sample_bank_lookup(benchmark):
+    bank = SampleBank()
+    bank.precompute(range(1, 5), range(1, 5), 365)
+
+    benchmark(bank.get, 2, 2, 365, 3)
+
+
+@pytest.mark.parametrize(
+    "order",
+    list(product(range(3), range(2), range(3))),
+    ids=lambda order: "-".join(map(str, order)),
+)
+@pytest.mark.parametrize("method", ["mle", "css"])
+def test_fit_arima_model(benchmark, order, method):
+    benchmark.pedantic(
+        fit_arima_model, (SAMPLE, *order, method), rounds=3
+    )
+
+
+@pytest.mark.parametrize("passes", ["separate", "one"])
+def test_prediction_intervals(benchmark, passes):
+    """Get in-sample predictions, a forecast, and 95% and 80% intervals from
+    fitted results: with a pass each for `predict`, `get_forecast` and
+    `conf_int`, or from the filter's output and its last predicted state.
+    """
+    data = create_arma_sample(size=20_000, seed=0)
+    results = ARIMA(data, order=(2, 0, 1)).fit()
+    start, n = 14_000, len(data)
+
+    def separate():
+        results.predict(start=start, end=n)
+        forecast = results.get_forecast(15)
+        return [forecast.conf_int(alpha=alpha) for alpha in (0.05, 0.2)]
+
+    def one():
+        results.predict(start=start, end=n - 1)
+        state = forecast_state(results)
+        means, variances, _ = propagate_forecast(state, 15)
+        return normal_intervals(pd.Series(means), variances)
+
+    benchmark(separate if passes == "separate" else one)
+
+
+@pytest.mark.parametrize("method", ["statsmodels", "vectorised"])
+def test_simulate_forecast_paths(benchmark, method):
+    """Simulate 1000 paths of a 100-period forecast, for a fan chart."""
+    data = create_arma_sample(size=2000, seed=0)
+    results = ARIMA(data, order=(2, 0, 1)).fit()
+    if method == "statsmodels":
+        benchmark.pedantic(
+            results.simulate,
+            (100,),
+            {"repetitions": 1000, "anchor": "end"},
+            rounds=3,
+        )
+    else:
+        benchmark(simulate_forecast_errors, forecast_state(results), 100, 1000)
+
+
+@pytest.mark.parametrize("method", ["refit", "extend"])
+def test_extend_horizon(benchmark, method):
+    """Lengthen a 15-period forecast to 5000 periods: by fitting again, or
+    extending the forecast from its last state.
+    """
+    data = create_arma_sample(size=2000, seed=0)
+    fit = get_arima_fit(data, 2, 0, 1)
+    if method == "refit":
+        benchmark.pedantic(
+            get_arima_fit, (data, 2, 0, 1), {"horizon": 5000}, rounds=3
+        )
+    else:
+        benchmark(extend_forecast, fit, 5000)
+
+
+def daily_pattern(size: int) -> pd.Series:
+    """Get an hourly random walk with a daily pattern."""
+    data = make_series(size)
+    return data + 3 * np.sin(2 * np.pi * np.arange(size) / 24)
+
+
+@pytest.mark.parametrize("size", [100, 10_000, 1_000_000])
+def test_detect_period(benchmark, size):
+    benchmark(detect_period, daily_pattern(size).to_numpy())
+
+
+@pytest.mark.parametrize("method", ["sarima", "fourier"])
+def test_fit_long_seasonal_period(benchmark, method):
+    """Fit a seasonal model of hourly data with a daily period: with
+    seasonal ARIMA terms, or with Fourier terms in their place.
+    """
+    data = daily_pattern(2000)
+    if method == "sarima":
+        model = ARIMA(data, order=(1, 0, 1), seasonal_order=(1, 0, 1, 24))
+        benchmark.pedantic(model.fit, rounds=1)
+    else:
+        benchmark.pedantic(
+            get_arima_fit,
+            (data, 1, 0, 1),
+            {"seasonal_order": (1, 0, 1, 24)},
+            rounds=3,
+        )
+
+
+@pytest.mark.parametrize("size", [100, 10_000, 1_000_000])
+def test_seasonal_decompose(benchmark, size):
+    benchmark(seasonal_decompose, make_series(size))
+
+
+@pytest.mark.parametrize("size", [1_000, 100_000, 1_000_000])
+@pytest.mark.parametrize("method", ["classical", "stl", "mstl"])
+def test_decomposition_methods(benchmark, method, size):
+    """Decompose hourly data by each method, as the dashboard does. Long
+    series are decomposed by (M)STL at a coarser resolution.
+    """
+    data = daily_pattern(size)
+    if method == "classical":
+        run = partial(seasonal_decompose, data, period=24)
+    else:
+        run = partial(decompose, data, decomposition_periods(data, method, 24))
+
+    tracemalloc.start()
+    run()
+    benchmark.extra_info["peak_bytes"] = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    benchmark.pedantic(run, rounds=3)
+
+
+@pytest.mark.parametrize("window", [None, 5_000], ids=["expanding", "rolling"])
+def test_backtest(benchmark, window):
+    data = create_arma_sample(size=20_000, seed=0)
+    params = get_arima_fit(data.iloc[:19_000]).params
+
+    benchmark.pedantic(
+        backtest,
+        (data,),
+        {"folds": 10, "window": window, "params": params},
+        rounds=3,
+    )
+
+
+def test_refit_one_fold(benchmark):
+    """Refit the model for a single fold, for comparison with
+    `test_backtest`, which covers 10 folds without refitting.
+    """
+    data = create_arma_sample(size=20_000, seed=0)
+    benchmark.pedantic(get_arima_fit, (data.iloc[:19_860],), rounds=1)
+
+
+@pytest.mark.parametrize("size", [100, 10_000, 1_000_000])
+def test_diagnose(benchmark, size):
+    data = make_series(size)
+    benchmark.pedantic(diagnose, (data,), rounds=3)
+
+
+@pytest.mark.parametrize("method", ["dot", "fft"])
+def test_autocorrelation(benchmark, method):
+    values = make_series(1_000_000).to_numpy()
+    if method == "dot":
+        benchmark(autocorrelation, values, 40)
+    else:
+        benchmark(acf, values, nlags=40, fft=True)
@@ -0,0 +1,47 @@
+"""Compare default and warm-started ARIMA fits: after the AR order changes
+by one step, and after new observations are appended to the data.
+
+Run with `pytest benchmarks/`. Optimizer iterations are recorded in each
+benchmark's `extra_info`.
+"""
+import pytest
+from statsmodels.api import tsa
+from ts_app.ts_functions import create_arma_sample, get_arima_fit
+
+DATA = create_arma_sample(ar_order=2, size=5000)
+EARLIER = DATA.iloc[:4900]
+
+
+def _iterations(data, order, start_params=None):
+    model = tsa.arima.ARIMA(data, order=order)
+    if start_params is not None:
+        start_params = start_params.reindex(model.param_names).fillna(0)
+    return model.fit(start_params=start_params).mle_retvals["iterations"]
+
+
+@pytest.mark.parametrize("warm", [False, True], ids=["default", "warm"])
+def test_order_change(benchmark, warm):
+    start_params = get_arima_fit(DATA, 2, 0, 1).params if warm else None
+
+    benchmark.pedantic(
+        get_arima_fit, (DATA, 3, 0, 1, start_params), rounds=3
+    )
+    benchmark.extra_info["iterations"] = _iterations(
+        DATA, (3, 0, 1), start_params
+    )
+
+
+@pytest.mark.parametrize("mode", ["default", "warm", "append"])
+def test_appended_data(benchmark, mode):
+    start_params = None
+    if mode != "default":
+        start_params = get_arima_fit(EARLIER, 2, 0, 1).params
+
+    benchmark.pedantic(
+        get_arima_fit,
+        (DATA, 2, 0, 1, start_params, mode != "append"),
+        rounds=3,
+    )
+    benchmark.extra_info["iterations"] = (
+        0 if mode == "append" else _iterations(DATA, (2, 0, 1), start_params)
+    )
@@ -0,0 +1,110 @@
+import io
+import json
+
+import numpy as np
+import pandas as pd
+import pytest
+from ts_app.api import (
+    ARROW_TYPE,
+    CSV_TYPE,
+    JSON_TYPE,
+    RequestError,
+    encode_series,
+    parse_decomposition,
+    parse_order,
+    parse_seasonal_order,
+    parse_series,
+)
+
+frame = pd.DataFrame(
+    {"a": np.arange(40.0), "label": "text", "b": np.ones(40)},
+    index=pd.date_range("2020-01-01", periods=40, name="date"),
+)
+
+
+def test_csv_columns_share_one_index():
+    series = parse_series(frame.to_csv().encode(), f"{CSV_TYPE}; a=b")
+
+    assert list(series) == ["a", "b"]
+    assert series["a"].index is series["b"].index
+    assert series["a"].index.freqstr == "D"
+
+
+def test_json_series():
+    body = {
+        "series": {
+            "a": {
+                "index": frame.index.strftime("%Y-%m-%d").tolist(),
+                "values": frame["a"].tolist(),
+            }
+        }
+    }
+    series = parse_series(json.dumps(body).encode(), JSON_TYPE)
+
+    pd.testing.assert_series_equal(
+        series["a"], frame["a"], check_names=False, check_freq=False
+    )
+
+
+def test_invalid_requests():
+    with pytest.raises(RequestError) as unsupported:
+        parse_series(b"", "text/plain")
+    with pytest.raises(RequestError) as short:
+        parse_series(frame.head(10).to_csv().encode(), CSV_TYPE)
+    with pytest.raises(RequestError):
+        parse_series(b'{"values": []}', JSON_TYPE)
+    with pytest.raises(RequestError):
+        parse_series(b'{"series": {}}', JSON_TYPE)
+    with pytest.raises(RequestError):
+        parse_order({"ar": "-1"})
+
+    assert unsupported.value.status == 415
+    assert "minimum is set at 32" in str(short.value)
+    assert parse_order({"ma": "2"}) == (1, 0, 2)
+
+
+def test_seasonal_order_parameters():
+    assert parse_seasonal_order({}) == (0, 0, 0, 0)
+    assert parse_seasonal_order({"period": "12"}) == (0, 0, 0, 0)
+    assert parse_seasonal_order({"sar": "1", "period": "12"}) == (1, 0, 0, 12)
+    # Longer periods have the same Fourier terms, whatever the orders
+    assert parse_seasonal_order({"sma": "2", "period": "24"}) == (1, 0, 0, 24)
+    for args in (
+        {"sma": "3"},
+        {"sdiff": "x"},
+        {"period": "-7"},
+        {"sdiff": "1", "period": "24"},
+    ):
+        with pytest.raises(RequestError):
+            parse_seasonal_order(args)
+
+
+def test_decomposition_parameter():
+    assert parse_decomposition({}) == "classical"
+    assert parse_decomposition({"decompose": "0"}) is None
+    assert parse_decomposition({"decompose": "MSTL"}) == "mstl"
+    with pytest.raises(RequestError):
+        parse_decomposition({"decompose": "x13"})
+
+
+def test_arrow_series():
+    pa = pytest.importorskip("pyarrow")
+    sink = io.BytesIO()
+    table = pa.Table.from_pandas(frame[["a", "b"]])
+    with pa.ipc.new_stream(sink, table.schema) as writer:
+        writer.write_table(table)
+
+    series = parse_series(sink.getvalue(), ARROW_TYPE)
+    assert list(series) == ["a", "b"]
+    with pytest.raises(RequestError) as malformed:
+        parse_series(sink.getvalue()[:-64], ARROW_TYPE)
+    assert malformed.value.status == 400
+
+
+def test_encoded_series_are_json_safe():
+    data = pd.Series([1.0, np.nan], index=frame.index[:2])
+
+    assert encode_series(data) == {
+        "index": ["2020-01-01T00:00:00", "2020-01-02T00:00:00"],
+        "values": [1.0, None],
+    }
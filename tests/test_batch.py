@@ -0,0 +1,75 @@
+import time
+
+import pandas as pd
+import pytest
+from ts_app.cache import FIT_CACHE, cached_arima_fits, fit_key
+from ts_app.components.batch import (
+    download_batch_forecast,
+    run_batch_forecast,
+    select_batch_column,
+)
+from ts_app.datasets import DATASETS
+from ts_app.jobs import JOB_MANAGER
+from ts_app.file_upload import upload_info
+from ts_app.ts_functions import create_arma_sample
+
+frame = pd.DataFrame(
+    {
+        "a": create_arma_sample(size=120, seed=0),
+        "b": create_arma_sample(size=120, seed=1),
+        "constant": 1.0,
+    }
+)
+upload = upload_info("test.csv", DATASETS.put_columns(frame))
+
+
+def test_columns_are_fitted_and_cached():
+    columns = {"a": frame["a"], "b": frame["b"]}
+    fits = cached_arima_fits(columns, 1, 0, 0, JOB_MANAGER.executor)
+
+    assert list(fits) == ["a", "b"]
+    assert FIT_CACHE.get(fit_key(frame["b"], 1, 0, 0)) is fits["b"]
+
+
+def test_timed_out_fits_are_reported():
+    columns = {"long": create_arma_sample(size=5000, seed=2)}
+    expired = []
+    fits = cached_arima_fits(
+        columns,
+        2,
+        0,
+        2,
+        JOB_MANAGER.executor,
+        timeout=0.001,
+        on_timeout=lambda: expired.append(True),
+    )
+
+    assert fits == {"long": None}
+    assert expired == [True]
+
+
+def test_batch_summary_and_selection():
+    completed = JOB_MANAGER.stats["completed"]
+    rows, message = run_batch_forecast(1, 1, 0, 1, upload, 15, "session")
+
+    assert [row["column"] for row in rows] == ["a", "b", "constant"]
+    assert "of 3 columns" in message
+    time.sleep(0.1)  # allow the done-callbacks to record the jobs
+    assert JOB_MANAGER.stats["completed"] == completed + 3
+
+    selected = select_batch_column([0], rows, upload)
+    assert selected["column"] == "a"
+    assert DATASETS.get(selected["dataset_id"]).equals(frame["a"])
+
+
+def test_combined_download_reuses_fits(monkeypatch):
+    run_batch_forecast(1, 2, 0, 0, upload)
+    monkeypatch.setattr(
+        "ts_app.cache.get_arima_fit",
+        lambda *args: pytest.fail("refitted"),
+    )
+    download = download_batch_forecast(1, 2, 0, 0, upload)
+
+    assert download["filename"] == "test-forecasts.csv"
+    header = download["content"].splitlines()[0]
+    assert header.startswith("date,a,b")
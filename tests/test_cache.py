@@ -0,0 +1,118 @@
+import pandas as pd
+import pytest
+from ts_app import cache
+from ts_app.cache import (
+    LRUCache,
+    cached_arima_fit,
+    column_keys,
+    data_key,
+    warm_start,
+)
+from ts_app.ts_functions import create_arma_sample
+
+
+def test_data_key_tracks_values_and_index():
+    data = create_arma_sample()
+
+    assert data_key(data) == data_key(data.copy())
+    assert data_key(data) != data_key(data + 1)
+    assert data_key(data) != data_key(data.shift(1, freq="D"))
+
+
+def test_column_keys_match_data_keys():
+    data = create_arma_sample()
+    frame = data.to_frame("a").assign(b=data + 1)
+
+    assert column_keys(frame) == [data_key(data), data_key(data + 1)]
+
+
+def test_lru_eviction_and_counters():
+    lru = LRUCache(max_bytes=2500)
+    for key in "abc":
+        lru.put(key, pd.Series(range(100), dtype="float64"))  # ~900B each
+
+    assert lru.get("a") is None  # evicted, as the least recently used
+    assert lru.get("c") is not None
+    assert lru.stats["hits"] == 1
+    assert lru.stats["misses"] == 1
+    assert lru.current_bytes <= lru.max_bytes
+
+
+def test_lru_byte_total_follows_replacements():
+    lru = LRUCache()
+    lru.put("a", pd.Series(range(100), dtype="float64"))
+    lru.put("a", pd.Series(range(10), dtype="float64"))
+    lru.put("b", pd.Series(range(10), dtype="float64"))
+
+    assert lru.current_bytes == sum(map(cache._sizeof, lru._entries.values()))
+    assert "a" in lru and "c" not in lru
+    lru.clear()
+    assert lru.current_bytes == 0
+
+
+def test_persisted_entries_survive_restarts(tmp_path):
+    LRUCache(directory=tmp_path).put("key", pd.Series([1.0, 2.0]))
+    restarted = LRUCache(directory=tmp_path)
+
+    assert restarted.get("key").tolist() == [1.0, 2.0]
+    assert restarted.stats["hits"] == 1
+
+
+def test_revisited_orders_are_not_refitted(monkeypatch):
+    monkeypatch.setattr(cache, "FIT_CACHE", LRUCache())
+    data = create_arma_sample()
+
+    first = cached_arima_fit(data, 1, 0, 1)
+    cached_arima_fit(data, 2, 0, 1)
+    revisit = cached_arima_fit(data, 1, 0, 1)
+
+    assert revisit is first
+    assert cache.FIT_CACHE.stats["misses"] == 2
+    assert cache.FIT_CACHE.stats["hits"] == 1
+    assert list(first.params.index) == ["const", "ar.L1", "ma.L1", "sigma2"]
+
+
+def test_horizon_changes_reuse_the_cached_fit(monkeypatch):
+    monkeypatch.setattr(cache, "FIT_CACHE", LRUCache())
+    data = create_arma_sample()
+    cached_arima_fit(data, 1, 0, 1)
+    monkeypatch.setattr(
+        cache, "get_arima_fit", lambda *args, **kwargs: pytest.fail()
+    )
+
+    assert len(cached_arima_fit(data, 1, 0, 1, horizon=500).forecast) == 500
+    assert len(cached_arima_fit(data, 1, 0, 1, horizon=10).forecast) == 10
+    stored = cache.FIT_CACHE.get(cache.fit_key(data, 1, 0, 1))
+    assert len(stored.forecast) == 500
+
+
+def test_seasonal_orders_have_their_own_keys(monkeypatch):
+    monkeypatch.setattr(cache, "FIT_CACHE", LRUCache())
+    data = create_arma_sample(size=200)
+    plain = cached_arima_fit(data, 1, 0, 1)
+
+    # Without seasonal terms, the key is the non-seasonal model's
+    assert cache.fit_key(data, 1, 0, 1, (0, 0, 0, 7)) == cache.fit_key(data)
+    assert cache.fit_key(data, 1, 0, 1, (1, 0, 0, 7)).endswith("-s1-0-0-7")
+    # The non-seasonal fit is a starting point for a seasonal one
+    start_params, _ = warm_start(data, 1, 0, 1, (1, 0, 0, 7))
+    assert start_params is plain.params
+
+    seasonal = cached_arima_fit(data, 1, 0, 1, seasonal_order=(1, 0, 0, 7))
+    assert "ar.S.L7" in seasonal.params
+    assert cache.FIT_CACHE.get(cache.fit_key(data)) is plain
+
+
+def test_warm_start_from_neighbouring_order_and_earlier_data(monkeypatch):
+    monkeypatch.setattr(cache, "FIT_CACHE", LRUCache())
+    data = create_arma_sample(size=200)
+
+    assert warm_start(data.iloc[:190], 2, 0, 1) == (None, True)
+    first = cached_arima_fit(data.iloc[:190], 1, 0, 1)
+
+    start_params, refit = warm_start(data.iloc[:190], 2, 0, 1)
+    assert start_params is first.params and refit
+
+    start_params, refit = warm_start(data, 1, 0, 1)  # 10 new observations
+    assert start_params is first.params and not refit
+    assert cache.FIT_CACHE.stats["misses"] == 1
@@ -11,6 +11,12 @@ def test_default_args(monkeypatch):
     assert args.host == "localhost"
     assert args.port == 8000
     assert args.no_browser is False
+    assert args.cache_dir is None
+    assert args.fit_timeout == 60
+    assert args.profile == "off"
+    assert args.workers == 1
+    assert args.threads == 4
+    assert args.warm_up is False
 
 
 def test_supplied_args(monkeypatch):
@@ -18,10 +24,13 @@ def test_supplied_args(monkeypatch):
     monkeypatch.setattr(
         sys,
         "argv",
-        "ts_app -p 25000 --host https://example.com --no-browser".split(),
+        "ts_app -p 25000 --host https://example.com --no-browser"
+        " --workers 4 --threads 8".split(),
     )
     args = process_cli_args()
 
     assert args.host == "https://example.com"
     assert args.port == 25000
     assert args.no_browser is True
+    assert args.workers == 4
+    assert args.threads == 8
@@ -0,0 +1,119 @@
+import os
+import time
+
+import numpy as np
+
+from ts_app.datasets import DatasetStore
+from ts_app.ts_functions import create_arma_sample
+
+data = create_arma_sample()
+
+
+def test_dataset_round_trip():
+    store = DatasetStore()
+    dataset_id = store.put(data)
+    retrieved = store.get(dataset_id)
+
+    assert dataset_id == store.put(data.copy())
+    assert retrieved.equals(data)
+    assert retrieved.index.freqstr == "D"
+
+
+def test_columns_share_their_dates():
+    store = DatasetStore()
+    frame = data.to_frame("a").assign(b=data * 2)
+    ids = store.put_columns(frame)
+
+    assert list(ids) == ["a", "b"]
+    assert store.get(ids["b"]).equals(frame["b"])
+    (_, dates_a, _), (_, dates_b, _) = store._entries.values()
+    assert np.shares_memory(dates_a, dates_b)
+    assert store.current_bytes == 3 * data.nbytes  # the dates count once
+    store._remove(ids["a"])
+    assert store.current_bytes == 2 * data.nbytes
+
+
+def test_unknown_datasets():
+    assert DatasetStore().get("unknown") is None
+    assert DatasetStore().get(None) is None
+
+
+def test_expired_datasets_are_evicted():
+    store = DatasetStore(ttl=0.05)
+    dataset_id = store.put(data)
+    time.sleep(0.1)
+
+    assert store.get(dataset_id) is None
+    assert len(store) == 0
+
+
+def test_pinned_datasets_are_kept():
+    store = DatasetStore(max_bytes=2000, ttl=0.05)
+    pinned_id = store.put(data, pinned=True)
+    store.put(data + 1)
+    time.sleep(0.1)
+    latest_id = store.put(data + 2)
+
+    assert pinned_id in store
+    assert store.get(pinned_id).equals(data)
+    assert store.get(latest_id) is not None
+    assert len(store) == 2
+
+
+def test_expired_saved_datasets_are_deleted(tmp_path):
+    store = DatasetStore(ttl=0.05, directory=tmp_path)
+    expired_id = DatasetStore(directory=tmp_path).put(data)
+    (tmp_path / "leftover.123.tmp").write_bytes(b"")
+    time.sleep(0.1)
+    kept_id = store.put(data + 1)
+    store.evict_expired()
+
+    assert sorted(path.name for path in tmp_path.iterdir()) == [
+        f"{kept_id}.npz"
+    ]
+    assert expired_id not in store
+
+
+def test_failed_saves_leave_no_temporary_files(tmp_path, monkeypatch):
+    def fail(*args, **kwargs):
+        raise OSError("disk full")
+
+    monkeypatch.setattr(os, "replace", fail)
+    store = DatasetStore(directory=tmp_path)
+    dataset_id = store.put(data)
+
+    assert list(tmp_path.iterdir()) == []
+    assert store.get(dataset_id).equals(data)  # still held in memory
+
+
+def test_membership_has_no_side_effects(tmp_path):
+    # Room for two series' values, and the dates they share
+    store = DatasetStore(max_bytes=2400, directory=tmp_path)
+    first_id = store.put(data)
+    second_id = store.put(data + 1)
+    saved_id = DatasetStore(directory=tmp_path).put(data + 2)
+
+    assert first_id in store and saved_id in store
+    assert "unknown" not in store and None not in store
+    assert saved_id not in store._entries  # not loaded
+    store.put(data + 3)
+    assert first_id not in store._entries  # still the least recently used
+    assert second_id in store._entries
+
+
+def test_memory_limit():
+    store = DatasetStore(max_bytes=2000)  # each sample takes 1600 bytes
+    first_id = store.put(data)
+    second_id = store.put(data + 1)
+
+    assert store.get(first_id) is None
+    assert store.get(second_id) is not None
+    assert store.current_bytes == 1600
+
+
+def test_saved_datasets_are_shared(tmp_path):
+    dataset_id = DatasetStore(directory=tmp_path).put(data)
+    retrieved = DatasetStore(directory=tmp_path).get(dataset_id)
+
+    assert retrieved.equals(data)
+    assert retrieved.index.freqstr == "D"
@@ -0,0 +1,69 @@
+import pandas as pd
+import pytest
+
+from ts_app.dates import (
+    detect_date_formats,
+    infer_frequency,
+    parse_dates,
+)
+
+hours = pd.date_range("2020-01-01", periods=1000, freq="h", name="date")
+
+
+@pytest.mark.parametrize(
+    "date_format",
+    [
+        "%d/%m/%Y %H:%M",
+        "%m/%d/%Y %H:%M:%S",
+        "%d.%m.%Y %H:%M",
+        "%Y/%m/%d %H:%M",
+        "%Y-%m-%d %H:%M:%S",
+        "%Y-%m-%dT%H:%M:%S",
+        "%d %b %Y %H:%M",
+    ],
+)
+def test_dates_are_parsed_with_the_detected_format(date_format):
+    strings = pd.Index(hours.strftime(date_format), name="date")
+    index, detected = parse_dates(strings)
+
+    assert detected == date_format
+    assert index.equals(hours)
+
+
+def test_day_first_dates_are_detected_from_the_whole_column():
+    # Only dates after the 12th of a month show that the day comes first
+    strings = pd.Index(hours.strftime("%d/%m/%Y %H:%M"), name="day_first")
+
+    assert detect_date_formats(strings[:200]) == [
+        "%m/%d/%Y %H:%M",
+        "%d/%m/%Y %H:%M",
+    ]
+    assert detect_date_formats(strings) == ["%d/%m/%Y %H:%M"]
+
+
+def test_formats_are_remembered_by_signature():
+    strings = pd.Index(hours.strftime("%d/%m/%Y"), name="remembered")
+    parse_dates(strings)
+    ambiguous = pd.Index(["01/02/2021", "02/02/2021"], name="remembered")
+
+    assert parse_dates(ambiguous).format == "%d/%m/%Y"
+    assert parse_dates(ambiguous.rename("other")).format == "%m/%d/%Y"
+
+
+@pytest.mark.parametrize(
+    "strings", [["31/02/2020"] * 3, ["2020-01-01", "2020-01-0x", "x"]]
+)
+def test_invalid_dates_raise(strings):
+    with pytest.raises(ValueError):
+        parse_dates(pd.Index(strings))
+
+
+@pytest.mark.parametrize("freq", ["h", "D", "B", "W-SUN", "MS", "min"])
+def test_long_indexes_frequency(freq):
+    index = pd.date_range("1700-01-01", periods=5000, freq=freq)
+    index = pd.DatetimeIndex(index.to_numpy())  # no freq attribute
+    missing_one = index.delete(2600)  # between the sampled windows
+
+    assert infer_frequency(index) == pd.infer_freq(index)
+    assert infer_frequency(missing_one) is None
+    assert infer_frequency(index[::-1]) is None
@@ -0,0 +1,56 @@
+import numpy as np
+import pandas as pd
+from ts_app.downsampling import (
+    downsample,
+    downsample_window,
+    lttb_indices,
+    minmax_indices,
+)
+from ts_app.plotting import plot_forecast
+
+size = 1_000_000
+values = np.sin(np.linspace(0, 100, size))
+values[123_457] = 10  # a spike
+data = pd.Series(
+    values, index=pd.date_range("2000-01-01", periods=size, freq="min")
+)
+
+
+def test_minmax_keeps_extremes():
+    positions = minmax_indices(values, 1000)
+
+    assert len(positions) <= 1000
+    assert 123_457 in positions
+    assert positions[-1] == size - 1
+
+
+def test_lttb():
+    positions = lttb_indices(values, 1000)
+
+    assert len(positions) == 1000
+    assert np.all(np.diff(positions) > 0)
+    assert 123_457 in positions
+
+
+def test_short_series_are_unchanged():
+    short = data.iloc[:100]
+
+    assert downsample(short, 1000) is short
+    assert len(downsample(data, None)) == size
+
+
+def test_window_detail():
+    start, end = data.index[1000], data.index[2999]
+    resampled = downsample_window(data, start, end, max_points=4000)
+    visible = resampled[start:end]
+
+    assert len(resampled) <= 4000 + 2 * 500 + 2
+    assert len(visible) == 2000  # every point in the visible range
+    assert resampled.index[0] == data.index[0]
+    assert resampled.index[-1] == data.index[-1]
+
+
+def test_figure_size_is_bounded():
+    figure = plot_forecast(data, data.iloc[-1000:], data.iloc[-10:], "", "")
+
+    assert sum(len(trace.y) for trace in figure.data) <= 4000 + 1000 + 10
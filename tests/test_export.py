@@ -0,0 +1,130 @@
+import io
+
+import numpy as np
+import pandas as pd
+import pytest
+from ts_app.export import (
+    dump_model,
+    export_chunks,
+    export_filename,
+    export_frames,
+    forecast_model,
+    load_model,
+    model_description,
+    model_label,
+)
+from ts_app.ts_functions import (
+    create_arma_sample,
+    decompose,
+    extend_forecast,
+    get_arima_fit,
+)
+
+data = create_arma_sample(size=500, seed=0)
+fit = get_arima_fit(data, 1, 0, 1)
+components = decompose(data, (7,))
+
+
+def test_export_frames_cover_data_and_forecast():
+    frames = list(export_frames(fit, data, components, rows=200))
+    table = pd.concat(frames)
+
+    assert [len(frame) for frame in frames] == [200, 200, 100, 15]
+    assert list(table.columns) == [
+        "value",
+        "prediction",
+        "forecast",
+        "lower 95%",
+        "upper 95%",
+        "lower 80%",
+        "upper 80%",
+        "trend",
+        "seasonal",
+        "resid",
+    ]
+    np.testing.assert_array_equal(table["value"].iloc[:500], data)
+    np.testing.assert_array_equal(table["trend"].iloc[:500], components.trend)
+    np.testing.assert_array_equal(table["forecast"].iloc[500:], fit.forecast)
+    np.testing.assert_array_equal(
+        table["lower 95%"].iloc[500:], fit.intervals[0.05, "lower"]
+    )
+    assert table["forecast"].iloc[:500].isna().all()
+    assert table.index.equals(data.index.append(fit.forecast.index))
+
+
+def test_csv_export_is_written_in_chunks():
+    chunks = list(export_chunks(export_frames(fit, data, rows=200)))
+    table = pd.read_csv(
+        io.BytesIO(b"".join(chunks)), index_col="date", parse_dates=True
+    )
+
+    assert len(chunks) == 4
+    assert chunks[1].count(b"\n") == 200  # no repeated header
+    pd.testing.assert_frame_equal(
+        table, pd.concat(export_frames(fit, data)), check_freq=False
+    )
+
+
+@pytest.mark.parametrize("export_format", ["parquet", "arrow"])
+def test_binary_exports(export_format):
+    pa = pytest.importorskip("pyarrow")
+    import pyarrow.parquet as pq
+
+    file = b"".join(export_chunks(export_frames(fit, data), export_format))
+    if export_format == "parquet":
+        table = pq.read_table(pa.BufferReader(file)).to_pandas()
+    else:
+        table = pa.ipc.open_stream(file).read_pandas()
+
+    pd.testing.assert_frame_equal(
+        table, pd.concat(export_frames(fit, data)), check_freq=False
+    )
+
+
+def test_unknown_export_format():
+    with pytest.raises(ValueError):
+        next(export_chunks(export_frames(fit), "xlsx"))
+
+
+def test_model_bundle_forecasts_without_refitting():
+    bundle = load_model(dump_model(fit, (1, 0, 1)))
+    forecast = forecast_model(bundle, 40)
+    expected = extend_forecast(fit, 40)
+
+    assert bundle.order == (1, 0, 1)
+    assert bundle.seasonal_order == (0, 0, 0, 0)
+    pd.testing.assert_series_equal(bundle.fit.params, fit.params)
+    pd.testing.assert_series_equal(forecast.forecast, expected.forecast)
+    pd.testing.assert_frame_equal(forecast.intervals, expected.intervals)
+    pd.testing.assert_series_equal(
+        forecast_model(bundle, 10).forecast, fit.forecast.iloc[:10]
+    )
+
+
+def test_model_bundles_are_compact_and_validated():
+    longer = get_arima_fit(create_arma_sample(size=5000, seed=0), 1, 0, 1)
+
+    assert len(dump_model(longer, (1, 0, 1))) < 8 * 1024
+    with pytest.raises(ValueError):
+        load_model(b"not a bundle")
+
+
+def test_export_filename():
+    assert export_filename("sales.csv", "arima-1-0-1", "csv") == (
+        "sales-arima-1-0-1.csv"
+    )
+    assert export_filename("a random sample", "arima-1-0-1", "npz") == (
+        "a_random_sample-arima-1-0-1.npz"
+    )
+
+
+def test_model_labels():
+    assert model_label((1, 0, 1)) == "arima-1-0-1"
+    assert model_label((1, 0, 1), (1, 1, 1, 12)) == "sarima-1-0-1-1-1-1-12"
+    assert model_label((1, 0, 1), (1, 0, 0, 24)) == "arima-1-0-1-fourier-24"
+    assert model_description((1, 0, 1), (1, 1, 1, 12)) == (
+        "SARIMA(1, 0, 1)(1, 1, 1, 12)"
+    )
+    assert model_description((1, 0, 1), (1, 0, 0, 24)) == (
+        "ARIMA(1, 0, 1) with Fourier terms of period 24"
+    )
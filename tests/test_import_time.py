@@ -0,0 +1,40 @@
+import subprocess
+import sys
+
+# Cumulative import times allowed, in seconds. These are generous, to allow
+# for slow machines; the checks on which modules are imported are stricter.
+CLI_BUDGET = 0.5
+APP_BUDGET = 3.0
+
+
+def _import_times(statement: str) -> dict:
+    """Run a statement in a fresh interpreter with `-X importtime`, and get
+    the cumulative import time of each module, in seconds.
+    """
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", statement],
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    times = {}
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "[us]" in line:
+            continue
+        _, cumulative, name = line.split("|")
+        times[name.strip()] = int(cumulative) / 1e6
+    return times
+
+
+def test_cli_doesnt_import_the_app():
+    times = _import_times("import ts_app, ts_app.cli")
+
+    assert times["ts_app"] < CLI_BUDGET
+    assert not {"dash", "pandas", "statsmodels"} & times.keys()
+
+
+def test_app_defers_statsmodels():
+    times = _import_times("import ts_app.dash_app")
+
+    assert times["ts_app.dash_app"] < APP_BUDGET
+    assert "statsmodels" not in times
@@ -0,0 +1,87 @@
+import time
+from concurrent.futures import wait
+
+import pytest
+from ts_app.jobs import JobCancelled, JobManager, JobTimeout, ProgressStore
+
+
+@pytest.fixture
+def manager():
+    manager = JobManager(max_workers=1, timeout=5)
+    yield manager
+    manager.shutdown()
+
+
+def test_job_results_and_latency(manager):
+    job = manager.submit("session", pow, 2, 10)
+
+    assert manager.result(job) == 1024
+    time.sleep(0.1)  # allow the done-callback to record latency
+    assert manager.stats["completed"] == 1
+    assert manager.stats["mean_run"] >= 0
+    assert manager.status("session") == ""
+    assert "session" not in manager._requests  # forgotten once it's done
+
+
+def test_superseded_jobs_are_cancelled(manager):
+    stale = manager.submit("session", time.sleep, 0.5)
+    current = manager.submit("session", pow, 2, 3)
+    other_session = manager.submit("other", pow, 3, 2)
+
+    with pytest.raises(JobCancelled):
+        manager.result(stale)
+    assert manager.result(current) == 8
+    assert manager.result(other_session) == 9
+    time.sleep(0.6)  # let the stale job finish, if it had started
+    assert manager.stats["cancelled"] == 1
+    assert manager.stats["completed"] == 2
+
+
+def test_job_timeout(manager):
+    job = manager.submit("session", time.sleep, 1)
+
+    with pytest.raises(JobTimeout, match="longer than 0.1 seconds"):
+        manager.result(job, timeout=0.1)
+    assert manager.stats["timed_out"] == 1
+
+
+def test_session_executor_jobs_are_superseded_together(manager):
+    executor = manager.session_executor("session")
+    assert list(executor.map(pow, [2, 3], [2, 2])) == [4, 9]
+
+    stale = [executor.submit(time.sleep, 0.5), executor.submit(pow, 2, 5)]
+    assert manager.status("session").startswith("Waiting")
+    current = manager.submit("session", pow, 2, 3)
+    late = executor.submit(pow, 2, 4)
+
+    done, _ = wait(stale + [late], timeout=1)
+    assert len(done) == 3 and all(future.cancelled() for future in done)
+    assert manager.result(current) == 8
+    assert manager.stats["cancelled"] == 3
+
+
+def test_session_executor_timeouts(manager):
+    executor = manager.session_executor("session")
+    future = executor.submit(time.sleep, 1)
+
+    manager.expire("session")
+    wait([future], timeout=0.5)
+    assert future.cancelled()
+    assert manager.stats["timed_out"] == 1
+    assert "session" not in manager._requests
+    assert executor.submit(pow, 2, 2).cancelled()
+
+
+@pytest.mark.parametrize("shared", [False, True])
+def test_progress_store(tmp_path, shared):
+    store = ProgressStore(tmp_path if shared else None)
+    store.put("../session", {"fitted": 1})
+
+    # Another server process sees saved records
+    other = ProgressStore(tmp_path) if shared else store
+    assert other.get("../session") == {"fitted": 1}
+    assert other.get("unknown") is None and other.get(None) is None
+    other.pop("../session")
+    assert store.get("../session") is None
+    if shared:
+        assert [path.suffix for path in tmp_path.iterdir()] == []
@@ -0,0 +1,21 @@
+from ts_app.metrics import SPAN_SECONDS, Histogram, size_label, span
+
+
+def test_histogram_buckets_are_cumulative():
+    histogram = Histogram("test_seconds", "A test.", buckets=[0.1, 1.0])
+    for value in (0.05, 0.5, 5.0):
+        histogram.observe(value, stage="fit")
+
+    lines = histogram.render().splitlines()
+    assert 'test_seconds_bucket{stage="fit",le="0.1"} 1' in lines
+    assert 'test_seconds_bucket{stage="fit",le="1.0"} 2' in lines
+    assert 'test_seconds_bucket{stage="fit",le="+Inf"} 3' in lines
+    assert 'test_seconds_count{stage="fit"} 3' in lines
+
+
+def test_span_labels_can_be_added_later():
+    with span("test.stage", order="1-0-1") as labels:
+        labels["size"] = size_label(365)
+
+    key = (("order", "1-0-1"), ("size", "<=1e3"), ("span", "test.stage"))
+    assert SPAN_SECONDS.collect()[key][2] == 1
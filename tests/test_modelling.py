@@ -0,0 +1,242 @@
+import time
+from base64 import b64decode
+from urllib.parse import parse_qs, urlparse
+
+import numpy as np
+import pytest
+from dash._callback import GLOBAL_CALLBACK_MAP
+from dash.exceptions import PreventUpdate
+from statsmodels.tsa.api import seasonal_decompose
+from ts_app import cache
+from ts_app.components import modelling
+from ts_app.cache import LRUCache
+from ts_app.components.modelling import (
+    detect_seasonal_period,
+    download_model,
+    link_export,
+    model_and_predict,
+    plot_decomposition,
+    preview_model,
+    run_backtest,
+    show_diagnostics,
+    show_search_progress,
+    start_order_search,
+)
+from ts_app.datasets import DATASETS
+from ts_app.export import load_model
+from ts_app.jobs import JobManager, ProgressStore
+from ts_app.metrics import SPAN_SECONDS
+from ts_app.ts_functions import create_arma_sample, decompose, diagnose
+
+sample_id = DATASETS.put(create_arma_sample())
+sample = {"filename": "test", "dataset_id": sample_id}
+
+
+def test_decomposition_ignores_model_order():
+    inputs = GLOBAL_CALLBACK_MAP["component-plots.figure"]["inputs"]
+
+    assert {item["id"] for item in inputs}.isdisjoint(
+        {"model-ar", "model-diff", "model-ma"}
+    )
+
+
+@pytest.mark.parametrize("method", ["classical", "stl"])
+def test_order_changes_do_not_recompute_decomposition(monkeypatch, method):
+    calls = []
+
+    def counting_decompose(data, period=None):
+        calls.append(len(data))
+        return seasonal_decompose(data, period=period)
+
+    def counting_stl(data, periods):
+        calls.append(len(data))
+        return decompose(data, periods)
+
+    monkeypatch.setattr(cache, "seasonal_decompose", counting_decompose)
+    monkeypatch.setattr(cache, "decompose", counting_stl)
+    monkeypatch.setattr(cache, "DECOMPOSITION_CACHE", LRUCache())
+
+    plot_decomposition("/sample", sample, None, method)
+    for ar_order in range(3):
+        model_and_predict(ar_order, 0, 1, "/sample", sample, None)
+    plot_decomposition("/sample", sample, None, method)
+
+    assert calls == [100]
+
+
+def test_order_changes_do_not_recompute_diagnostics(monkeypatch):
+    calls = []
+
+    def counting_diagnose(data):
+        calls.append(len(data))
+        return diagnose(data)
+
+    monkeypatch.setattr(cache, "diagnose", counting_diagnose)
+    monkeypatch.setattr(cache, "DIAGNOSTICS_CACHE", LRUCache())
+
+    summaries = [
+        show_diagnostics(diff_order, "/sample", sample, None)[1]
+        for diff_order in range(6)
+    ]
+
+    assert calls == [100]
+    assert "| **2** |" in summaries[2]
+
+
+def test_expired_data_is_reported():
+    expired = {"filename": "test", "dataset_id": "unknown"}
+    _, message = model_and_predict(1, 0, 1, "/sample", expired, None)
+
+    assert "no longer available" in message
+
+
+def test_model_stages_are_timed():
+    model_and_predict(1, 0, 1, "/sample", sample, None)
+    spans = {dict(labels)["span"] for labels in SPAN_SECONDS.collect()}
+
+    assert {
+        "model_and_predict.load_data",
+        "model_and_predict.fit",
+        "model_and_predict.plot",
+        "model_and_predict.serialise",
+    } <= spans
+
+
+def test_preview_is_shown_until_the_exact_fit_is_cached():
+    preview = preview_model(2, 1, 2, "/sample", sample, None)
+    assert "approximate" in preview["layout"]["title"]["text"]
+
+    model_and_predict(2, 1, 2, "/sample", sample, None)
+    with pytest.raises(PreventUpdate):
+        preview_model(2, 1, 2, "/sample", sample, None)
+
+
+def test_longer_horizons_extend_the_cached_fit(monkeypatch):
+    model_and_predict(1, 1, 1, "/sample", sample, None)
+    monkeypatch.setattr(
+        "ts_app.components.modelling.JOB_MANAGER.submit",
+        lambda *args, **kwargs: pytest.fail("refitted"),
+    )
+    figure, _ = model_and_predict(1, 1, 1, "/sample", sample, None, 3000)
+
+    forecast, *bands = figure["data"][2:]
+    assert forecast["name"] == "forecast"
+    assert [band["name"] for band in bands] == [
+        "95% interval",
+        "80% interval",
+    ]
+
+
+def test_detected_period_is_modelled_and_shown():
+    weekly = create_arma_sample(size=300, seed=0) * 0.1 + np.sin(
+        2 * np.pi * np.arange(300) / 7
+    )
+    weekly_sample = {"filename": "weekly", "dataset_id": DATASETS.put(weekly)}
+
+    period = detect_seasonal_period("/sample", weekly_sample, None)
+    figure, _ = model_and_predict(
+        1, 0, 1, "/sample", weekly_sample, None, 15, 1, 0, 1, period
+    )
+    components = plot_decomposition("/sample", weekly_sample, None)
+
+    assert period == 7
+    assert "SARIMA(1, 0, 1)(1, 0, 1, 7)" in figure["layout"]["title"]["text"]
+    titles = [note["text"] for note in components["layout"]["annotations"]]
+    assert "Seasonal (period 7)" in titles
+
+
+def test_backtest_is_plotted():
+    longer_sample = {
+        "filename": "test",
+        "dataset_id": DATASETS.put(create_arma_sample(size=300, seed=0)),
+    }
+    figure, style, message = run_backtest(
+        1, 1, 0, 1, "rolling", "/sample", longer_sample, None
+    )
+    _, _, too_short = run_backtest(
+        1, 1, 0, 1, "rolling", "/sample", sample, None
+    )
+
+    assert style == {}
+    assert "Backtesting errors" in figure["layout"]["title"]["text"]
+    assert message.startswith("Over 8 folds: MAE")
+    assert "too few" in too_short
+
+
+def test_slow_backtests_time_out(monkeypatch):
+    monkeypatch.setattr(modelling, "FIT_CACHE", LRUCache())
+    manager = JobManager(max_workers=1, timeout=0.001)
+    monkeypatch.setattr(modelling, "JOB_MANAGER", manager)
+    longer_sample = {
+        "filename": "test",
+        "dataset_id": DATASETS.put(create_arma_sample(size=300, seed=1)),
+    }
+    try:
+        *_, message = run_backtest(
+            1, 1, 0, 1, "rolling", "/sample", longer_sample, None, "session"
+        )
+    finally:
+        manager.shutdown()
+
+    assert "took too long" in message
+    assert manager.stats["timed_out"] == 1
+
+
+def test_search_progress_is_shared_between_processes(monkeypatch, tmp_path):
+    monkeypatch.setattr(modelling, "SEARCH_PROGRESS", ProgressStore(tmp_path))
+    # Written by the search's server process
+    other = ProgressStore(tmp_path)
+    other.put("session", {"search": "id"})
+    progress = {"order": [1, 0, 2], "aic": 250.0, "fitted": 3, "done": False}
+    other.put("id", progress)
+
+    orders = show_search_progress(1, "session", 1, 0, 1)
+    shown = show_search_progress(2, "session", 1, 0, 2)
+    other.put("id", {**progress, "done": True, "timed_out": True})
+    *_, message, done = show_search_progress(3, "session", 1, 0, 2)
+
+    assert orders[:3] == (1, 0, 2) and "3 models fitted so far" in orders[3]
+    assert shown[:3] == (modelling.no_update,) * 3
+    assert done and "too long" in message
+    assert other.get("id") is None
+    with pytest.raises(PreventUpdate):
+        show_search_progress(4, "unknown", 1, 0, 1)
+
+
+def test_order_search_finds_a_model(monkeypatch):
+    monkeypatch.setattr(modelling, "SEARCH_PROGRESS", ProgressStore())
+    disabled, _ = start_order_search(1, "/sample", sample, None, "session")
+    for _ in range(600):
+        if modelling.SEARCH_PROGRESS.get(
+            modelling.SEARCH_PROGRESS.get("session")["search"]
+        )["done"]:
+            break
+        time.sleep(0.1)
+    *order, message, done = show_search_progress(1, "session")
+
+    assert not disabled and done
+    assert len(order) == 3 and "models fitted." in message
+
+
+def test_fitted_model_is_exported(monkeypatch):
+    monkeypatch.setattr(cache, "FIT_CACHE", LRUCache())
+    monkeypatch.setattr(modelling, "FIT_CACHE", cache.FIT_CACHE)
+    params = (2, 0, 1, "/sample", sample, None)
+
+    _, status = download_model(1, *params)
+    model_and_predict(*params, 20)
+    download, _ = download_model(1, *params)
+    href, filename = link_export("csv", "stl", *params, 20)
+
+    assert "fitted" in status
+    assert download["filename"] == "test-arima-2-0-1.npz"
+    bundle = load_model(b64decode(download["content"]))
+    assert bundle.order == (2, 0, 1)
+    assert len(bundle.fit.forecast) == 20
+    assert filename == "test-arima-2-0-1.csv"
+    assert f"dataset={sample_id}" in href
+    # The default sample is registered once, when it's created
+    default_href, _ = link_export("csv", "stl", 2, 0, 1, "/", None, None)
+    default_id = parse_qs(urlparse(default_href).query)["dataset"][0]
+    assert default_id in DATASETS
+    assert "ar=2" in href and "decompose=stl" in href
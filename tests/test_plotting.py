@@ -0,0 +1,66 @@
+from base64 import b64decode
+
+import numpy as np
+import pandas as pd
+from ts_app.plotting import (
+    encode_array,
+    plot_forecast,
+    plot_ts_components,
+    serialise_figure,
+)
+from ts_app.ts_functions import create_arma_sample, get_arima_fit
+
+
+def test_encode_array():
+    values = np.array([1.5, np.nan, -2.0])
+    encoded = encode_array(values)
+
+    assert encoded["dtype"] == "f8"
+    decoded = np.frombuffer(b64decode(encoded["bdata"]), dtype="<f8")
+    np.testing.assert_array_equal(decoded, values)
+
+
+def test_small_figures_are_plain_json():
+    data = create_arma_sample()
+    figure = serialise_figure(plot_forecast(data, data, data, "", ""))
+
+    assert figure["data"][0]["type"] == "scatter"
+    assert len(figure["data"][0]["x"]) == 100
+
+
+def test_large_figures_are_binary_webgl():
+    data = create_arma_sample(size=3000)
+    fig = plot_forecast(data, data.iloc[-2000:], data.iloc[-10:], "", "")
+    trace = serialise_figure(fig)["data"][0]
+
+    assert trace["type"] == "scattergl"
+    assert "bdata" in trace["y"]
+    assert "x" not in trace  # evenly spaced dates are described instead
+    assert pd.Timestamp(trace["x0"]) == data.index[0]
+    assert trace["dx"] == 24 * 60 * 60 * 1000  # a day, in milliseconds
+
+
+def test_forecast_intervals_are_filled_bands():
+    data = create_arma_sample(seed=0)
+    fit = get_arima_fit(data, alphas=(0.2, 0.05))
+    fig = plot_forecast(
+        data, fit.predictions, fit.forecast, "", "", intervals=fit.intervals
+    )
+    bands = fig.data[3:]
+
+    assert [band.name for band in bands] == ["95% interval", "80% interval"]
+    assert all(band.fill == "toself" for band in bands)
+    assert len(bands[0].x) == 2 * len(fit.forecast)
+    assert bands[0].y[0] == fit.intervals[0.05, "upper"].iloc[0]
+    assert bands[0].y[-1] == fit.intervals[0.05, "lower"].iloc[0]
+
+
+def test_component_titles_show_method_and_periods():
+    data = create_arma_sample()
+    fig = plot_ts_components(
+        data, data, data, "test", period=[24, 168], method="MSTL"
+    )
+
+    assert fig.layout.title.text == "Seasonal Decomposition for test (MSTL)"
+    titles = [annotation.text for annotation in fig.layout.annotations]
+    assert titles == ["Trend", "Seasonal (periods 24, 168)", "Residuals"]
@@ -0,0 +1,67 @@
+import os
+import signal
+import subprocess
+import sys
+import textwrap
+import time
+from urllib.request import urlopen
+
+import pytest
+import ts_app
+from ts_app.dash_app import app
+
+SERVER_SCRIPT = textwrap.dedent(
+    """
+    import os, sys, time
+    from ts_app.prefork import bind_socket, serve_prefork
+
+    def app(environ, start_response):
+        if environ["PATH_INFO"] == "/slow":
+            time.sleep(1)
+        start_response("200 OK", [("Content-Type", "text/plain")])
+        return [str(os.getpid()).encode()]
+
+    sock = bind_socket("127.0.0.1", 0)
+    print(sock.getsockname()[1], flush=True)
+    serve_prefork(app, sock, workers=2, threads=2)
+    """
+)
+
+
+def test_wsgi_server_is_exported():
+    assert ts_app.server is app.server
+
+
+@pytest.mark.skipif(not hasattr(os, "fork"), reason="needs os.fork")
+def test_workers_share_the_socket_and_stop_gracefully():
+    process = subprocess.Popen(
+        [sys.executable, "-c", SERVER_SCRIPT],
+        stdout=subprocess.PIPE,
+        text=True,
+    )
+    try:
+        port = int(process.stdout.readline())
+        pids = set()
+        deadline = time.monotonic() + 10
+        while len(pids) < 2 and time.monotonic() < deadline:
+            with urlopen(f"http://127.0.0.1:{port}/", timeout=5) as response:
+                pids.add(int(response.read()))
+        assert len(pids) == 2 and process.pid not in pids
+
+        # A request in progress completes after the server is told to stop
+        slow = subprocess.Popen(
+            [
+                sys.executable,
+                "-c",
+                "from urllib.request import urlopen;"
+                f"print(urlopen('http://127.0.0.1:{port}/slow').status)",
+            ],
+            stdout=subprocess.PIPE,
+            text=True,
+        )
+        time.sleep(0.5)
+        process.send_signal(signal.SIGTERM)
+        assert slow.communicate(timeout=10)[0].strip() == "200"
+        assert process.wait(timeout=10) == 0
+    finally:
+        process.kill()
@@ -0,0 +1,186 @@
+import io
+import logging
+import time
+from base64 import b64encode
+
+import numpy as np
+import pandas as pd
+from ts_app import api
+from ts_app.cache import cached_arima_fit
+from ts_app.dash_app import app
+from ts_app.datasets import DATASETS
+from ts_app.jobs import JOB_MANAGER
+from ts_app.pages.upload import get_upload_data
+from ts_app.ts_functions import create_arma_sample
+
+client = app.server.test_client()
+data = pd.DataFrame(
+    {"other": 1.5, "value": range(100)},
+    index=pd.date_range("2020-01-01", periods=100, name="date"),
+)
+
+
+def test_large_file_upload():
+    response = client.post(
+        "/upload-large?filename=test.csv", data=data.to_csv().encode()
+    )
+    result = response.get_json()
+
+    assert response.status_code == 200
+    assert result["filename"] == "test.csv"
+    assert result["column"] == "value"
+    assert DATASETS.get(result["dataset_id"]).tolist() == list(range(100))
+    assert list(result["columns"]) == ["other", "value"]
+
+
+def test_invalid_large_file_uploads(caplog):
+    wrong_type = client.post("/upload-large?filename=test.txt", data=b"")
+    invalid = client.post(
+        "/upload-large?filename=test.csv", data=data.head(10).to_csv()
+    )
+    with caplog.at_level(logging.ERROR, logger="ts_app.routes"):
+        corrupt = client.post("/upload-large?filename=test.xlsx", data=b"?")
+
+    assert wrong_type.status_code == 400
+    assert corrupt.status_code == 400
+    assert caplog.records[-1].message == "Large upload failed"
+    assert caplog.records[-1].exc_info is not None
+    assert invalid.status_code == 400
+    assert "minimum is set at 32" in invalid.get_json()["error"]
+
+
+def test_failed_dashboard_uploads_are_logged(caplog, monkeypatch):
+    def fail(data):
+        raise MemoryError
+
+    monkeypatch.setattr(DATASETS, "put_columns", fail)
+    encoded = b64encode(data.to_csv().encode()).decode()
+    with caplog.at_level(logging.ERROR, logger="ts_app.pages.upload"):
+        message, *_ = get_upload_data(
+            f"data:text/csv;base64,{encoded}", "test.csv"
+        )
+
+    assert message == "There was an error processing the file."
+    assert caplog.records[-1].message == "Upload failed"
+    assert caplog.records[-1].exc_info is not None
+
+
+def test_forecast_api_fits_every_series():
+    completed = JOB_MANAGER.stats["completed"]
+    response = client.post(
+        "/api/forecast?ar=1&diff=0&ma=0&horizon=30",
+        data=data.assign(value=data["value"] % 7).to_csv(),
+        content_type="text/csv",
+    )
+    result = response.get_json()
+
+    assert response.status_code == 200
+    assert result["order"] == [1, 0, 0]
+    assert result["model"] == "ARIMA(1, 0, 0)"
+    assert [series["name"] for series in result["series"]] == [
+        "other",
+        "value",
+    ]
+    value = result["series"][1]
+    assert len(value["forecast"]["values"]) == 30
+    assert sorted(value["intervals"]) == ["80%", "95%"]
+    assert len(value["intervals"]["95%"]["lower"]) == 30
+    assert len(value["decomposition"]["trend"]) == 100
+    time.sleep(0.1)  # allow the done-callbacks to record the jobs
+    assert JOB_MANAGER.stats["completed"] == completed + 2
+
+
+def test_forecast_api_errors():
+    unsupported = client.post("/api/forecast", data="", content_type="x/y")
+    invalid = client.post("/api/forecast?diff=x", json={})
+    no_horizon = client.post("/api/forecast?horizon=0", json={})
+
+    assert unsupported.status_code == 415
+    assert invalid.status_code == 400
+    assert "'diff'" in invalid.get_json()["error"]
+    assert "'horizon'" in no_horizon.get_json()["error"]
+
+
+def test_export_api_streams_cached_fits():
+    sample = create_arma_sample(size=100, seed=0)
+    dataset_id = DATASETS.put(sample)
+    cached_arima_fit(sample, 1, 0, 1, horizon=20)
+
+    response = client.get(
+        f"/api/export?dataset={dataset_id}&horizon=20&name=test.csv"
+    )
+    table = pd.read_csv(io.BytesIO(response.data), index_col="date")
+
+    assert response.status_code == 200
+    assert response.headers["Content-Disposition"] == (
+        'attachment; filename="test-arima-1-0-1.csv"'
+    )
+    assert len(table) == 120
+    np.testing.assert_allclose(table["value"].iloc[:100], sample)
+    assert {"trend", "upper 95%"} <= set(table.columns)
+
+
+def test_export_api_errors(monkeypatch):
+    dataset_id = DATASETS.put(create_arma_sample(size=100, seed=0))
+    monkeypatch.setattr(api, "PYARROW_INSTALLED", False)
+
+    unknown = client.get("/api/export?dataset=unknown")
+    unfitted = client.get(f"/api/export?dataset={dataset_id}&ar=5")
+    no_pyarrow = client.get(f"/api/export?dataset={dataset_id}&format=arrow")
+    bad_format = client.get(f"/api/export?dataset={dataset_id}&format=xlsx")
+
+    assert unknown.status_code == 404
+    assert unfitted.status_code == 404
+    assert "fitted" in unfitted.get_json()["error"]
+    assert no_pyarrow.status_code == 406
+    assert bad_format.status_code == 400
+
+
+def test_metrics_include_request_latency():
+    client.post("/upload-large?filename=test.txt", data=b"")
+    response = client.get("/metrics")
+    text = response.get_data(as_text=True)
+
+    assert response.content_type.startswith("text/plain; version=0.0.4")
+    assert "# TYPE ts_app_request_seconds histogram" in text
+    assert 'route="/upload-large",status="400"' in text
+    assert "ts_app_fit_cache_hits_total" in text
+
+
+def test_callback_latency_is_labelled_by_output(monkeypatch):
+    loads = app.server.json.loads
+    parsed = []
+
+    def counting_loads(*args, **kwargs):
+        parsed.append(args)
+        return loads(*args, **kwargs)
+
+    monkeypatch.setattr(app.server.json, "loads", counting_loads)
+    response = client.post(
+        "/_dash-update-component",
+        json={
+            "output": "session-id.data",
+            "outputs": {"id": "session-id", "property": "data"},
+            "inputs": [
+                {"id": "current-page", "property": "pathname", "value": "/"}
+            ],
+            "state": [{"id": "session-id", "property": "data"}],
+            "changedPropIds": ["current-page.pathname"],
+        },
+    )
+    text = client.get("/metrics").get_data(as_text=True)
+
+    assert response.status_code == 200
+    assert 'output="session-id.data"' in text
+    assert len(parsed) == 1  # the body is only parsed once
+
+
+def test_requests_with_header_are_profiled(monkeypatch, caplog):
+    monkeypatch.setitem(app.server.config, "TS_APP_PROFILE", "header")
+    with caplog.at_level(logging.INFO, logger="ts_app.routes"):
+        client.get("/metrics")
+        client.get("/metrics", headers={"X-Profile": "1"})
+
+    profiles = [r for r in caplog.records if "Profile of" in r.message]
+    assert len(profiles) == 1
+    assert "cumulative" in profiles[0].message
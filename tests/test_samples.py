@@ -0,0 +1,22 @@
+import numpy as np
+from ts_app.samples import SampleBank
+from ts_app.ts_functions import create_arma_samples
+
+
+def test_batch_samples_match_single_samples():
+    batch = create_arma_samples(2, 1, size=50, seeds=[1, 2, 3])
+    single = create_arma_samples(2, 1, size=50, seeds=[2])
+
+    assert batch.shape == (3, 50)
+    np.testing.assert_array_equal(batch[1], single[0])
+
+
+def test_sample_bank_is_reproducible():
+    bank = SampleBank(batch_size=4)
+    first = bank.get(2, 1, size=50, seed=1)
+
+    assert len(bank) == 4  # seeds 0 to 3
+    assert bank.get(2, 1, size=50, seed=1).equals(first)
+    assert not bank.get(2, 1, size=50, seed=2).equals(first)
+    assert not bank.get(2, 2, size=50, seed=1).equals(first)
+    assert SampleBank().get(2, 1, size=50, seed=1).equals(first)
@@ -1,6 +1,32 @@
+import time
+from concurrent.futures import ThreadPoolExecutor
+from itertools import product
+
+import numpy as np
 import pandas as pd
+import pytest
 from pandas.api.types import is_datetime64_dtype
-from ts_app.ts_functions import create_arma_sample, fit_arima_model
+from statsmodels.tsa.arima.model import ARIMA
+from statsmodels.tsa.seasonal import STL
+from statsmodels.tsa.stattools import acf, pacf
+from ts_app.ts_functions import (
+    backtest,
+    backtest_origins,
+    create_arma_sample,
+    decompose,
+    decomposition_periods,
+    detect_period,
+    diagnose,
+    extend_forecast,
+    fit_arima_model,
+    fourier_terms,
+    get_arima_fit,
+    normalise_seasonal_order,
+    search_arima_orders,
+    suggest_diff_orders,
+    suggest_order,
+    truncate_forecast,
+)
 
 
 def test_default_sample_creation():
@@ -21,8 +47,325 @@ def test_specified_sample_creation():
 
 def test_ts_prediction():
     data = create_arma_sample()
-    predictions, forecast = fit_arima_model(data)
+    predictions, forecast, intervals = fit_arima_model(data)
 
     assert predictions.shape == (31,)
     assert forecast.shape == (15,)
     assert is_datetime64_dtype(predictions.index)
+    assert intervals.index.equals(forecast.index)
+    assert list(intervals.columns.unique("alpha")) == [0.05, 0.2]
+
+
+@pytest.mark.parametrize("order", [(1, 0, 1), (2, 1, 1), (0, 2, 2)])
+def test_prediction_intervals_match_statsmodels(order):
+    data = create_arma_sample(ar_order=2, size=1000, seed=0)
+    if order[1]:
+        data = data.cumsum()
+    fit = get_arima_fit(data, *order)
+    params = pd.Series(fit.params.to_numpy(), index=fit.params.index)
+    exact = ARIMA(data, order=order).filter(params).get_forecast(15)
+
+    expected = exact.conf_int(alpha=0.05).to_numpy()
+    np.testing.assert_allclose(fit.intervals[0.05].to_numpy(), expected)
+    width = expected[:, 1] - expected[:, 0]
+
+    simulated = get_arima_fit(
+        data, *order, start_params=params, refit=False, simulations=4000,
+        seed=0
+    )
+    error = np.abs(simulated.intervals[0.05].to_numpy() - expected)
+    assert (error.max(axis=1) < 0.1 * width).all()
+
+    css = get_arima_fit(data, *order, method="css")
+    css_width = css.intervals[0.05, "upper"] - css.intervals[0.05, "lower"]
+    np.testing.assert_allclose(css_width, width, rtol=0.1)
+
+
+def test_extended_forecast_matches_a_longer_forecast():
+    data = create_arma_sample(size=300, seed=0).cumsum()
+    fit = get_arima_fit(data, 1, 1, 1, horizon=5)
+    longer = get_arima_fit(
+        data, 1, 1, 1, fit.params, refit=False, horizon=400
+    )
+    extended = extend_forecast(fit, 400)
+
+    assert extended.predictions is fit.predictions
+    pd.testing.assert_series_equal(extended.forecast, longer.forecast)
+    pd.testing.assert_frame_equal(extended.intervals, longer.intervals)
+    assert extend_forecast(extended, 10) is extended
+
+    shown = truncate_forecast(extended, 10)
+    assert shown.forecast.equals(longer.forecast.iloc[:10])
+    assert len(shown.intervals) == 10 and shown.state is None
+    with pytest.raises(ValueError):
+        extend_forecast(shown, 20)
+
+
+def seasonal_sample(period, size, freq="h", seed=0):
+    positions = np.arange(size)
+    angles = 2 * np.pi * positions / period
+    noise = np.random.default_rng(seed).standard_normal(size)
+    return pd.Series(
+        2 * np.sin(angles) + np.cos(2 * angles) + noise,
+        index=pd.date_range("2020-01-01", periods=size, freq=freq),
+    )
+
+
+def test_seasonal_fit_matches_statsmodels():
+    data = seasonal_sample(12, 240, "MS")
+    fit = get_arima_fit(data, 1, 0, 1, seasonal_order=(1, 1, 1, 12))
+    model = ARIMA(data, order=(1, 0, 1), seasonal_order=(1, 1, 1, 12))
+    expected = model.filter(fit.params.to_numpy()).get_forecast(15)
+
+    assert {"ar.S.L12", "ma.S.L12"} <= set(fit.params.index)
+    np.testing.assert_allclose(fit.forecast, expected.predicted_mean)
+    np.testing.assert_allclose(
+        fit.intervals[0.05].to_numpy(), expected.conf_int(alpha=0.05)
+    )
+
+    # The approximate fit multiplies the same seasonal polynomials
+    css = get_arima_fit(
+        data, 1, 0, 1, method="css", seasonal_order=(1, 1, 1, 12)
+    )
+    assert css.params.index.equals(fit.params.index)
+    assert (css.forecast - fit.forecast).abs().max() < 0.5 * data.std()
+
+
+def test_long_periods_are_fitted_with_fourier_terms():
+    data = seasonal_sample(24, 1000)
+    fit = get_arima_fit(data, 1, 0, 1, seasonal_order=(1, 0, 1, 24))
+    extended = extend_forecast(fit, 100)
+    exog = fourier_terms(np.arange(1000), 24, 4, data.index)
+    expected = (
+        ARIMA(data, exog=exog, order=(1, 0, 1))
+        .filter(fit.params.to_numpy())
+        .get_forecast(100, exog=fourier_terms(np.arange(1000, 1100), 24, 4))
+    )
+
+    assert list(exog.columns) == [
+        f"{wave}{k}" for k in range(1, 5) for wave in ("sin", "cos")
+    ]
+    assert fit.params.index[1:9].equals(exog.columns)
+    np.testing.assert_allclose(extended.forecast, expected.predicted_mean)
+    np.testing.assert_allclose(
+        extended.intervals[0.05].to_numpy(), expected.conf_int(alpha=0.05)
+    )
+
+    # The approximate fit has the same Fourier terms
+    css = get_arima_fit(
+        data, 1, 0, 1, method="css", seasonal_order=(1, 0, 1, 24)
+    )
+    assert css.params.index.equals(fit.params.index)
+    assert (css.forecast - fit.forecast).abs().max() < 0.1 * data.std()
+
+
+def test_long_seasonal_orders_are_normalised_to_fourier_terms():
+    assert normalise_seasonal_order((1, 0, 1, 24)) == (1, 0, 0, 24)
+    assert normalise_seasonal_order((2, 0, 0, 24)) == (1, 0, 0, 24)
+    assert normalise_seasonal_order((1, 0, 0, 24)) == (1, 0, 0, 24)
+    assert normalise_seasonal_order((0, 0, 0, 24)) == (0, 0, 0, 0)
+    assert normalise_seasonal_order((1, 1, 1, 12)) == (1, 1, 1, 12)
+    with pytest.raises(ValueError, match="seasonal differencing"):
+        normalise_seasonal_order((0, 1, 0, 24))
+
+
+def test_warm_started_fit_matches_default_fit():
+    data = create_arma_sample(ar_order=2, size=300, seed=0)
+    previous = get_arima_fit(data, 2, 0, 1)
+
+    cold = get_arima_fit(data, 3, 0, 1)
+    warm = get_arima_fit(data, 3, 0, 1, start_params=previous.params)
+    assert abs(warm.aic - cold.aic) < 0.1
+
+    # Dropping a lag can leave non-stationary start values, which are ignored
+    explosive = pd.Series(
+        [0.0, 1.5, 0.5, 0.5, 1.0], index=previous.params.index
+    )
+    fallback = get_arima_fit(data, 1, 0, 1, start_params=explosive)
+    assert fallback.params.notna().all()
+
+    # Pure AR and MA models have no polynomial to check on the other side
+    ar_only = get_arima_fit(data, 1, 0, 0)
+    assert get_arima_fit(data, 2, 0, 0, ar_only.params).params.notna().all()
+
+
+def test_fit_without_refit_reuses_params():
+    data = create_arma_sample(size=200)
+    previous = get_arima_fit(data.iloc[:180])
+
+    extended = get_arima_fit(data, start_params=previous.params, refit=False)
+    pd.testing.assert_series_equal(extended.params, previous.params)
+    assert extended.forecast.index[0] == data.index[-1] + data.index.freq
+
+
+def test_diff_order_suggestions():
+    random_walk = create_arma_sample(size=200, seed=0).cumsum()
+
+    assert 0 not in suggest_diff_orders(random_walk)
+
+
+def test_diagnostics_match_statsmodels():
+    data = create_arma_sample(size=300, seed=0).cumsum()
+    diagnostics = diagnose(data, nlags=20)
+    differenced = np.diff(data.to_numpy())
+
+    assert list(diagnostics.tests.index) == list(range(6))
+    np.testing.assert_allclose(
+        diagnostics.acf[1], acf(differenced, nlags=20, fft=True)
+    )
+    np.testing.assert_allclose(
+        diagnostics.pacf[1], pacf(differenced, nlags=20, method="ldb")
+    )
+
+
+@pytest.mark.parametrize(
+    "ar_order, ma_order, expected",
+    [(2, 0, (2, 1, 0)), (0, 2, (0, 1, 2)), (1, 1, (1, 1, 1))],
+)
+def test_order_suggestions(ar_order, ma_order, expected):
+    data = create_arma_sample(ar_order, ma_order, size=2000, seed=0)
+
+    assert suggest_order(diagnose(data.cumsum())) == expected
+
+
+def test_order_search():
+    data = create_arma_sample()
+    results = list(search_arima_orders(data, max_ar=1, max_diff=1, max_ma=1))
+    best = min(results, key=lambda result: result.aic)
+
+    assert 0 < len(results) <= 8
+    assert best.order in {result.order for result in results}
+    assert best.fit.forecast.shape == (15,)
+
+
+def test_order_search_timeout_does_not_wait_for_running_fits():
+    data = create_arma_sample(size=20000, seed=0)
+    with ThreadPoolExecutor(max_workers=1) as executor:
+        start = time.perf_counter()
+        with pytest.raises(TimeoutError):
+            list(search_arima_orders(data, executor=executor, timeout=0.05))
+        elapsed = time.perf_counter() - start
+        fit_start = time.perf_counter()
+    # The first fit was still running, and kept the pool busy after
+    assert elapsed < time.perf_counter() - fit_start
+
+
+def test_css_fit_approximates_exact_fit_quickly():
+    """Across a grid of orders, on a stationary sample, the conditional
+    sum-of-squares fit gives nearly the same parameters, AIC and forecast as
+    the exact fit, in a fraction of the time. Over-differenced models
+    (diff=1) can differ more, so only their outputs' shapes are compared.
+    """
+    data = create_arma_sample(size=1000, seed=0)
+    css_time = exact_time = 0.0
+    for ar_order, diff, ma_order in product(range(3), range(2), range(3)):
+        order = (ar_order, diff, ma_order)
+        start = time.perf_counter()
+        css = get_arima_fit(data, *order, method="css")
+        css_time += time.perf_counter() - start
+        exact = get_arima_fit(data, *order)
+        exact_time += time.perf_counter() - start
+
+        assert css.params.index.equals(exact.params.index)
+        assert css.predictions.index.equals(exact.predictions.index)
+        assert css.forecast.index.equals(exact.forecast.index)
+        if diff == 0:
+            assert abs(css.aic - exact.aic) / exact.aic < 0.01, order
+            error = (css.forecast - exact.forecast).abs().max()
+            assert error < 0.1 * data.std(), order
+
+    assert css_time < exact_time / 5
+
+
+def test_unknown_fitting_method():
+    with pytest.raises(ValueError):
+        get_arima_fit(create_arma_sample(), method="magic")
+
+
+def test_backtest_origins():
+    assert backtest_origins(100, horizon=10, folds=3).tolist() == [70, 80, 90]
+    assert backtest_origins(100, 10, 3, step=1).tolist() == [88, 89, 90]
+    with pytest.raises(ValueError):
+        backtest_origins(50, horizon=10, folds=3)
+
+
+def test_backtest_matches_forecasts_from_each_origin():
+    data = create_arma_sample(size=200, seed=0)
+    params = get_arima_fit(data.iloc[:158]).params
+    result = backtest(data, horizon=7, folds=3, params=params)
+
+    expected_mae = []
+    for origin in (179, 186, 193):
+        forecast = get_arima_fit(data.iloc[:origin], 1, 0, 1, params, False)
+        errors = data.iloc[origin:origin + 7] - forecast.forecast.iloc[:7]
+        expected_mae.append(errors.abs().mean())
+    assert result.folds["mae"].tolist() == pytest.approx(expected_mae)
+    assert result.folds.index.equals(data.index[[179, 186, 193]])
+    assert result.horizons.index.tolist() == list(range(1, 8))
+
+    rolling = backtest(data, horizon=7, folds=3, window=150, params=params)
+    assert rolling.horizons.shape == (7, 3)
+
+
+@pytest.mark.parametrize(
+    "period, size", [(4, 200), (7, 365), (12, 240), (24, 5000), (168, 20000)]
+)
+def test_detected_periods(period, size):
+    data = seasonal_sample(period, size) + 0.01 * np.arange(size)
+
+    assert detect_period(data.to_numpy()) == period
+
+
+def test_no_period_is_detected_in_noise():
+    for seed in range(5):
+        noise = np.random.default_rng(seed).standard_normal(5000)
+        assert detect_period(noise) is None
+        assert detect_period(noise.cumsum()) is None
+    assert detect_period(np.ones(100)) is None
+
+
+def test_decomposition_periods():
+    hourly = seasonal_sample(24, 1000)
+
+    assert decomposition_periods(hourly) == (24,)
+    assert decomposition_periods(hourly, "stl", 12) == (12,)
+    assert decomposition_periods(hourly, "mstl", 12) == (12, 24, 168)
+    assert decomposition_periods(hourly.iloc[:100], "mstl") == (24,)
+    assert decomposition_periods(seasonal_sample(7, 30, "D"), "mstl") == (7,)
+    with pytest.raises(ValueError):
+        decomposition_periods(hourly.reset_index(drop=True))
+
+
+def test_short_series_are_decomposed_by_stl():
+    data = seasonal_sample(24, 1000)
+    components = decompose(data, (24,))
+    expected = STL(data, period=24, robust=True).fit()
+
+    np.testing.assert_allclose(components.trend, expected.trend)
+    np.testing.assert_allclose(components.seasonal, expected.seasonal)
+    np.testing.assert_allclose(components.resid, expected.resid)
+
+
+@pytest.mark.parametrize("size", [20_000, 200_000])
+def test_long_series_are_decomposed_in_blocks(size):
+    positions = np.arange(size)
+    angles = 2 * np.pi * positions / 24
+    daily = 2 * np.sin(angles) + np.cos(2 * angles)
+    weekly = np.sin(2 * np.pi * positions / 168)
+    data = seasonal_sample(24, size) + weekly + 0.001 * positions
+
+    components = decompose(data, (24, 168))
+
+    assert list(components.columns) == [
+        "trend",
+        "seasonal",
+        "resid",
+        "seasonal_24",
+        "seasonal_168",
+    ]
+    assert not components.isna().any().any()
+    np.testing.assert_allclose(
+        components.trend + components.seasonal + components.resid, data
+    )
+    assert np.abs(components.seasonal_24 - daily).mean() < 0.1
+    assert np.abs(components.seasonal_168 - weekly).mean() < 0.1
@@ -1,5 +1,15 @@
+import tracemalloc
+from base64 import b64decode, b64encode
+
 import pandas as pd
-from ts_app.file_upload import process_upload
+from pandas.api.types import is_datetime64_dtype, is_numeric_dtype
+from ts_app.file_upload import (
+    FREQUENCY_ERROR,
+    NUMBER_ERROR,
+    Base64Reader,
+    process_upload,
+    read_upload,
+)
 
 date_index = pd.date_range("2020-01-01", periods=50)
 
@@ -27,3 +37,105 @@ def test_non_numeric_uploads():
 def test_uploads_without_dates():
     error = process_upload(non_dated_sample)
     assert "could not be read as dates." in error
+
+
+def _as_upload(frame: pd.DataFrame) -> str:
+    """Encode a DataFrame as a CSV data-URL, as given by `dcc.Upload`."""
+    encoded = b64encode(frame.to_csv().encode()).decode()
+    return f"data:text/csv;base64,{encoded}"
+
+
+def _read_with_peak_memory(contents: str) -> tuple:
+    """Read a CSV upload, also getting the peak memory allocated."""
+    tracemalloc.start()
+    try:
+        data, error = read_upload(contents, "test.csv")
+        return data, error, tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+
+def test_base64_reader():
+    raw = bytes(range(256)) * 100
+    reader = Base64Reader(b64encode(raw).decode(), chunk_size=10)
+
+    assert reader.read() == raw
+
+
+def test_csv_upload_reads_numeric_columns():
+    frame = good_sample.assign(other=1.5, label="text")
+    data, error = read_upload(_as_upload(frame), "test.csv")
+
+    assert error is None
+    assert list(data.columns) == ["0", "other"]
+    assert is_datetime64_dtype(data.index)
+
+
+def test_invalid_csv_uploads_fail_fast():
+    frame = pd.DataFrame({"value": range(10_000)}, index=["x"] * 10_000)
+    data, error, peak_memory = _read_with_peak_memory(_as_upload(frame))
+
+    assert data is None
+    assert "could not be read as dates." in error
+    assert peak_memory < 1024**2  # only the preview was parsed
+
+
+def test_csv_upload_peak_memory():
+    size = 200_000
+    frame = pd.DataFrame(
+        {"label": "text", "value": range(size), "note": "more text"},
+        index=pd.date_range("2020-01-01", periods=size, freq="h"),
+    )
+    contents = _as_upload(frame)
+    file_size = len(b64decode(contents.split(",")[1]))
+    data, error, peak_memory = _read_with_peak_memory(contents)
+
+    assert error is None
+    assert len(data) == size
+    assert peak_memory < file_size  # less than a copy of the decoded file
+
+
+def test_csv_upload_reads_day_first_dates():
+    # The preview's dates are ambiguous, but later chunks' aren't
+    frame = pd.DataFrame(
+        {"value": range(1000)},
+        index=pd.date_range("2020-01-01", periods=1000, freq="h"),
+    )
+    strings = frame.set_axis(frame.index.strftime("%d/%m/%Y %H:%M"))
+    data, error = read_upload(_as_upload(strings), "test.csv")
+
+    assert error is None
+    assert data.index.equals(frame.index.rename(None))
+
+
+def test_irregular_dates_after_the_preview_are_rejected():
+    dates = pd.date_range("2020-01-01", periods=1000, freq="h")
+    frame = pd.DataFrame({"value": range(999)}, index=dates.delete(500))
+    data, error = read_upload(_as_upload(frame), "test.csv")
+
+    assert data is None
+    assert error == FREQUENCY_ERROR
+
+
+def test_text_after_the_preview_is_rejected():
+    values = pd.Series(range(1000), dtype=object)
+    values[800] = "n/a?"
+    frame = pd.DataFrame(
+        {"value": values.to_numpy()},
+        index=pd.date_range("2020-01-01", periods=1000, freq="h"),
+    )
+    data, error = read_upload(_as_upload(frame), "test.csv")
+
+    assert data is None
+    assert error == NUMBER_ERROR.format("value")
+
+
+def test_csv_upload_with_repeated_column_names():
+    frame = pd.DataFrame(
+        [[1, "a", 2.5]] * 50, index=date_index, columns=["x", "x", "x"]
+    )
+    data, error = read_upload(_as_upload(frame), "test.csv")
+
+    assert error is None
+    assert list(data.columns) == ["x", "x.2"]
+    assert data.dtypes.map(is_numeric_dtype).all()
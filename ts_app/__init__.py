@@ -1,12 +1,14 @@
 import logging
+import os
+import shutil
 import sys
+import tempfile
 import threading
 import webbrowser
-
-import waitress
+from pathlib import Path
+from typing import Any, Optional
 
 from ts_app.cli import process_cli_args
-from ts_app.dash_app import app
 
 __version__ = "0.9.2"
 
@@ -35,8 +37,30 @@ def custom_hook(type, value, traceback) -> None:
 sys.excepthook = custom_hook
 
 
+def __getattr__(name: str) -> Any:
+    """Import the Dash app when it's first accessed, rather than with the
+    package, so that e.g. `ts_app --help` doesn't load dash and pandas.
+
+    `ts_app.app` is the Dash app, and `ts_app.server` its WSGI app (e.g. for
+    `waitress-serve ts_app:server`).
+    """
+    if name in {"app", "server"}:
+        from ts_app.dash_app import app
+
+        return app if name == "app" else app.server
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
 def run_app(
-    host: str = "localhost", port: int = 8000, launch_browser: bool = True
+    host: str = "localhost",
+    port: int = 8000,
+    launch_browser: bool = True,
+    cache_dir: Optional[str] = None,
+    fit_timeout: float = 60,
+    profile: str = "off",
+    workers: int = 1,
+    threads: int = 4,
+    warm_up: bool = False,
 ) -> None:
     """Start the app server, and launch a web browser to it.
 
@@ -45,10 +69,72 @@ def run_app(
         port (int, optional): TCP port to listen at. Defaults to 8000.
         launch_browser (bool, optional): Whether to launch a web browser to
             view the app. Defaults to True.
+        cache_dir (Optional[str], optional): A folder in which to persist
+            fitted models, datasets, their diagnostics and order search
+            progress. Defaults to None (in-memory only).
+        fit_timeout (float, optional): Seconds to wait for a model to be
+            fitted. Defaults to 60.
+        profile (str, optional): Which requests to profile: "off", "header"
+            (those with an "X-Profile" header) or "all". Defaults to "off".
+        workers (int, optional): Number of server processes. With more than
+            one, processes are forked to share the listening socket, and
+            fitted models, datasets & order searches' progress are shared
+            through `cache_dir` (or a temporary folder). Defaults to 1.
+        threads (int, optional): Request threads per server process.
+            Defaults to 4.
+        warm_up (bool, optional): Whether to fit a sample model in every
+            model-fitting process before serving requests, so that the
+            first requests don't wait for the modelling libraries to load.
+            Defaults to False.
     """
+    import waitress
+    from ts_app.cache import DIAGNOSTICS_CACHE, FIT_CACHE
+    from ts_app.components.modelling import SEARCH_PROGRESS, warm_up_models
+    from ts_app.dash_app import app
+    from ts_app.datasets import DATASETS
+    from ts_app.jobs import JOB_MANAGER
+    from ts_app.prefork import bind_socket, serve_prefork
+
+    temp_dir = None
+    if cache_dir is None and workers > 1:
+        cache_dir = temp_dir = tempfile.mkdtemp(prefix="ts_app-")
+    if cache_dir is not None:
+        FIT_CACHE.set_directory(cache_dir)
+        DATASETS.set_directory(Path(cache_dir) / "datasets")
+        DIAGNOSTICS_CACHE.set_directory(Path(cache_dir) / "diagnostics")
+        SEARCH_PROGRESS.set_directory(Path(cache_dir) / "searches")
+    JOB_MANAGER.timeout = fit_timeout
+    app.server.config["TS_APP_PROFILE"] = profile
+
+    if workers > 1 and not hasattr(os, "fork"):
+        logging.warning("Multiple workers need os.fork; using 1 worker.")
+        workers = 1
+
+    if workers > 1:
+        # Share the CPUs between each worker's model-fitting processes
+        JOB_MANAGER.max_workers = max((os.cpu_count() or 1) // workers, 1)
+        sock = bind_socket(host, port)
+        if launch_browser is True:
+            webbrowser.open(f"{host}:{port}")
+        try:
+            serve_prefork(
+                app.server,
+                sock,
+                workers,
+                threads,
+                on_start=warm_up_models if warm_up else lambda: None,
+                on_exit=JOB_MANAGER.shutdown,
+            )
+        finally:
+            if temp_dir is not None:
+                shutil.rmtree(temp_dir, ignore_errors=True)
+        return
+
+    if warm_up:
+        warm_up_models()
     server_ = threading.Thread(
         target=waitress.serve,
-        kwargs=dict(app=app.server, host=host, port=port),
+        kwargs=dict(app=app.server, host=host, port=port, threads=threads),
     )
     server_.start()
 
@@ -56,6 +142,7 @@ def run_app(
         webbrowser.open(f"{host}:{port}")
 
     server_.join()
+    JOB_MANAGER.shutdown()
 
 
 def _run_in_cli() -> None:
@@ -68,4 +155,10 @@ def _run_in_cli() -> None:
         host=args.host.split("://")[-1],
         port=args.port,
         launch_browser=not args.no_browser,  # True if `no_browser` is not set
+        cache_dir=args.cache_dir,
+        fit_timeout=args.fit_timeout,
+        profile=args.profile,
+        workers=args.workers,
+        threads=args.threads,
+        warm_up=args.warm_up,
     )
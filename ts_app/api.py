@@ -0,0 +1,313 @@
+import io
+import json
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+from ts_app.dates import infer_frequency
+from ts_app.export import EXPORT_FORMATS, PYARROW_INSTALLED, PYARROW_MESSAGE
+from ts_app.file_upload import DATE_ERROR, process_upload
+from ts_app.ts_functions import (
+    DECOMPOSITION_METHODS,
+    FORECAST_HORIZON,
+    MAX_HORIZON,
+    ArimaFit,
+    normalise_seasonal_order,
+)
+
+CSV_TYPE = "text/csv"
+JSON_TYPE = "application/json"
+ARROW_TYPE = "application/vnd.apache.arrow.stream"
+
+
+class RequestError(ValueError):
+    """Raised when an API request can't be read. `status` is the HTTP status
+    code to respond with.
+    """
+
+    def __init__(self, message: str, status: int = 400) -> None:
+        super().__init__(message)
+        self.status = status
+
+
+def _read_arrow(body: bytes) -> pd.DataFrame:
+    """Read an Arrow IPC stream into a DataFrame, using its pandas index if
+    it has one, or its first column otherwise.
+    """
+    try:
+        import pyarrow as pa
+    except ImportError:
+        raise RequestError(
+            "Arrow requests need pyarrow: pip install ts-app[arrow]", 415
+        ) from None
+
+    try:
+        frame = pa.ipc.open_stream(body).read_pandas()
+        if not isinstance(frame.index, pd.DatetimeIndex):
+            frame = frame.set_index(frame.columns[0])
+    except (pa.ArrowException, OSError, IndexError, ValueError) as error:
+        raise RequestError(
+            f"The Arrow stream couldn't be read: {error}"
+        ) from None
+    return frame
+
+
+def _read_json(body: bytes) -> Dict[str, pd.Series]:
+    """Read columnar JSON: {"series": {name: {"index": [...], "values":
+    [...]}}}.
+    """
+    try:
+        series = json.loads(body)["series"]
+        return {
+            str(name): pd.Series(
+                column["values"], index=column["index"], dtype="float64"
+            )
+            for name, column in series.items()
+        }
+    except (AttributeError, KeyError, TypeError, ValueError):
+        raise RequestError(
+            'Expected {"series": {name: {"index": [...], "values": [...]}}}.'
+        ) from None
+
+
+def parse_series(body: bytes, content_type: str) -> Dict[str, pd.Series]:
+    """Read one or more series from an API request's body, validating each
+    as an uploaded file would be. Series in a CSV or Arrow table share one
+    date index, which is parsed and validated once.
+
+    Args:
+        body (bytes): The request body.
+        content_type (str): The body's media type: CSV_TYPE (dates in the
+            first column), JSON_TYPE or ARROW_TYPE (dates in the pandas
+            index, or the first column).
+
+    Raises:
+        RequestError: If the media type is unsupported (status 415), or the
+            body is invalid (status 400).
+
+    Returns:
+        Dict[str, pandas.Series]: The numeric series, by name. There's at
+        least one.
+    """
+    media_type = content_type.split(";")[0].strip().lower()
+    if media_type == JSON_TYPE:
+        frames = [
+            data.to_frame(name) for name, data in _read_json(body).items()
+        ]
+    elif media_type == CSV_TYPE:
+        try:
+            frames = [pd.read_csv(io.BytesIO(body), index_col=0)]
+        except (ValueError, pd.errors.ParserError) as error:
+            raise RequestError(f"The CSV couldn't be read: {error}") from None
+    elif media_type == ARROW_TYPE:
+        frames = [_read_arrow(body)]
+    else:
+        raise RequestError(
+            f"Send the series as {CSV_TYPE}, {JSON_TYPE} or {ARROW_TYPE}.",
+            415,
+        )
+    if not frames:
+        raise RequestError("The request has no series.")
+
+    series = {}
+    for frame in frames:
+        try:
+            error = process_upload(frame)
+        except (TypeError, ValueError):
+            error = DATE_ERROR
+        if error is not None:
+            names = ", ".join(map(str, frame.columns))
+            raise RequestError(f"{names}: {error}")
+        frame.index = pd.DatetimeIndex(
+            frame.index, freq=infer_frequency(frame.index)
+        )
+        numeric = frame.select_dtypes(include="number").astype("float64")
+        series.update((str(name), data) for name, data in numeric.items())
+    if not series:
+        raise RequestError("The request has no numeric series.")
+    return series
+
+
+def _dates(index: pd.Index) -> List[str]:
+    """Format dates as ISO 8601 strings, or positions as integers."""
+    if isinstance(index, pd.DatetimeIndex):
+        return np.datetime_as_string(index.to_numpy(), unit="s").tolist()
+    return index.tolist()
+
+
+def _values(values: pd.Series) -> List[Optional[float]]:
+    """Get values as a list, with null in place of NaN (invalid in JSON)."""
+    array = values.to_numpy(dtype="float64")
+    return np.where(np.isnan(array), None, array).tolist()
+
+
+def encode_series(data: pd.Series) -> dict:
+    """Encode a series in a compact columnar form.
+
+    Args:
+        data (pandas.Series): The series.
+
+    Returns:
+        dict: The series' "index" and "values" lists.
+    """
+    return {"index": _dates(data.index), "values": _values(data)}
+
+
+def encode_forecast(
+    fit: ArimaFit, components: Optional[pd.DataFrame] = None
+) -> dict:
+    """Encode a series' model results for an API response.
+
+    Args:
+        fit (ArimaFit): The fitted model's outputs.
+        components (Optional[pandas.DataFrame], optional): The series'
+            seasonal decomposition, if requested. Defaults to None.
+
+    Returns:
+        dict: The information criteria, parameters, predictions, forecast,
+        its prediction intervals by coverage (e.g. "95%"), whose bounds are
+        aligned with the forecast, and (optionally) the decomposition, whose
+        columns are aligned with the input series. Neither has an index of
+        its own.
+    """
+    result = {
+        "aic": float(fit.aic),
+        "bic": float(fit.bic),
+        "params": {name: float(value) for name, value in fit.params.items()},
+        "predictions": encode_series(fit.predictions),
+        "forecast": encode_series(fit.forecast),
+    }
+    if fit.intervals is not None:
+        result["intervals"] = {
+            f"{100 * (1 - alpha):g}%": {
+                "lower": _values(fit.intervals[alpha, "lower"]),
+                "upper": _values(fit.intervals[alpha, "upper"]),
+            }
+            for alpha in fit.intervals.columns.unique("alpha")
+        }
+    if components is not None:
+        result["decomposition"] = {
+            name: _values(values) for name, values in components.items()
+        }
+    return result
+
+
+def parse_order(args: Dict[str, str]) -> Tuple[int, int, int]:
+    """Read the model order from query parameters "ar", "diff" and "ma".
+
+    Args:
+        args (Dict[str, str]): The query parameters.
+
+    Raises:
+        RequestError: If an order isn't an integer from 0 to 5.
+
+    Returns:
+        Tuple[int, int, int]: The AR, differencing and MA orders, defaulting
+        to (1, 0, 1).
+    """
+    order = []
+    for name, default in (("ar", 1), ("diff", 0), ("ma", 1)):
+        value = args.get(name, str(default))
+        if not value.isdigit() or int(value) > 5:
+            raise RequestError(f"{name!r} should be an integer from 0 to 5.")
+        order.append(int(value))
+    return tuple(order)
+
+
+def parse_horizon(args: Dict[str, str]) -> int:
+    """Read the forecast horizon from the query parameter "horizon".
+
+    Args:
+        args (Dict[str, str]): The query parameters.
+
+    Raises:
+        RequestError: If the horizon isn't an integer from 1 to MAX_HORIZON.
+
+    Returns:
+        int: The number of periods to forecast, defaulting to
+        FORECAST_HORIZON.
+    """
+    value = args.get("horizon", str(FORECAST_HORIZON))
+    if not value.isdigit() or not 1 <= int(value) <= MAX_HORIZON:
+        raise RequestError(
+            f"'horizon' should be an integer from 1 to {MAX_HORIZON}."
+        )
+    return int(value)
+
+
+def parse_seasonal_order(args: Dict[str, str]) -> Tuple[int, int, int, int]:
+    """Read the seasonal order from query parameters "sar", "sdiff", "sma"
+    and "period".
+
+    Args:
+        args (Dict[str, str]): The query parameters.
+
+    Raises:
+        RequestError: If a seasonal order isn't an integer from 0 to 2, the
+            period isn't a non-negative integer, or there's seasonal
+            differencing at a period modelled with Fourier terms.
+
+    Returns:
+        Tuple[int, int, int, int]: The seasonal AR, differencing and MA
+        orders and the period, or NO_SEASON if there are no seasonal terms
+        (the default).
+    """
+    order = []
+    for name in ("sar", "sdiff", "sma"):
+        value = args.get(name, "0")
+        if not value.isdigit() or int(value) > 2:
+            raise RequestError(f"{name!r} should be an integer from 0 to 2.")
+        order.append(int(value))
+    period = args.get("period", "0")
+    if not period.isdigit():
+        raise RequestError("'period' should be a non-negative integer.")
+    try:
+        return normalise_seasonal_order((*order, int(period)))
+    except ValueError as error:
+        raise RequestError(str(error)) from None
+
+
+def parse_decomposition(args: Dict[str, str]) -> Optional[str]:
+    """Read the decomposition method from the query parameter "decompose".
+
+    Args:
+        args (Dict[str, str]): The query parameters.
+
+    Raises:
+        RequestError: If it isn't 0, 1 or a decomposition method.
+
+    Returns:
+        Optional[str]: The method, defaulting to "classical" (also for 1),
+        or None for 0 (no decomposition).
+    """
+    value = args.get("decompose", "1").lower()
+    if value == "0":
+        return None
+    if value == "1":
+        return "classical"
+    if value not in DECOMPOSITION_METHODS:
+        methods = ", ".join(DECOMPOSITION_METHODS)
+        raise RequestError(f"'decompose' should be 0, 1 or one of: {methods}.")
+    return value
+
+
+def parse_export_format(args: Dict[str, str]) -> str:
+    """Read the export format from the query parameter "format".
+
+    Args:
+        args (Dict[str, str]): The query parameters.
+
+    Raises:
+        RequestError: If the format is unknown (status 400), or needs
+            pyarrow, which isn't installed (status 406).
+
+    Returns:
+        str: "csv" (the default), "parquet" or "arrow".
+    """
+    value = args.get("format", "csv").lower()
+    if value not in EXPORT_FORMATS:
+        formats = ", ".join(EXPORT_FORMATS)
+        raise RequestError(f"'format' should be one of: {formats}.")
+    if value != "csv" and not PYARROW_INSTALLED:
+        raise RequestError(PYARROW_MESSAGE, 406)
+    return value
@@ -0,0 +1,44 @@
+// Stream large files to the server as-is, rather than base64-encoding them
+// in the browser (as dcc.Upload does), then store the resulting dataset ID.
+async function uploadLargeFile(file) {
+	const showInfo = (message, color) => {
+		dash_clientside.set_props("file-info", {
+			children: message,
+			style: { color: color },
+		});
+	};
+
+	showInfo(`Uploading ${file.name}...`, "#555");
+	try {
+		const response = await fetch(
+			`/upload-large?filename=${encodeURIComponent(file.name)}`,
+			{ method: "POST", body: file }
+		);
+		const result = await response.json();
+		if (!response.ok) {
+			showInfo(result.error, "orangered");
+			return;
+		}
+		showInfo(`Analysing ${file.name}`, "#31bf2c");
+		dash_clientside.set_props("file-upload-store", { data: result });
+		dash_clientside.set_props("batch-table", { data: [] });
+	} catch (error) {
+		showInfo("There was an error processing the file.", "orangered");
+	}
+}
+
+// The button is rendered by Dash, so listen for clicks on the document
+document.addEventListener("click", (event) => {
+	if (event.target.id !== "large-file-upload") {
+		return;
+	}
+	const input = document.createElement("input");
+	input.type = "file";
+	input.accept = ".csv,.xls,.xlsx";
+	input.addEventListener("change", () => {
+		if (input.files.length > 0) {
+			uploadLargeFile(input.files[0]);
+		}
+	});
+	input.click();
+});
@@ -0,0 +1,611 @@
+import hashlib
+import logging
+import os
+import pickle
+import sys
+import threading
+from collections import OrderedDict
+from concurrent.futures import Executor, wait
+from pathlib import Path
+from typing import (
+    TYPE_CHECKING,
+    Any,
+    Callable,
+    Dict,
+    Hashable,
+    List,
+    Optional,
+    Sequence,
+    Tuple,
+    Union,
+)
+
+import numpy as np
+import pandas as pd
+from ts_app.ts_functions import (
+    FORECAST_HORIZON,
+    NO_SEASON,
+    ArimaFit,
+    Diagnostics,
+    decompose,
+    decomposition_periods,
+    detect_period,
+    diagnose,
+    extend_forecast,
+    get_arima_fit,
+    normalise_seasonal_order,
+    truncate_forecast,
+)
+
+if TYPE_CHECKING:
+    from statsmodels.tsa.seasonal import DecomposeResult
+
+logger = logging.getLogger(__name__)
+
+
+def data_key(data: pd.Series) -> str:
+    """Get a content hash of a series' values and index.
+
+    Args:
+        data (pandas.Series): The data to hash.
+
+    Returns:
+        str: A hex digest that changes whenever the values, dates or date
+        frequency change.
+    """
+    digest = _index_digest(data.index)
+    digest.update(np.ascontiguousarray(data.to_numpy(dtype="float64")))
+    return digest.hexdigest()
+
+
+def column_keys(data: pd.DataFrame) -> List[str]:
+    """Get the `data_key` of each column of a DataFrame, hashing their
+    shared index once.
+
+    Args:
+        data (pandas.DataFrame): The data to hash.
+
+    Returns:
+        List[str]: Each column's hex digest, in order.
+    """
+    index_digest = _index_digest(data.index)
+    keys = []
+    for _, values in data.items():
+        digest = index_digest.copy()
+        digest.update(np.ascontiguousarray(values.to_numpy(dtype="float64")))
+        keys.append(digest.hexdigest())
+    return keys
+
+
+def _index_digest(index: pd.Index) -> "hashlib.blake2b":
+    """Start a content hash with an index's dates and date frequency."""
+    digest = hashlib.blake2b(digest_size=16)
+    digest.update(np.ascontiguousarray(index.asi8))
+    digest.update(str(getattr(index, "freqstr", None)).encode())
+    return digest
+
+
+def _sizeof(value: Any) -> int:
+    """Estimate the memory held by a cached value, in bytes."""
+    if isinstance(value, (pd.Series, pd.DataFrame)):
+        return int(np.sum(value.memory_usage(index=True)))
+    elif isinstance(value, np.ndarray):
+        return value.nbytes
+    elif isinstance(value, (tuple, list)):
+        return sum(_sizeof(item) for item in value)
+    elif isinstance(value, dict):
+        return sum(_sizeof(item) for item in value.values())
+    return sys.getsizeof(value)
+
+
+class LRUCache:
+    """A thread-safe least-recently-used cache, bounded by the approximate
+    memory held by its values.
+
+    Entries can also be written to a local directory, so that they outlive
+    the process (e.g. across worker restarts).
+
+    Args:
+        max_bytes (int, optional): Approximate memory limit. Defaults to
+            64MiB.
+        directory (Optional[Union[str, Path]], optional): A folder in which
+            to persist entries. Defaults to None (memory only).
+    """
+
+    def __init__(
+        self,
+        max_bytes: int = 1024**2 * 64,
+        directory: Optional[Union[str, Path]] = None,
+    ) -> None:
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._sizes = {}
+        self._bytes = 0  # the sum of `_sizes`
+        self._lock = threading.RLock()
+        self.directory = None
+        if directory is not None:
+            self.set_directory(directory)
+
+    def __contains__(self, key: Hashable) -> bool:
+        with self._lock:
+            if key in self._entries:
+                return True
+        return self.directory is not None and self._path(key).exists()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    @property
+    def current_bytes(self) -> int:
+        """Approximate memory held by in-memory entries."""
+        return self._bytes
+
+    @property
+    def stats(self) -> dict:
+        """Hit/miss counters and current usage."""
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "entries": len(self),
+            "bytes": self.current_bytes,
+            "max_bytes": self.max_bytes,
+        }
+
+    def set_directory(self, directory: Union[str, Path]) -> None:
+        """Persist entries to the given folder, creating it if necessary.
+
+        Args:
+            directory (Union[str, Path]): The cache folder.
+        """
+        self.directory = Path(directory)
+        self.directory.mkdir(parents=True, exist_ok=True)
+
+    def _path(self, key: Hashable) -> Path:
+        return self.directory / f"{key}.pkl"
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        """Get a cached value, and mark it as recently used.
+
+        Args:
+            key (Hashable): The entry's key.
+            default (Any, optional): Returned if the key is absent. Defaults
+                to None.
+
+        Returns:
+            Any: The cached value, or `default`.
+        """
+        found, value = self._lookup(key)
+        with self._lock:
+            if found:
+                self.hits += 1
+            else:
+                self.misses += 1
+        return value if found else default
+
+    def peek(self, key: Hashable, default: Any = None) -> Any:
+        """Get a cached value without counting a hit or miss, e.g. for
+        opportunistic lookups of related entries.
+
+        Args:
+            key (Hashable): The entry's key.
+            default (Any, optional): Returned if the key is absent. Defaults
+                to None.
+
+        Returns:
+            Any: The cached value, or `default`.
+        """
+        found, value = self._lookup(key)
+        return value if found else default
+
+    def _lookup(self, key: Hashable) -> Tuple[bool, Any]:
+        with self._lock:
+            if key in self._entries:
+                self._entries.move_to_end(key)
+                return True, self._entries[key]
+
+        if self.directory is not None and (path := self._path(key)).exists():
+            try:
+                with open(path, "rb") as file:
+                    value = pickle.load(file)
+            except (OSError, EOFError, pickle.UnpicklingError) as error:
+                logger.warning("Could not read cache file %s: %s", path, error)
+            else:
+                self._store(key, value)
+                return True, value
+        return False, None
+
+    def put(self, key: Hashable, value: Any) -> None:
+        """Add a value to the cache, evicting the least recently used entries
+        if the memory limit is exceeded.
+
+        Args:
+            key (Hashable): The entry's key.
+            value (Any): The value to cache.
+        """
+        self._store(key, value)
+
+        if self.directory is not None:
+            path = self._path(key)
+            temp_path = path.with_suffix(f".{os.getpid()}.tmp")
+            try:
+                with open(temp_path, "wb") as file:
+                    pickle.dump(value, file, protocol=pickle.HIGHEST_PROTOCOL)
+                os.replace(temp_path, path)  # atomic, for concurrent workers
+            except OSError as error:
+                logger.warning("Couldn't write cache file %s: %s", path, error)
+
+    def _store(self, key: Hashable, value: Any) -> None:
+        with self._lock:
+            self._entries[key] = value
+            self._entries.move_to_end(key)
+            self._bytes -= self._sizes.get(key, 0)
+            self._sizes[key] = _sizeof(value)
+            self._bytes += self._sizes[key]
+
+            # Always keep the newest entry, even if it exceeds the limit
+            while len(self._entries) > 1 and self._bytes > self.max_bytes:
+                oldest, _ = self._entries.popitem(last=False)
+                self._bytes -= self._sizes.pop(oldest)
+
+    def clear(self) -> None:
+        """Remove all in-memory entries, and reset the counters."""
+        with self._lock:
+            self._entries.clear()
+            self._sizes.clear()
+            self._bytes = 0
+            self.hits = self.misses = 0
+
+
+FIT_CACHE = LRUCache(directory=os.environ.get("TS_APP_CACHE_DIR"))
+
+# Appending more than this fraction of new observations re-estimates the
+# parameters of a cached fit, rather than reusing them
+APPEND_REFIT_FRACTION = 0.1
+# Number of earlier lengths remembered for each series
+SERIES_HISTORY_SIZE = 8
+
+
+def fit_key(
+    data: pd.Series,
+    ar_order: int = 1,
+    diff: int = 0,
+    ma_order: int = 1,
+    seasonal_order: Sequence[int] = NO_SEASON,
+) -> str:
+    """Get the fit cache key for a model of the given order on the data."""
+    return _fit_key(data_key(data), ar_order, diff, ma_order, seasonal_order)
+
+
+def _fit_key(
+    key: str,
+    ar_order: int,
+    diff: int,
+    ma_order: int,
+    seasonal_order: Sequence[int] = NO_SEASON,
+) -> str:
+    # Non-seasonal keys are unchanged from before seasonal orders existed
+    seasonal_order = normalise_seasonal_order(seasonal_order)
+    if seasonal_order == NO_SEASON:
+        return f"arima-{key}-{ar_order}-{diff}-{ma_order}"
+    seasonal = "-".join(map(str, seasonal_order))
+    return f"arima-{key}-{ar_order}-{diff}-{ma_order}-s{seasonal}"
+
+
+def _series_key(data: pd.Series) -> str:
+    """Get a key shared by a series and any extension of it: a hash of its
+    first few observations and its date frequency.
+    """
+    return f"series-{data_key(data.iloc[:16])}"
+
+
+def warm_start(
+    data: pd.Series,
+    ar_order: int = 1,
+    diff: int = 0,
+    ma_order: int = 1,
+    seasonal_order: Sequence[int] = NO_SEASON,
+) -> Tuple[Optional[pd.Series], bool]:
+    """Find fitted parameters in the fit cache from which to start fitting
+    a model, and remember the data as a possible prefix of later series.
+
+    If the data extends a series fitted with the same order, that fit's
+    parameters are used, and only re-estimated if the number of new
+    observations exceeds `APPEND_REFIT_FRACTION` of the earlier length.
+    Otherwise, a fit on the same data with the AR or MA order one step away
+    is used, or for a seasonal model, the non-seasonal model of the same
+    order (whose seasonal coefficients start at zero).
+
+    Args:
+        data (pandas.Series): The data to model, with a DatetimeIndex.
+        ar_order (int, optional): AR order. Defaults to 1.
+        diff (int, optional): Differencing order. Defaults to 0.
+        ma_order (int, optional): MA order. Defaults to 1.
+        seasonal_order (Sequence[int], optional): Seasonal AR, differencing
+            and MA orders, and the period. Defaults to NO_SEASON.
+
+    Returns:
+        Tuple[Optional[pandas.Series], bool]: The starting parameters (None
+        if no similar model was found), and whether to re-estimate them.
+    """
+    key, series_key = data_key(data), _series_key(data)
+    history = dict(FIT_CACHE.peek(series_key, {}))
+    start_params, refit = None, True
+
+    # Earlier versions of the series, longest first
+    for length in sorted(history, reverse=True):
+        if length >= len(data) or history[length] != data_key(
+            data.iloc[:length]
+        ):
+            continue
+        earlier = _fit_key(
+            history[length], ar_order, diff, ma_order, seasonal_order
+        )
+        if (fit := FIT_CACHE.peek(earlier)) is not None:
+            start_params = fit.params
+            refit = len(data) - length > APPEND_REFIT_FRACTION * length
+            break
+
+    if start_params is None:
+        neighbours = [
+            (ar_order - 1, ma_order, seasonal_order),
+            (ar_order + 1, ma_order, seasonal_order),
+            (ar_order, ma_order - 1, seasonal_order),
+            (ar_order, ma_order + 1, seasonal_order),
+            (ar_order, ma_order, NO_SEASON),
+        ]
+        for ar, ma, seasonal in neighbours:
+            if ar >= 0 and ma >= 0 and (
+                fit := FIT_CACHE.peek(_fit_key(key, ar, diff, ma, seasonal))
+            ) is not None:
+                start_params = fit.params
+                break
+
+    if history.get(len(data)) != key:
+        history[len(data)] = key
+        for length in sorted(history)[:-SERIES_HISTORY_SIZE]:
+            del history[length]
+        FIT_CACHE.put(series_key, history)
+    return start_params, refit
+
+
+def cached_forecast(
+    key: str, horizon: int = FORECAST_HORIZON
+) -> Optional[ArimaFit]:
+    """Get a fit from the fit cache with a forecast of `horizon` periods.
+
+    Fits are cached by data and order, not horizon, with the longest
+    forecast requested so far. A shorter forecast is a slice of it, and a
+    longer one extends it by only the extra periods (see
+    `extend_forecast`), and replaces it in the cache.
+
+    Args:
+        key (str): The fit's key, from `fit_key`.
+        horizon (int, optional): Periods to forecast. Defaults to
+            FORECAST_HORIZON.
+
+    Returns:
+        Optional[ArimaFit]: The fit, or None if it isn't cached, or can't be
+        extended (e.g. it was cached before forecasts could be).
+    """
+    if (fit := FIT_CACHE.get(key)) is None:
+        return None
+    if len(fit.forecast) < horizon:
+        if fit.state is None:
+            return None
+        fit = extend_forecast(fit, horizon)
+        FIT_CACHE.put(key, fit)
+    return truncate_forecast(fit, horizon)
+
+
+def cached_arima_fit(
+    data: pd.Series,
+    ar_order: int = 1,
+    diff: int = 0,
+    ma_order: int = 1,
+    horizon: int = FORECAST_HORIZON,
+    seasonal_order: Sequence[int] = NO_SEASON,
+) -> ArimaFit:
+    """Get an ARIMA model's results from the fit cache, fitting the model
+    only if the data and order haven't been seen before. New fits are
+    warm-started from similar cached fits (see `warm_start`).
+
+    Args:
+        data (pandas.Series): The data to model, with a DatetimeIndex.
+        ar_order (int, optional): AR order. Defaults to 1.
+        diff (int, optional): Differencing order. Defaults to 0.
+        ma_order (int, optional): MA order. Defaults to 1.
+        horizon (int, optional): Periods to forecast. Defaults to
+            FORECAST_HORIZON.
+        seasonal_order (Sequence[int], optional): Seasonal AR, differencing
+            and MA orders, and the period. Defaults to NO_SEASON.
+
+    Returns:
+        ArimaFit: Predictions, forecast and fitted parameters.
+    """
+    key = fit_key(data, ar_order, diff, ma_order, seasonal_order)
+
+    if (fit := cached_forecast(key, horizon)) is None:
+        start_params, refit = warm_start(
+            data, ar_order, diff, ma_order, seasonal_order
+        )
+        fit = get_arima_fit(
+            data,
+            ar_order,
+            diff,
+            ma_order,
+            start_params,
+            refit,
+            horizon=horizon,
+            seasonal_order=seasonal_order,
+        )
+        FIT_CACHE.put(key, fit)
+    return fit
+
+
+def cached_arima_fits(
+    columns: Dict[str, pd.Series],
+    ar_order: int,
+    diff: int,
+    ma_order: int,
+    executor: Executor,
+    timeout: Optional[float] = None,
+    horizon: int = FORECAST_HORIZON,
+    seasonal_order: Sequence[int] = NO_SEASON,
+    on_timeout: Optional[Callable[[], None]] = None,
+) -> Dict[str, Optional[ArimaFit]]:
+    """Fit the same ARIMA order on several series in parallel, reusing and
+    filling the fit cache. New fits are warm-started, as in
+    `cached_arima_fit`.
+
+    Args:
+        columns (Dict[str, pandas.Series]): The series to model, by name.
+        ar_order (int): AR order.
+        diff (int): Differencing order.
+        ma_order (int): MA order.
+        executor (concurrent.futures.Executor): An executor to fit in, e.g.
+            a job manager's session executor.
+        timeout (Optional[float], optional): Seconds to wait for the fits.
+            Defaults to None (no limit).
+        horizon (int, optional): Periods to forecast. Defaults to
+            FORECAST_HORIZON.
+        seasonal_order (Sequence[int], optional): Seasonal AR, differencing
+            and MA orders, and the period. Defaults to NO_SEASON.
+        on_timeout (Optional[Callable[[], None]], optional): Called if some
+            fits took too long, e.g. to expire the job manager session.
+            Defaults to None.
+
+    Returns:
+        Dict[str, Optional[ArimaFit]]: Each series' fit, in the same order,
+        or None if fitting it failed, was cancelled or took too long.
+    """
+    fits, pending = {}, {}
+    for name, data in columns.items():
+        key = fit_key(data, ar_order, diff, ma_order, seasonal_order)
+        if (fit := cached_forecast(key, horizon)) is not None:
+            fits[name] = fit
+            continue
+        start_params, refit = warm_start(
+            data, ar_order, diff, ma_order, seasonal_order
+        )
+        future = executor.submit(
+            get_arima_fit,
+            data,
+            ar_order,
+            diff,
+            ma_order,
+            start_params,
+            refit,
+            horizon=horizon,
+            seasonal_order=seasonal_order,
+        )
+        pending[future] = (name, key)
+
+    done, not_done = wait(pending, timeout=timeout)
+    for future in not_done:
+        future.cancel()
+    if not_done and on_timeout is not None:
+        on_timeout()
+    for future, (name, key) in pending.items():
+        fits[name] = None
+        if future not in done or future.cancelled():
+            continue
+        if (error := future.exception()) is None:
+            fits[name] = future.result()
+            FIT_CACHE.put(key, fits[name])
+        else:
+            logger.warning("Couldn't fit %r: %s", name, error)
+    return {name: fits[name] for name in columns}
+
+
+DECOMPOSITION_CACHE = LRUCache(max_bytes=1024**2 * 16)
+
+
+def seasonal_decompose(
+    data: pd.Series, period: Optional[int] = None
+) -> "DecomposeResult":
+    """Run statsmodels' `seasonal_decompose`, importing it on first use."""
+    from statsmodels.tsa.seasonal import seasonal_decompose
+
+    return seasonal_decompose(data, period=period)
+
+
+def cached_decomposition(
+    data: pd.Series, method: str = "classical"
+) -> pd.DataFrame:
+    """Get the seasonal decomposition of the data, computing it only once
+    per dataset and method.
+
+    The seasonal period is the one detected in the data (see
+    `cached_period`), or if none is found, the default for the data's
+    frequency (e.g. 7 for daily data). MSTL also decomposes by the
+    calendar's periods (see `decomposition_periods`).
+
+    Args:
+        data (pandas.Series): The data to decompose, with a DatetimeIndex.
+        method (str, optional): "classical" (moving averages), "stl" or
+            "mstl". Defaults to "classical".
+
+    Returns:
+        pandas.DataFrame: The "trend", "seasonal" and "resid" components,
+        and for MSTL with several periods, each period's seasonal component.
+    """
+    key = f"decomposition-{data_key(data)}"
+    if method != "classical":
+        key = f"{method}-{key}"
+
+    if (components := DECOMPOSITION_CACHE.get(key)) is None:
+        if method == "classical":
+            result = seasonal_decompose(data, cached_period(data) or None)
+            components = pd.DataFrame(
+                {
+                    "trend": result.trend,
+                    "seasonal": result.seasonal,
+                    "resid": result.resid,
+                }
+            )
+        else:
+            periods = decomposition_periods(data, method, cached_period(data))
+            components = decompose(data, periods)
+        DECOMPOSITION_CACHE.put(key, components)
+    return components
+
+
+DIAGNOSTICS_CACHE = LRUCache(max_bytes=1024**2 * 4)
+
+
+def cached_diagnostics(data: pd.Series) -> Diagnostics:
+    """Get the data's autocorrelations and stationarity tests after each
+    differencing order, computing them only once per dataset.
+
+    Args:
+        data (pandas.Series): The data to diagnose.
+
+    Returns:
+        Diagnostics: The ACF, PACF and ADF and KPSS test results.
+    """
+    key = f"diagnostics-{data_key(data)}"
+
+    if (diagnostics := DIAGNOSTICS_CACHE.get(key)) is None:
+        diagnostics = diagnose(data)
+        DIAGNOSTICS_CACHE.put(key, diagnostics)
+    return diagnostics
+
+
+def cached_period(data: pd.Series) -> int:
+    """Get the data's seasonal period (see `detect_period`), detecting it
+    only once per dataset.
+
+    Args:
+        data (pandas.Series): The data.
+
+    Returns:
+        int: The period, or 0 if none was detected.
+    """
+    key = f"period-{data_key(data)}"
+
+    if (period := DIAGNOSTICS_CACHE.get(key)) is None:
+        period = detect_period(data.to_numpy(dtype="float64")) or 0
+        DIAGNOSTICS_CACHE.put(key, period)
+    return period
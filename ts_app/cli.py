@@ -27,4 +27,50 @@ def process_cli_args() -> None:
         action="store_true",
         help="Avoid openning a browser tab or window.",
     )
+    parser.add_argument(
+        "--cache-dir",
+        default=None,
+        help=(
+            "A folder in which to persist fitted models and datasets, so"
+            " they can be reused after a restart (default: in-memory only)."
+        ),
+    )
+    parser.add_argument(
+        "--fit-timeout",
+        default=60,
+        type=float,
+        help="Seconds to wait for a model fit (default: %(default)s).",
+    )
+    parser.add_argument(
+        "--workers",
+        default=1,
+        type=int,
+        help=(
+            "Number of server processes, sharing fitted models and datasets"
+            " through the cache folder (default: %(default)s)."
+        ),
+    )
+    parser.add_argument(
+        "--threads",
+        default=4,
+        type=int,
+        help="Request threads per server process (default: %(default)s).",
+    )
+    parser.add_argument(
+        "--warm-up",
+        action="store_true",
+        help=(
+            "Fit a sample model in each model-fitting process before serving"
+            " requests."
+        ),
+    )
+    parser.add_argument(
+        "--profile",
+        default="off",
+        choices=["off", "header", "all"],
+        help=(
+            "Log a cProfile summary of every request ('all'), or of requests"
+            " with an 'X-Profile' header ('header') (default: %(default)s)."
+        ),
+    )
     return parser.parse_args()
@@ -0,0 +1,246 @@
+from functools import partial
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+from uuid import uuid4
+
+import pandas as pd
+from dash import Input, Output, State, callback, dash_table, dcc, html
+from dash.exceptions import PreventUpdate
+from ts_app.cache import cached_arima_fits, cached_forecast, fit_key
+from ts_app.datasets import DATASETS
+from ts_app.jobs import JOB_MANAGER
+from ts_app.metrics import size_label, span
+from ts_app.ts_functions import FORECAST_HORIZON, ArimaFit
+
+batch_forecast_component = html.Div(
+    id="batch-forecast",
+    className="batch-forecast",
+    style={"display": "none"},
+    children=[
+        html.H3("All columns"),
+        html.Button(
+            "Forecast all columns",
+            id="batch-run",
+            className="button auto-button",
+            title="Fit the chosen model order on every numeric column",
+        ),
+        html.P(id="batch-status", className="model-status"),
+        dash_table.DataTable(
+            id="batch-table",
+            columns=[
+                {"name": "Column", "id": "column"},
+                {"name": "AIC", "id": "aic", "type": "numeric"},
+                {"name": "Next value", "id": "next", "type": "numeric"},
+                {"name": "Last forecast", "id": "last", "type": "numeric"},
+            ],
+            data=[],
+            row_selectable="single",
+            sort_action="native",
+            page_size=10,
+            style_table={"overflowX": "auto"},
+            style_cell={"fontSize": "0.8rem", "padding": "2px 4px"},
+        ),
+        html.Button(
+            "Download forecasts",
+            id="batch-download-button",
+            className="button auto-button",
+            title="Download the forecasts of every fitted column as CSV",
+        ),
+        dcc.Download(id="batch-download"),
+    ],
+)
+
+
+def _load_columns(upload: Optional[dict]) -> Dict[str, pd.Series]:
+    """Get an upload's columns from the dataset store, skipping any that
+    have expired.
+    """
+    columns = {}
+    for name, dataset_id in (upload or {}).get("columns", {}).items():
+        if (data := DATASETS.get(dataset_id)) is not None:
+            columns[name] = data
+    return columns
+
+
+def summarise_fits(fits: Dict[str, Optional[ArimaFit]]) -> List[dict]:
+    """Get a row of summary-table data per fitted series.
+
+    Args:
+        fits (Dict[str, Optional[ArimaFit]]): Each series' fit, by name.
+
+    Returns:
+        List[dict]: The series' name, AIC, and first and last forecast
+        values (blank if the fit failed).
+    """
+    rows = []
+    for name, fit in fits.items():
+        row = {"column": name, "aic": None, "next": None, "last": None}
+        if fit is not None:
+            row.update(
+                aic=round(float(fit.aic), 2),
+                next=round(float(fit.forecast.iloc[0]), 4),
+                last=round(float(fit.forecast.iloc[-1]), 4),
+            )
+        rows.append(row)
+    return rows
+
+
+@callback(
+    Output("batch-forecast", "style"),
+    Input("file-upload-store", "data"),
+)
+def show_batch_forecast(upload: Optional[dict]) -> dict:
+    """Only offer batch forecasting for files with several numeric columns.
+
+    Args:
+        upload (Optional[dict]): Uploaded data, if any.
+
+    Returns:
+        dict: The batch section's style.
+    """
+    if len((upload or {}).get("columns", {})) > 1:
+        return {}
+    return {"display": "none"}
+
+
+@callback(
+    [Output("batch-table", "data"), Output("batch-status", "children")],
+    Input("batch-run", "n_clicks"),
+    [
+        State("model-ar", "value"),
+        State("model-diff", "value"),
+        State("model-ma", "value"),
+        State("file-upload-store", "data"),
+        State("model-horizon", "value"),
+        State("session-id", "data"),
+    ],
+    running=[(Output("batch-run", "disabled"), True, False)],
+    prevent_initial_call=True,
+)
+def run_batch_forecast(
+    _,
+    ar_order: int,
+    diff_order: int,
+    ma_order: int,
+    upload: Optional[dict],
+    horizon: Optional[int] = FORECAST_HORIZON,
+    session_id: Optional[str] = None,
+) -> Tuple[List[dict], str]:
+    """Fit the chosen model order on every numeric column of the uploaded
+    file, and summarise the results.
+
+    The fits run through the job manager, as one request of the session,
+    which the session's next batch forecast supersedes.
+
+    Args:
+        ar_order (int): AR order.
+        diff_order (int): Differencing order.
+        ma_order (int): MA order.
+        upload (Optional[dict]): Uploaded data, if any.
+        horizon (Optional[int], optional): Periods to forecast. Defaults to
+            FORECAST_HORIZON.
+        session_id (Optional[str], optional): The browser session's
+            identifier. Defaults to None.
+
+    Returns:
+        Tuple[List[dict], str]: Summary-table rows, and a status message.
+    """
+    if not (columns := _load_columns(upload)):
+        raise PreventUpdate
+    job_session = f"{session_id or uuid4().hex}:batch"
+    executor = JOB_MANAGER.session_executor(job_session)
+    with span("run_batch_forecast.fit", columns=size_label(len(columns))):
+        fits = cached_arima_fits(
+            columns,
+            ar_order,
+            diff_order,
+            ma_order,
+            executor,
+            JOB_MANAGER.timeout,
+            horizon or FORECAST_HORIZON,
+            on_timeout=partial(JOB_MANAGER.expire, job_session),
+        )
+
+    failed = sum(fit is None for fit in fits.values())
+    message = (
+        f"ARIMA({ar_order}, {diff_order}, {ma_order}) fitted on"
+        f" {len(fits) - failed} of {len(fits)} columns."
+        " Select a row to analyse that column."
+    )
+    return summarise_fits(fits), message
+
+
+@callback(
+    Output("file-upload-store", "data", allow_duplicate=True),
+    Input("batch-table", "selected_rows"),
+    [State("batch-table", "data"), State("file-upload-store", "data")],
+    prevent_initial_call=True,
+)
+def select_batch_column(
+    selected_rows: Optional[List[int]],
+    rows: List[dict],
+    upload: Optional[dict],
+) -> dict:
+    """Analyse the column selected in the summary table.
+
+    Args:
+        selected_rows (Optional[List[int]]): The selected row's position.
+        rows (List[dict]): The summary table's rows.
+        upload (Optional[dict]): Uploaded data, if any.
+
+    Returns:
+        dict: The upload's information, pointing at the selected column.
+    """
+    if not selected_rows or upload is None:
+        raise PreventUpdate
+    column = rows[selected_rows[0]]["column"]
+    if (dataset_id := upload.get("columns", {}).get(column)) is None:
+        raise PreventUpdate
+    return {**upload, "dataset_id": dataset_id, "column": column}
+
+
+@callback(
+    Output("batch-download", "data"),
+    Input("batch-download-button", "n_clicks"),
+    [
+        State("model-ar", "value"),
+        State("model-diff", "value"),
+        State("model-ma", "value"),
+        State("file-upload-store", "data"),
+        State("model-horizon", "value"),
+    ],
+    prevent_initial_call=True,
+)
+def download_batch_forecast(
+    _,
+    ar_order: int,
+    diff_order: int,
+    ma_order: int,
+    upload: Optional[dict],
+    horizon: Optional[int] = FORECAST_HORIZON,
+) -> dict:
+    """Download the forecasts of every column already fitted with the
+    chosen order, as one CSV file, without fitting any models.
+
+    Args:
+        ar_order (int): AR order.
+        diff_order (int): Differencing order.
+        ma_order (int): MA order.
+        upload (Optional[dict]): Uploaded data, if any.
+        horizon (Optional[int], optional): Periods to forecast. Defaults to
+            FORECAST_HORIZON.
+
+    Returns:
+        dict: The CSV file, for `dcc.Download`.
+    """
+    forecasts, horizon = {}, horizon or FORECAST_HORIZON
+    for name, data in _load_columns(upload).items():
+        key = fit_key(data, ar_order, diff_order, ma_order)
+        if (fit := cached_forecast(key, horizon)) is not None:
+            forecasts[name] = fit.forecast
+    if not forecasts:
+        raise PreventUpdate
+
+    frame = pd.DataFrame(forecasts)
+    filename = f"{Path(upload['filename']).stem}-forecasts.csv"
+    return dcc.send_data_frame(frame.to_csv, filename, index_label="date")
@@ -1,12 +1,65 @@
-from io import StringIO
-from typing import Optional, Tuple
+import logging
+import os
+import re
+import threading
+import time
+from concurrent.futures import CancelledError, wait
+from concurrent.futures import TimeoutError as FutureTimeoutError
+from functools import lru_cache
+from typing import Optional, Tuple, Union
+from urllib.parse import urlencode
+from uuid import uuid4
 
 import pandas as pd
-import plotly.graph_objs as go
-from dash import Input, Output, callback, dcc, html
-from statsmodels.tsa.api import seasonal_decompose
+from dash import Input, Output, Patch, State, callback, dcc, html, no_update
+from dash.exceptions import PreventUpdate
 from ts_app import plotting
-from ts_app.ts_functions import create_arma_sample, fit_arima_model
+from ts_app.cache import (
+    FIT_CACHE,
+    cached_decomposition,
+    cached_diagnostics,
+    cached_forecast,
+    cached_period,
+    data_key,
+    fit_key,
+    warm_start,
+)
+from ts_app.datasets import DATASETS
+from ts_app.downsampling import (
+    DEFAULT_MAX_POINTS,
+    downsample,
+    downsample_window,
+)
+from ts_app.export import (
+    EXPORT_FORMATS,
+    PYARROW_INSTALLED,
+    dump_model,
+    export_filename,
+    model_description,
+    model_label,
+)
+from ts_app.jobs import (
+    JOB_MANAGER,
+    JobCancelled,
+    JobTimeout,
+    ProgressStore,
+)
+from ts_app.metrics import size_label, span
+from ts_app.samples import SAMPLE_BANK, SAMPLE_SIZE
+from ts_app.ts_functions import (
+    FORECAST_HORIZON,
+    MAX_HORIZON,
+    backtest,
+    backtest_origins,
+    decomposition_periods,
+    get_arima_fit,
+    normalise_seasonal_order,
+    search_arima_orders,
+    significance_bound,
+    suggest_order,
+)
+
+logger = logging.getLogger(__name__)
 
 model_param_input = html.Div(
     id="model-params",
@@ -43,11 +96,137 @@ model_param_input = html.Div(
             value=1,
             options=[{"label": f"{i}", "value": i} for i in range(6)],
         ),
+        # Seasonal order dropdowns, and the seasonal period
+        html.Label("Seasonal AR Order", htmlFor="model-seasonal-ar"),
+        dcc.Dropdown(
+            id="model-seasonal-ar",
+            clearable=False,
+            placeholder="Seasonal AR order",
+            searchable=False,
+            value=0,
+            options=[{"label": f"{i}", "value": i} for i in range(3)],
+        ),
+        html.Label(
+            "Seasonal Differencing Order", htmlFor="model-seasonal-diff"
+        ),
+        dcc.Dropdown(
+            id="model-seasonal-diff",
+            clearable=False,
+            placeholder="Seasonal differencing",
+            searchable=False,
+            value=0,
+            options=[{"label": f"{i}", "value": i} for i in range(3)],
+        ),
+        html.Label("Seasonal MA Order", htmlFor="model-seasonal-ma"),
+        dcc.Dropdown(
+            id="model-seasonal-ma",
+            clearable=False,
+            placeholder="Seasonal MA order",
+            searchable=False,
+            value=0,
+            options=[{"label": f"{i}", "value": i} for i in range(3)],
+        ),
+        html.Label("Seasonal period", htmlFor="model-period"),
+        dcc.Input(
+            id="model-period",
+            type="number",
+            min=0,
+            step=1,
+            value=0,
+            debounce=True,
+            placeholder="Periods per season, or 0 for none",
+        ),
+        html.Label("Forecast horizon", htmlFor="model-horizon"),
+        dcc.Input(
+            id="model-horizon",
+            type="number",
+            min=1,
+            max=MAX_HORIZON,
+            step=1,
+            value=FORECAST_HORIZON,
+            debounce=True,
+            placeholder=f"Periods to forecast, up to {MAX_HORIZON}",
+        ),
+        html.Button(
+            "Auto",
+            id="model-auto",
+            className="button auto-button",
+            title="Search for the model order with the lowest AIC",
+        ),
+        html.Button(
+            "Backtest",
+            id="model-backtest",
+            className="button auto-button",
+            title="Measure forecast errors from several past origins",
+        ),
+        dcc.RadioItems(
+            id="backtest-window",
+            options=[
+                {"label": "Expanding window", "value": "expanding"},
+                {"label": "Rolling window", "value": "rolling"},
+            ],
+            value="expanding",
+            className="model-status",
+        ),
+        # Export formats, and downloads of the fitted model's outputs
+        html.Label("Export format", htmlFor="export-format"),
+        dcc.Dropdown(
+            id="export-format",
+            clearable=False,
+            searchable=False,
+            options=[
+                {"label": "CSV", "value": "csv"},
+                {
+                    "label": "Parquet",
+                    "value": "parquet",
+                    "disabled": not PYARROW_INSTALLED,
+                },
+                {
+                    "label": "Arrow",
+                    "value": "arrow",
+                    "disabled": not PYARROW_INSTALLED,
+                },
+            ],
+            value="csv",
+        ),
+        html.A(
+            "Download forecast",
+            id="export-forecast",
+            className="button auto-button",
+            title="Download the data, predictions, forecast and decomposition",
+        ),
+        html.Button(
+            "Download model",
+            id="export-model",
+            className="button auto-button",
+            title="Download the fitted model, to forecast without refitting",
+        ),
+        dcc.Download(id="model-download"),
+        html.P(id="model-status", className="model-status"),
+        dcc.Interval(id="status-interval", interval=500, disabled=True),
+        dcc.Interval(id="search-interval", interval=1000, disabled=True),
     ],
 )
 
-seasonal_decomposition_plot = dcc.Loading(
-    dcc.Graph(id="component-plots"), color="#777"
+# Seasonal decomposition methods, by name
+DECOMPOSITION_NAMES = {"stl": "STL", "mstl": "MSTL", "classical": "Classical"}
+DEFAULT_DECOMPOSITION = "stl"
+
+seasonal_decomposition_plot = html.Div(
+    className="decomposition",
+    children=[
+        dcc.RadioItems(
+            id="decomposition-method",
+            options=[
+                {"label": name, "value": method}
+                for method, name in DECOMPOSITION_NAMES.items()
+            ],
+            value=DEFAULT_DECOMPOSITION,
+            inline=True,
+            className="model-status",
+        ),
+        dcc.Loading(dcc.Graph(id="component-plots"), color="#777"),
+    ],
 )
 
 forecast_line_plot = dcc.Loading(
@@ -55,6 +234,20 @@ forecast_line_plot = dcc.Loading(
         id="line-plot", config={"toImageButtonOptions": {"format": "svg"}}
     ),
     color="#777",
+    # Keep the quick preview visible while the exact model is fitted
+    overlay_style={"visibility": "visible", "opacity": 0.6},
+)
+
+backtest_plot = dcc.Loading(
+    dcc.Graph(id="backtest-plot", style={"display": "none"}), color="#777"
+)
+
+diagnostics_panel = html.Div(
+    className="diagnostics",
+    children=[
+        dcc.Loading(dcc.Graph(id="diagnostics-plot"), color="#777"),
+        dcc.Markdown(id="diagnostics-summary", className="guide"),
+    ],
 )
 
 EXPLANATORY_TEXT = """
@@ -62,16 +255,25 @@ EXPLANATORY_TEXT = """
 
 Graphs reveal the [trend](/glossary#Trend) in the data, and help assess the
 **goodness of fit**. In general, a good model should reasonably replicate the
-behaviour of the historical data.
+behaviour of the historical data. The shaded bands around the forecast are
+its 80% and 95% [prediction intervals](/glossary#Prediction-interval).
 
 Graphs also help discover [seasonal](/glossary#Seasonality) and
 [cyclic patterns](/glossary#Cyclic-patterns). These usually manifest as
 occasional peaks or troughs.
 
+The decomposition above separates the trend and seasonal pattern by
+[STL][7] (robust to outliers) by default, or by MSTL, which also separates the
+calendar's seasons (e.g. daily and weekly patterns in hourly data). Long
+series are decomposed at a coarser resolution, which keeps it quick. The
+classical decomposition by moving averages is also available, though its
+trend and residuals are missing at either end.
+
 [Autocorrelation][1] and [Partial-Autocorrelation][2] plots can provide hints
 on a potentially suitable model to start with. [This article][3] describes how.
 Testing for [stationarity][4], and filtering out seasonal & trend effects is
-an essential first step.
+an essential first step. The correlograms above show the data differenced by
+the chosen order, and the table shows stationarity tests for every order.
 
 [1]: https://en.wikipedia.org/wiki/Autocorrelation
 [2]: https://en.wikipedia.org/wiki/Partial_autocorrelation_function
@@ -80,8 +282,45 @@ and_partial_autocorrelation_plots
 [4]: https://cran.r-project.org/web/packages/TSTutorial/vignettes/Stationary\
 .pdf
 
+The seasonal orders add [seasonal](/glossary#Seasonality) terms at multiples
+of the seasonal period, which is detected from the data when it's loaded. For
+periods longer than 12 (e.g. 24 for hourly data), the seasonal terms are
+replaced by a fixed seasonal pattern of sine and cosine waves, which is much
+quicker to fit. Any seasonal AR or MA order then gives that same pattern, and
+seasonal differencing isn't available.
+
+The **Auto** button fits candidate models in parallel, and picks the order with
+the lowest [AIC][5].
+
+[5]: https://en.wikipedia.org/wiki/Akaike_information_criterion
+
+The **Backtest** button measures the model's forecast errors by
+[rolling-origin cross-validation][6]: forecasting from several past dates
+using only the data before them, and comparing with what followed. The
+training data either grows with each origin (expanding window), or keeps a
+fixed length (rolling window).
+
+The **Download forecast** button exports the data, the model's predictions,
+forecast and prediction intervals, and the decomposition as a CSV, Parquet or
+Arrow file. **Download model** saves the fitted model, which can be loaded with
+`ts_app.export.load_model` to forecast further without refitting.
+
+[6]: https://otexts.com/fpp3/tscv.html
+[7]: https://otexts.com/fpp3/stl.html
+
 """
 
+EXPIRED_DATA_MESSAGE = (
+    "The data is no longer available. Please upload the file, or generate"
+    " the sample, again."
+)
+
+SEARCH_TIMEOUT_MESSAGE = "The search stopped: a model took too long to fit."
+
+# Each session's latest order search ID (by session ID), and each search's
+# progress (by search ID)
+SEARCH_PROGRESS = ProgressStore()
+
 footer_buttons = html.Div(
     [
         html.A("Back to home", href="/", className="button"),
@@ -111,6 +350,7 @@ def generate_layout(input_source: html.Div) -> html.Div:
                 className="side-bar",
                 children=[
                     html.Div(input_source, id="data-source"),
+                    dcc.Store(id="session-id", storage_type="session"),
                     dcc.Store(id="sample-data-store"),
                     dcc.Store(id="file-upload-store"),
                     model_param_input,
@@ -124,6 +364,8 @@ def generate_layout(input_source: html.Div) -> html.Div:
                     html.Div(
                         [
                             forecast_line_plot,
+                            backtest_plot,
+                            diagnostics_panel,
                             dcc.Markdown(EXPLANATORY_TEXT, className="guide"),
                             footer_buttons,
                         ],
@@ -135,10 +377,105 @@ def generate_layout(input_source: html.Div) -> html.Div:
     )
 
 
+def _load_data(
+    input_source: str, sample: Optional[dict], upload: Optional[dict]
+) -> Tuple[Optional[pd.Series], str]:
+    """Get the data to analyse from the dataset store, and a description of
+    its source.
+
+    Args:
+        input_source (str): The data source.
+        sample (Optional[dict]): Stored sample information, if any.
+        upload (Optional[dict]): Uploaded file information, if any.
+
+    Returns:
+        Tuple[Optional[pandas.Series], str]: The data (None if it has expired
+        from the dataset store), and its file name/description.
+    """
+    if input_source == "/upload" and upload is not None:
+        filename = upload["filename"]
+        if len(upload.get("columns", ())) > 1:
+            filename = f"{filename} ({upload['column']})"
+        data = DATASETS.get(upload["dataset_id"])
+    elif input_source == "/sample" and sample is not None:
+        filename = sample["filename"]
+        data = DATASETS.get(sample["dataset_id"])
+    else:
+        filename = "a random sample"
+        data = _default_sample()
+
+    return data, filename
+
+
+def _seasonal_order(
+    seasonal_ar: int, seasonal_diff: int, seasonal_ma: int, period: int
+) -> Tuple[int, int, int, int]:
+    """Normalise the seasonal order inputs (see `normalise_seasonal_order`),
+    leaving the output as it is if they're unsupported: `model_and_predict`
+    reports why.
+    """
+    try:
+        return normalise_seasonal_order(
+            (seasonal_ar, seasonal_diff, seasonal_ma, period or 0)
+        )
+    except ValueError:
+        raise PreventUpdate
+
+
+@lru_cache(maxsize=1)
+def _default_sample() -> pd.Series:
+    """Get a sample to display before any data is provided. It's seeded, so
+    that every plot (and every server process) shows the same data. It's
+    pinned in the dataset store, so that exports can find it by its ID.
+    """
+    sample = SAMPLE_BANK.get()
+    DATASETS.put(sample, pinned=True)
+    return sample
+
+
+def warm_up_models() -> None:
+    """Load the modelling libraries, in this process and in each of the job
+    manager's worker processes, by decomposing and fitting the default
+    sample.
+    """
+    start = time.perf_counter()
+    SAMPLE_BANK.precompute(range(1, 5), range(1, 5), SAMPLE_SIZE)
+    sample = _default_sample()
+    cached_decomposition(sample, DEFAULT_DECOMPOSITION)
+    workers = JOB_MANAGER.max_workers or os.cpu_count() or 1
+    executor = JOB_MANAGER.session_executor("warm-up")
+    wait([executor.submit(get_arima_fit, sample) for _ in range(workers)])
+    logger.info(
+        "Warmed up %d model-fitting processes in %.1fs",
+        workers,
+        time.perf_counter() - start,
+    )
+
+
+@callback(
+    Output("session-id", "data"),
+    Input("current-page", "pathname"),
+    State("session-id", "data"),
+)
+def set_session_id(_, session_id: Optional[str]) -> str:
+    """Assign an identifier to each browser session, used to supersede
+    stale model-fitting jobs.
+
+    Args:
+        session_id (Optional[str]): The current identifier, if any.
+
+    Returns:
+        str: A new random identifier.
+    """
+    if session_id is not None:
+        raise PreventUpdate
+    return uuid4().hex
+
+
 @callback(
     [
         Output("line-plot", "figure"),
-        Output("component-plots", "figure"),
+        Output("model-status", "children"),
     ],
     [
         Input("model-ar", "value"),
@@ -147,7 +484,14 @@ def generate_layout(input_source: html.Div) -> html.Div:
         Input("current-page", "pathname"),
         Input("sample-data-store", "data"),
         Input("file-upload-store", "data"),
+        Input("model-horizon", "value"),
+        Input("model-seasonal-ar", "value"),
+        Input("model-seasonal-diff", "value"),
+        Input("model-seasonal-ma", "value"),
+        Input("model-period", "value"),
     ],
+    State("session-id", "data"),
+    running=[(Output("status-interval", "disabled"), False, True)],
 )
 def model_and_predict(
     ar_order: int,
@@ -156,10 +500,22 @@ def model_and_predict(
     input_source: str,
     sample: Optional[dict],
     upload: Optional[dict],
-) -> Tuple[go.Figure, go.Figure]:
+    horizon: Optional[int] = FORECAST_HORIZON,
+    seasonal_ar: int = 0,
+    seasonal_diff: int = 0,
+    seasonal_ma: int = 0,
+    period: Optional[int] = 0,
+    session_id: Optional[str] = None,
+) -> Tuple[dict, str]:
     """Fit an ARIMA model each time model parameters or input data are
     modified, then plot the results.
 
+    Models not found in the fit cache are fitted in a worker process,
+    warm-started from a similar cached fit if possible, and any stale job
+    from the same session is cancelled. Meanwhile, `preview_model` shows a
+    quick approximate fit. Lengthening the horizon of a cached fit only
+    forecasts the extra periods.
+
     Args:
         ar_order (int): AR order.
         diff_order (int): Differencing order.
@@ -167,44 +523,986 @@ def model_and_predict(
         input_source (str): The data source.
         sample (Optional[dict]): Stored sample data, if any.
         upload (Optional[dict]): Uploaded data, if any.
+        horizon (Optional[int], optional): Periods to forecast, or None
+            while the input is invalid. Defaults to FORECAST_HORIZON.
+        seasonal_ar (int, optional): Seasonal AR order. Defaults to 0.
+        seasonal_diff (int, optional): Seasonal differencing order.
+            Defaults to 0.
+        seasonal_ma (int, optional): Seasonal MA order. Defaults to 0.
+        period (Optional[int], optional): Seasonal period, or None while
+            the input is empty (no seasonal terms). Defaults to 0.
+        session_id (Optional[str]): The browser session's identifier.
 
     Returns:
-        Tuple[Figure, Figure]: A line-plot of the forecast results, and
-        subplots with seasonal decomposition estimates.
+        Tuple[dict, str]: A serialised line-plot of the forecast results, and
+        a status message.
     """
+    if horizon is None:
+        raise PreventUpdate
+    with span("model_and_predict.load_data"):
+        data, filename = _load_data(input_source, sample, upload)
+    if data is None:
+        return no_update, EXPIRED_DATA_MESSAGE
+    size = size_label(len(data))
+    order = f"{ar_order}-{diff_order}-{ma_order}"
+    try:
+        seasonal_order = normalise_seasonal_order(
+            (seasonal_ar, seasonal_diff, seasonal_ma, period or 0)
+        )
+    except ValueError as error:
+        return no_update, str(error)
+    key = fit_key(data, ar_order, diff_order, ma_order, seasonal_order)
 
-    if input_source == "/upload" and upload is not None:
-        filename = upload["filename"]
-        data = pd.read_json(
-            StringIO(upload["data"]), orient="index", typ="series"
+    with span("model_and_predict.fit", size=size, order=order) as labels:
+        labels["source"] = "cache"
+        if (fit := cached_forecast(key, horizon)) is None:
+            labels["source"] = "worker"
+            start_params, refit = warm_start(
+                data, ar_order, diff_order, ma_order, seasonal_order
+            )
+            job = JOB_MANAGER.submit(
+                session_id or uuid4().hex,
+                get_arima_fit,
+                data,
+                ar_order,
+                diff_order,
+                ma_order,
+                start_params,
+                refit,
+                horizon=horizon,
+                seasonal_order=seasonal_order,
+            )
+            try:
+                fit = JOB_MANAGER.result(job)
+            except JobCancelled:
+                raise PreventUpdate  # A newer request will update the plot
+            except JobTimeout:
+                return (
+                    no_update,
+                    "Model fitting took too long. Please try a lower order.",
+                )
+            FIT_CACHE.put(key, fit)
+
+    with span("model_and_predict.plot", size=size, order=order):
+        line_plot = plotting.plot_forecast(
+            actual_data=data,
+            predictions=fit.predictions,
+            forecast=fit.forecast,
+            intervals=fit.intervals,
+            model_info=model_description(
+                (ar_order, diff_order, ma_order), seasonal_order
+            ),
+            file_name=filename,
         )
-    elif input_source == "/sample" and sample is not None:
-        filename = sample["filename"]
-        data = pd.read_json(
-            StringIO(sample["data"]), orient="index", typ="series"
+    with span("model_and_predict.serialise", size=size, order=order):
+        return plotting.serialise_figure(line_plot), ""
+
+
+@callback(
+    Output("line-plot", "figure", allow_duplicate=True),
+    [
+        Input("model-ar", "value"),
+        Input("model-diff", "value"),
+        Input("model-ma", "value"),
+        Input("current-page", "pathname"),
+        Input("sample-data-store", "data"),
+        Input("file-upload-store", "data"),
+        Input("model-horizon", "value"),
+        Input("model-seasonal-ar", "value"),
+        Input("model-seasonal-diff", "value"),
+        Input("model-seasonal-ma", "value"),
+        Input("model-period", "value"),
+    ],
+    prevent_initial_call=True,
+)
+def preview_model(
+    ar_order: int,
+    diff_order: int,
+    ma_order: int,
+    input_source: str,
+    sample: Optional[dict],
+    upload: Optional[dict],
+    horizon: Optional[int] = FORECAST_HORIZON,
+    seasonal_ar: int = 0,
+    seasonal_diff: int = 0,
+    seasonal_ma: int = 0,
+    period: Optional[int] = 0,
+) -> dict:
+    """Plot a quick conditional sum-of-squares fit while `model_and_predict`
+    waits for the exact fit, which replaces it once ready.
+
+    Args:
+        ar_order (int): AR order.
+        diff_order (int): Differencing order.
+        ma_order (int): MA order.
+        input_source (str): The data source.
+        sample (Optional[dict]): Stored sample data, if any.
+        upload (Optional[dict]): Uploaded data, if any.
+        horizon (Optional[int], optional): Periods to forecast, or None
+            while the input is invalid. Defaults to FORECAST_HORIZON.
+        seasonal_ar (int, optional): Seasonal AR order. Defaults to 0.
+        seasonal_diff (int, optional): Seasonal differencing order.
+            Defaults to 0.
+        seasonal_ma (int, optional): Seasonal MA order. Defaults to 0.
+        period (Optional[int], optional): Seasonal period, or None while
+            the input is empty (no seasonal terms). Defaults to 0.
+
+    Returns:
+        dict: A serialised line-plot of the approximate forecast.
+    """
+    data, filename = _load_data(input_source, sample, upload)
+    if data is None or horizon is None:
+        raise PreventUpdate
+    seasonal_order = _seasonal_order(
+        seasonal_ar, seasonal_diff, seasonal_ma, period
+    )
+    key = fit_key(data, ar_order, diff_order, ma_order, seasonal_order)
+    if key in FIT_CACHE:
+        raise PreventUpdate  # The exact fit is ready, or almost
+    size = size_label(len(data))
+    order = f"{ar_order}-{diff_order}-{ma_order}"
+
+    with span("preview_model.fit", size=size, order=order):
+        fit = get_arima_fit(
+            data,
+            ar_order,
+            diff_order,
+            ma_order,
+            method="css",
+            horizon=horizon,
+            seasonal_order=seasonal_order,
         )
-    else:
-        filename = "a random sample"
-        data = create_arma_sample()
+    with span("preview_model.plot", size=size, order=order):
+        line_plot = plotting.plot_forecast(
+            actual_data=data,
+            predictions=fit.predictions,
+            forecast=fit.forecast,
+            intervals=fit.intervals,
+            model_info="approximate "
+            + model_description(
+                (ar_order, diff_order, ma_order), seasonal_order
+            ),
+            file_name=filename,
+        )
+    if key in FIT_CACHE:
+        raise PreventUpdate  # Don't replace the exact fit's plot
+    return plotting.serialise_figure(line_plot)
+
+
+@callback(
+    Output("model-status", "children", allow_duplicate=True),
+    Input("status-interval", "n_intervals"),
+    State("session-id", "data"),
+    prevent_initial_call=True,
+)
+def show_job_status(_, session_id: Optional[str]) -> str:
+    """Periodically report the progress of a session's model-fitting job
+    while it's pending.
+
+    Args:
+        session_id (Optional[str]): The browser session's identifier.
+
+    Returns:
+        str: A progress message.
+    """
+    if session_id is None:
+        raise PreventUpdate
+    return JOB_MANAGER.status(session_id)
+
+
+@callback(
+    Output("component-plots", "figure"),
+    [
+        Input("current-page", "pathname"),
+        Input("sample-data-store", "data"),
+        Input("file-upload-store", "data"),
+        Input("decomposition-method", "value"),
+    ],
+)
+def plot_decomposition(
+    input_source: str,
+    sample: Optional[dict],
+    upload: Optional[dict],
+    method: str = DEFAULT_DECOMPOSITION,
+) -> dict:
+    """Plot seasonal decomposition estimates each time the input data or
+    decomposition method is modified. This is independent of the model
+    parameters, so changing the model order doesn't recompute it. The
+    seasonal period is the one detected in the data, if any, and is shown
+    in the seasonal plot's title with the calendar's periods decomposed by
+    MSTL.
+
+    Args:
+        input_source (str): The data source.
+        sample (Optional[dict]): Stored sample data, if any.
+        upload (Optional[dict]): Uploaded data, if any.
+        method (str, optional): "stl", "mstl" or "classical". Defaults to
+            DEFAULT_DECOMPOSITION.
+
+    Returns:
+        dict: Serialised subplots with seasonal decomposition estimates.
+    """
+    with span("plot_decomposition.load_data"):
+        data, filename = _load_data(input_source, sample, upload)
+    if data is None:
+        raise PreventUpdate
+    size = size_label(len(data))
+    with span("plot_decomposition.decompose", size=size, method=method):
+        components = cached_decomposition(data, method)
+
+    period = cached_period(data)
+    if method != "classical":
+        period = decomposition_periods(data, method, period)
+    with span("plot_decomposition.plot", size=size):
+        component_subplots = plotting.plot_ts_components(
+            trend=components.trend,
+            seasonal=components.seasonal,
+            residuals=components.resid,
+            file_name=filename,
+            period=period,
+            method=DECOMPOSITION_NAMES.get(method),
+        )
+    with span("plot_decomposition.serialise", size=size):
+        return plotting.serialise_figure(component_subplots)
+
+
+@callback(
+    Output("model-period", "value"),
+    [
+        Input("current-page", "pathname"),
+        Input("sample-data-store", "data"),
+        Input("file-upload-store", "data"),
+    ],
+)
+def detect_seasonal_period(
+    input_source: str, sample: Optional[dict], upload: Optional[dict]
+) -> int:
+    """Pre-fill the seasonal period with the one detected in the data, each
+    time the input data is modified. It's detected once per dataset, and
+    shared with the decomposition plots.
+
+    Args:
+        input_source (str): The data source.
+        sample (Optional[dict]): Stored sample data, if any.
+        upload (Optional[dict]): Uploaded data, if any.
+
+    Returns:
+        int: The detected period, or 0 if there's none.
+    """
+    data, _ = _load_data(input_source, sample, upload)
+    if data is None:
+        raise PreventUpdate
+    with span("detect_seasonal_period.detect", size=size_label(len(data))):
+        return cached_period(data)
+
+
+def _diagnostics_summary(tests: pd.DataFrame, diff_order: int) -> str:
+    """Get a Markdown table of stationarity test results by differencing
+    order, with the chosen order in bold.
+    """
+    rows = [
+        "| Differences | ADF p-value | KPSS p-value | Stationary |",
+        "|:-:|:-:|:-:|:-:|",
+    ]
+    for diff, (adf, kpss, _) in tests.iterrows():
+        stationary = "yes" if adf < 0.05 and kpss >= 0.05 else "no"
+        cells = [str(diff), f"{adf:.3f}", f"{kpss:.3f}", stationary]
+        if diff == diff_order:
+            cells = [f"**{cell}**" for cell in cells]
+        rows.append(f"| {' | '.join(cells)} |")
+    return "\n".join(rows)
+
+
+@callback(
+    [
+        Output("diagnostics-plot", "figure"),
+        Output("diagnostics-summary", "children"),
+    ],
+    [
+        Input("model-diff", "value"),
+        Input("current-page", "pathname"),
+        Input("sample-data-store", "data"),
+        Input("file-upload-store", "data"),
+    ],
+)
+def show_diagnostics(
+    diff_order: int,
+    input_source: str,
+    sample: Optional[dict],
+    upload: Optional[dict],
+) -> Tuple[dict, str]:
+    """Plot the ACF and PACF of the data differenced by the chosen order,
+    and tabulate stationarity tests, with a suggested model order.
+
+    The diagnostics of every differencing order are computed once per
+    dataset, so changing the order only redraws them.
+
+    Args:
+        diff_order (int): Differencing order.
+        input_source (str): The data source.
+        sample (Optional[dict]): Stored sample data, if any.
+        upload (Optional[dict]): Uploaded data, if any.
+
+    Returns:
+        Tuple[dict, str]: Serialised correlograms, and a Markdown summary.
+    """
+    data, filename = _load_data(input_source, sample, upload)
+    if data is None:
+        raise PreventUpdate
+    with span("show_diagnostics.diagnose", size=size_label(len(data))):
+        diagnostics = cached_diagnostics(data)
+    if diff_order not in diagnostics.tests.index:
+        return no_update, (
+            f"The data can't be differenced {diff_order} times: too few"
+            " values would be left."
+        )
+
+    figure = plotting.plot_correlograms(
+        acf=diagnostics.acf[diff_order].dropna(),
+        pacf=diagnostics.pacf[diff_order].dropna(),
+        bound=significance_bound(diagnostics.tests.at[diff_order, "size"]),
+        diff=diff_order,
+        file_name=filename,
+    )
+    summary = _diagnostics_summary(diagnostics.tests, diff_order)
+    if (order := suggest_order(diagnostics)) is not None:
+        summary += (
+            f"\n\nThe tests and correlograms suggest starting with an"
+            f" ARIMA{order} model."
+        )
+    return plotting.serialise_figure(figure), summary
+
+
+def _run_order_search(data: pd.Series, session_id: str, search: str) -> None:
+    """Search for the best model order, caching each fitted candidate and
+    saving the best one found so far in SEARCH_PROGRESS.
+
+    The search stops when the session starts another search, whether in this
+    server process (whose job manager cancels the search's fits) or another.
+
+    Args:
+        data (pandas.Series): The data to model.
+        session_id (str): The browser session's identifier.
+        search (str): The search's ID.
+    """
+    job_session = f"{session_id}:search"
+    progress = {"order": None, "aic": None, "fitted": 0, "done": False}
+    try:
+        for result in search_arima_orders(
+            data,
+            executor=JOB_MANAGER.session_executor(job_session),
+            timeout=JOB_MANAGER.timeout,
+        ):
+            FIT_CACHE.put(fit_key(data, *result.order), result.fit)
+            progress["fitted"] += 1
+            if progress["aic"] is None or result.aic < progress["aic"]:
+                progress.update(order=list(result.order), aic=result.aic)
+            if SEARCH_PROGRESS.get(session_id) != {"search": search}:
+                break
+            SEARCH_PROGRESS.put(search, progress)
+    except TimeoutError:
+        JOB_MANAGER.expire(job_session)
+        progress["timed_out"] = True
+    finally:
+        progress["done"] = True
+        if SEARCH_PROGRESS.get(session_id) == {"search": search}:
+            SEARCH_PROGRESS.put(search, progress)
+        else:
+            SEARCH_PROGRESS.pop(search)  # superseded
+
+
+@callback(
+    [
+        Output("search-interval", "disabled"),
+        Output("model-status", "children", allow_duplicate=True),
+    ],
+    Input("model-auto", "n_clicks"),
+    [
+        State("current-page", "pathname"),
+        State("sample-data-store", "data"),
+        State("file-upload-store", "data"),
+        State("session-id", "data"),
+    ],
+    prevent_initial_call=True,
+)
+def start_order_search(
+    _,
+    input_source: str,
+    sample: Optional[dict],
+    upload: Optional[dict],
+    session_id: Optional[str],
+) -> Tuple[bool, str]:
+    """Start searching for a suitable model order in the background,
+    cancelling any earlier search from the same session.
+
+    Args:
+        input_source (str): The data source.
+        sample (Optional[dict]): Stored sample data, if any.
+        upload (Optional[dict]): Uploaded data, if any.
+        session_id (Optional[str]): The browser session's identifier.
+
+    Returns:
+        Tuple[bool, str]: Whether to stop polling for progress, and a status
+        message.
+    """
+    if session_id is None:
+        raise PreventUpdate
+    data, _ = _load_data(input_source, sample, upload)
+    if data is None:
+        return True, EXPIRED_DATA_MESSAGE
+
+    search = uuid4().hex
+    SEARCH_PROGRESS.put(
+        search, {"order": None, "aic": None, "fitted": 0, "done": False}
+    )
+    SEARCH_PROGRESS.put(session_id, {"search": search})
+    threading.Thread(
+        target=_run_order_search,
+        args=(data, session_id, search),
+        daemon=True,
+    ).start()
+
+    return False, "Searching for a suitable model order..."
+
+
+@callback(
+    [
+        Output("model-ar", "value"),
+        Output("model-diff", "value"),
+        Output("model-ma", "value"),
+        Output("model-status", "children", allow_duplicate=True),
+        Output("search-interval", "disabled", allow_duplicate=True),
+    ],
+    Input("search-interval", "n_intervals"),
+    [
+        State("session-id", "data"),
+        State("model-ar", "value"),
+        State("model-diff", "value"),
+        State("model-ma", "value"),
+    ],
+    prevent_initial_call=True,
+)
+def show_search_progress(
+    _,
+    session_id: Optional[str],
+    ar_order: Optional[int] = None,
+    diff_order: Optional[int] = None,
+    ma_order: Optional[int] = None,
+) -> tuple:
+    """Periodically show the best model found so far by an order search.
+
+    Args:
+        session_id (Optional[str]): The browser session's identifier.
+        ar_order (Optional[int], optional): The selected AR order.
+        diff_order (Optional[int], optional): The selected differencing
+            order.
+        ma_order (Optional[int], optional): The selected MA order.
+
+    Returns:
+        tuple: The best AR, differencing and MA orders (if they've changed),
+        a status message, and whether to stop polling.
+    """
+    if (search := SEARCH_PROGRESS.get(session_id)) is None or (
+        progress := SEARCH_PROGRESS.get(search["search"])
+    ) is None:
+        raise PreventUpdate
+
+    if done := progress["done"]:
+        SEARCH_PROGRESS.pop(search["search"])
+    if progress["order"] is None:
+        if done:
+            message = "No suitable model was found."
+            if progress.get("timed_out"):
+                message = SEARCH_TIMEOUT_MESSAGE
+            return (no_update,) * 3 + (message, True)
+        raise PreventUpdate
 
-    predictions, forecast = fit_arima_model(
-        data, ar_order, diff_order, ma_order
+    best = tuple(progress["order"])
+    message = (
+        f"ARIMA{best} has the lowest AIC ({progress['aic']:,.2f}) of the"
+        f" {progress['fitted']} models fitted"
+        + ("." if done else " so far...")
     )
+    if progress.get("timed_out"):
+        message += f" {SEARCH_TIMEOUT_MESSAGE}"
+    if best == (ar_order, diff_order, ma_order):
+        return (no_update,) * 3 + (message, done)
+    return (*best, message, done)
 
-    line_plot = plotting.plot_forecast(
-        actual_data=data,
-        predictions=predictions,
-        forecast=forecast,
+
+# Folds and periods forecast per fold when backtesting from the dashboard
+BACKTEST_FOLDS = 8
+BACKTEST_HORIZON = 14
+
+
+@callback(
+    [
+        Output("backtest-plot", "figure"),
+        Output("backtest-plot", "style"),
+        Output("model-status", "children", allow_duplicate=True),
+    ],
+    Input("model-backtest", "n_clicks"),
+    [
+        State("model-ar", "value"),
+        State("model-diff", "value"),
+        State("model-ma", "value"),
+        State("backtest-window", "value"),
+        State("current-page", "pathname"),
+        State("sample-data-store", "data"),
+        State("file-upload-store", "data"),
+        State("session-id", "data"),
+    ],
+    running=[(Output("model-backtest", "disabled"), True, False)],
+    prevent_initial_call=True,
+)
+def run_backtest(
+    _,
+    ar_order: int,
+    diff_order: int,
+    ma_order: int,
+    window_type: str,
+    input_source: str,
+    sample: Optional[dict],
+    upload: Optional[dict],
+    session_id: Optional[str] = None,
+) -> Tuple[dict, dict, str]:
+    """Backtest the chosen model, and plot its errors against the number of
+    periods ahead.
+
+    The model is fitted on the data before the first forecast origin in a
+    worker process, warm-started from the fit on all the data if it's
+    cached, and the fit is cached for later backtests. A newer backtest from
+    the same session supersedes it.
+
+    Args:
+        ar_order (int): AR order.
+        diff_order (int): Differencing order.
+        ma_order (int): MA order.
+        window_type (str): "expanding" or "rolling".
+        input_source (str): The data source.
+        sample (Optional[dict]): Stored sample data, if any.
+        upload (Optional[dict]): Uploaded data, if any.
+        session_id (Optional[str], optional): The browser session's
+            identifier.
+
+    Returns:
+        Tuple[dict, dict, str]: A serialised plot of the errors, the plot's
+        style, and a status message.
+    """
+    data, filename = _load_data(input_source, sample, upload)
+    if data is None:
+        return no_update, no_update, EXPIRED_DATA_MESSAGE
+    order = (ar_order, diff_order, ma_order)
+    labels = {
+        "size": size_label(len(data)),
+        "order": "-".join(map(str, order)),
+    }
+    try:
+        origins = backtest_origins(
+            len(data), BACKTEST_HORIZON, BACKTEST_FOLDS
+        )
+    except ValueError as error:
+        return no_update, no_update, str(error)
+
+    training = data.iloc[:origins[0]]
+    key = fit_key(training, *order)
+    job_session = f"{session_id or uuid4().hex}:backtest"
+    try:
+        with span("run_backtest.fit", **labels):
+            if (fit := FIT_CACHE.get(key)) is None:
+                full_fit = FIT_CACHE.peek(fit_key(data, *order))
+                start_params = None if full_fit is None else full_fit.params
+                job = JOB_MANAGER.submit(
+                    job_session, get_arima_fit, training, *order, start_params
+                )
+                fit = JOB_MANAGER.result(job)
+                FIT_CACHE.put(key, fit)
+
+        with span("run_backtest.folds", **labels):
+            result = backtest(
+                data,
+                *order,
+                horizon=BACKTEST_HORIZON,
+                folds=BACKTEST_FOLDS,
+                window=len(training) if window_type == "rolling" else None,
+                params=fit.params,
+                executor=JOB_MANAGER.session_executor(job_session),
+                timeout=JOB_MANAGER.timeout,
+            )
+    except (JobCancelled, CancelledError):
+        raise PreventUpdate  # A newer backtest will update the plot
+    except (JobTimeout, FutureTimeoutError) as error:
+        if isinstance(error, FutureTimeoutError):  # the folds'
+            JOB_MANAGER.expire(job_session)
+        return (
+            no_update,
+            no_update,
+            "Model fitting took too long. Please try a lower order.",
+        )
+    except Exception:
+        logger.exception("Backtest of ARIMA%s failed", order)
+        return no_update, no_update, "The model couldn't be backtested."
+    figure = plotting.plot_backtest(
+        result.horizons,
         model_info=f"ARIMA({ar_order}, {diff_order}, {ma_order})",
         file_name=filename,
     )
+    mean = result.folds.mean()
+    message = (
+        f"Over {BACKTEST_FOLDS} folds: MAE {mean['mae']:,.4f},"
+        f" RMSE {mean['rmse']:,.4f}, MAPE {mean['mape']:,.2f}%."
+    )
+    return plotting.serialise_figure(figure), {}, message
 
-    components = seasonal_decompose(data)
-    component_subplots = plotting.plot_ts_components(
-        trend=components.trend,
-        seasonal=components.seasonal,
-        residuals=components.resid,
-        file_name=filename,
+
+def _visible_range(
+    relayout: Optional[dict],
+) -> Union[None, str, Tuple[pd.Timestamp, pd.Timestamp]]:
+    """Get the visible x-axis range from a figure's `relayoutData`.
+
+    Args:
+        relayout (Optional[dict]): Layout changes made by the user.
+
+    Returns:
+        Union[None, str, Tuple[Timestamp, Timestamp]]: The visible range,
+        "full" if the zoom was reset, or None if the x-axis didn't change.
+    """
+    for key, value in (relayout or {}).items():
+        if re.fullmatch(r"xaxis\d*\.autorange", key) and value:
+            return "full"
+        elif re.fullmatch(r"xaxis\d*\.range", key):
+            return pd.Timestamp(value[0]), pd.Timestamp(value[1])
+        elif match := re.fullmatch(r"(xaxis\d*)\.range\[0\]", key):
+            end = relayout.get(f"{match.group(1)}.range[1]")
+            return pd.Timestamp(value), pd.Timestamp(end)
+    return None
+
+
+# Forecasts longer than this are thinned outside the visible range when the
+# forecast plot is zoomed, as `downsample_window` thins its context
+FORECAST_CONTEXT = DEFAULT_MAX_POINTS // 8
+
+
+def _resample_traces(
+    *series: pd.Series,
+    relayout: Optional[dict],
+    intervals: Optional[pd.DataFrame] = None,
+) -> Patch:
+    """Get a figure patch with each series downsampled for the visible
+    range, so that zooming in on long series reveals more detail, and
+    coarsely outside it (e.g. a long forecast beyond the visible range).
+
+    Args:
+        *series (pandas.Series): The data plotted in each trace, in order.
+        relayout (Optional[dict]): Layout changes made by the user.
+        intervals (Optional[pandas.DataFrame], optional): Prediction
+            intervals of the last series, plotted as bands after the series'
+            traces, widest first (see `plotting.plot_forecast`), and
+            resampled at the same periods as it. Defaults to None.
+
+    Returns:
+        Patch: Updated trace data.
+    """
+    if (visible := _visible_range(relayout)) is None:
+        raise PreventUpdate
+
+    patched = Patch()
+    for position, data in enumerate(series):
+        if visible == "full":
+            resampled = downsample(data)
+        else:
+            resampled = downsample_window(data, *visible)
+        patched["data"][position]["x"] = plotting.encode_array(
+            resampled.index
+        )
+        patched["data"][position]["y"] = plotting.encode_array(resampled)
+
+    if intervals is not None:
+        intervals = intervals.reindex(resampled.index)
+        alphas = sorted(intervals.columns.unique("alpha"))
+        for position, alpha in enumerate(alphas, start=len(series)):
+            x, y = plotting.interval_band(intervals, alpha)
+            patched["data"][position]["x"] = plotting.encode_array(x)
+            patched["data"][position]["y"] = plotting.encode_array(y)
+    return patched
+
+
+@callback(
+    Output("line-plot", "figure", allow_duplicate=True),
+    Input("line-plot", "relayoutData"),
+    [
+        State("model-ar", "value"),
+        State("model-diff", "value"),
+        State("model-ma", "value"),
+        State("current-page", "pathname"),
+        State("sample-data-store", "data"),
+        State("file-upload-store", "data"),
+        State("model-horizon", "value"),
+        State("model-seasonal-ar", "value"),
+        State("model-seasonal-diff", "value"),
+        State("model-seasonal-ma", "value"),
+        State("model-period", "value"),
+    ],
+    prevent_initial_call=True,
+)
+def resample_forecast_plot(
+    relayout: Optional[dict],
+    ar_order: int,
+    diff_order: int,
+    ma_order: int,
+    input_source: str,
+    sample: Optional[dict],
+    upload: Optional[dict],
+    horizon: Optional[int] = FORECAST_HORIZON,
+    seasonal_ar: int = 0,
+    seasonal_diff: int = 0,
+    seasonal_ma: int = 0,
+    period: Optional[int] = 0,
+) -> Patch:
+    """Re-sample long series (the data, or a long forecast) in the forecast
+    plot when it's zoomed, using the cached model fit.
+
+    Args:
+        relayout (Optional[dict]): Layout changes made by the user.
+        ar_order (int): AR order.
+        diff_order (int): Differencing order.
+        ma_order (int): MA order.
+        input_source (str): The data source.
+        sample (Optional[dict]): Stored sample data, if any.
+        upload (Optional[dict]): Uploaded data, if any.
+        horizon (Optional[int], optional): Periods forecast. Defaults to
+            FORECAST_HORIZON.
+        seasonal_ar (int, optional): Seasonal AR order. Defaults to 0.
+        seasonal_diff (int, optional): Seasonal differencing order.
+            Defaults to 0.
+        seasonal_ma (int, optional): Seasonal MA order. Defaults to 0.
+        period (Optional[int], optional): Seasonal period. Defaults to 0.
+
+    Returns:
+        Patch: Updated trace data.
+    """
+    data, _ = _load_data(input_source, sample, upload)
+    if data is None or horizon is None:
+        raise PreventUpdate
+    if len(data) <= DEFAULT_MAX_POINTS and horizon <= FORECAST_CONTEXT:
+        raise PreventUpdate  # Plotted in full, however it's zoomed
+
+    seasonal_order = _seasonal_order(
+        seasonal_ar, seasonal_diff, seasonal_ma, period
+    )
+    key = fit_key(data, ar_order, diff_order, ma_order, seasonal_order)
+    if (fit := cached_forecast(key, horizon)) is None:
+        raise PreventUpdate
+    return _resample_traces(
+        data,
+        fit.predictions,
+        fit.forecast,
+        relayout=relayout,
+        intervals=fit.intervals,
+    )
+
+
+@callback(
+    Output("component-plots", "figure", allow_duplicate=True),
+    Input("component-plots", "relayoutData"),
+    [
+        State("current-page", "pathname"),
+        State("sample-data-store", "data"),
+        State("file-upload-store", "data"),
+        State("decomposition-method", "value"),
+    ],
+    prevent_initial_call=True,
+)
+def resample_component_plots(
+    relayout: Optional[dict],
+    input_source: str,
+    sample: Optional[dict],
+    upload: Optional[dict],
+    method: str = DEFAULT_DECOMPOSITION,
+) -> Patch:
+    """Re-sample long series in the decomposition plots when they're
+    zoomed.
+
+    Args:
+        relayout (Optional[dict]): Layout changes made by the user.
+        input_source (str): The data source.
+        sample (Optional[dict]): Stored sample data, if any.
+        upload (Optional[dict]): Uploaded data, if any.
+        method (str, optional): The decomposition method. Defaults to
+            DEFAULT_DECOMPOSITION.
+
+    Returns:
+        Patch: Updated trace data.
+    """
+    data, _ = _load_data(input_source, sample, upload)
+    if data is None or len(data) <= DEFAULT_MAX_POINTS:
+        raise PreventUpdate
+
+    components = cached_decomposition(data, method)
+    return _resample_traces(
+        components.trend,
+        components.seasonal,
+        components.resid,
+        relayout=relayout,
+    )
+
+
+@callback(
+    [
+        Output("export-forecast", "href"),
+        Output("export-forecast", "download"),
+    ],
+    [
+        Input("export-format", "value"),
+        Input("decomposition-method", "value"),
+        Input("model-ar", "value"),
+        Input("model-diff", "value"),
+        Input("model-ma", "value"),
+        Input("current-page", "pathname"),
+        Input("sample-data-store", "data"),
+        Input("file-upload-store", "data"),
+        Input("model-horizon", "value"),
+        Input("model-seasonal-ar", "value"),
+        Input("model-seasonal-diff", "value"),
+        Input("model-seasonal-ma", "value"),
+        Input("model-period", "value"),
+    ],
+)
+def link_export(
+    export_format: str,
+    method: str,
+    ar_order: int,
+    diff_order: int,
+    ma_order: int,
+    input_source: str,
+    sample: Optional[dict],
+    upload: Optional[dict],
+    horizon: Optional[int] = FORECAST_HORIZON,
+    seasonal_ar: int = 0,
+    seasonal_diff: int = 0,
+    seasonal_ma: int = 0,
+    period: Optional[int] = 0,
+) -> Tuple[str, str]:
+    """Link the forecast download to an export of the chosen model's
+    outputs, streamed from the fit cache by the export API, rather than
+    sent through a callback (see `routes.export_api`).
+
+    Args:
+        export_format (str): "csv", "parquet" or "arrow".
+        method (str): The decomposition method.
+        ar_order (int): AR order.
+        diff_order (int): Differencing order.
+        ma_order (int): MA order.
+        input_source (str): The data source.
+        sample (Optional[dict]): Stored sample data, if any.
+        upload (Optional[dict]): Uploaded data, if any.
+        horizon (Optional[int], optional): Periods to forecast. Defaults to
+            FORECAST_HORIZON.
+        seasonal_ar (int, optional): Seasonal AR order. Defaults to 0.
+        seasonal_diff (int, optional): Seasonal differencing order.
+            Defaults to 0.
+        seasonal_ma (int, optional): Seasonal MA order. Defaults to 0.
+        period (Optional[int], optional): Seasonal period. Defaults to 0.
+
+    Returns:
+        Tuple[str, str]: The export's URL, and file name.
+    """
+    data, filename = _load_data(input_source, sample, upload)
+    if data is None:
+        raise PreventUpdate
+    seasonal_order = _seasonal_order(
+        seasonal_ar, seasonal_diff, seasonal_ma, period
+    )
+    query = {
+        "dataset": data_key(data),
+        "ar": ar_order,
+        "diff": diff_order,
+        "ma": ma_order,
+        "sar": seasonal_order[0],
+        "sdiff": seasonal_order[1],
+        "sma": seasonal_order[2],
+        "period": seasonal_order[3],
+        "horizon": horizon or FORECAST_HORIZON,
+        "decompose": method,
+        "format": export_format,
+        "name": filename,
+    }
+    label = model_label((ar_order, diff_order, ma_order), seasonal_order)
+    _, extension = EXPORT_FORMATS[export_format]
+    return (
+        f"/api/export?{urlencode(query)}",
+        export_filename(filename, label, extension),
     )
 
-    return line_plot, component_subplots
+
+@callback(
+    [
+        Output("model-download", "data"),
+        Output("model-status", "children", allow_duplicate=True),
+    ],
+    Input("export-model", "n_clicks"),
+    [
+        State("model-ar", "value"),
+        State("model-diff", "value"),
+        State("model-ma", "value"),
+        State("current-page", "pathname"),
+        State("sample-data-store", "data"),
+        State("file-upload-store", "data"),
+        State("model-seasonal-ar", "value"),
+        State("model-seasonal-diff", "value"),
+        State("model-seasonal-ma", "value"),
+        State("model-period", "value"),
+    ],
+    prevent_initial_call=True,
+)
+def download_model(
+    _,
+    ar_order: int,
+    diff_order: int,
+    ma_order: int,
+    input_source: str,
+    sample: Optional[dict],
+    upload: Optional[dict],
+    seasonal_ar: int = 0,
+    seasonal_diff: int = 0,
+    seasonal_ma: int = 0,
+    period: Optional[int] = 0,
+) -> Tuple[dict, str]:
+    """Download the chosen model as a bundle (see `export.dump_model`),
+    from the fit cache, without refitting it. The bundle is only a few
+    kilobytes, however long the data.
+
+    Args:
+        ar_order (int): AR order.
+        diff_order (int): Differencing order.
+        ma_order (int): MA order.
+        input_source (str): The data source.
+        sample (Optional[dict]): Stored sample data, if any.
+        upload (Optional[dict]): Uploaded data, if any.
+        seasonal_ar (int, optional): Seasonal AR order. Defaults to 0.
+        seasonal_diff (int, optional): Seasonal differencing order.
+            Defaults to 0.
+        seasonal_ma (int, optional): Seasonal MA order. Defaults to 0.
+        period (Optional[int], optional): Seasonal period. Defaults to 0.
+
+    Returns:
+        Tuple[dict, str]: The file to download, and a status message.
+    """
+    data, filename = _load_data(input_source, sample, upload)
+    if data is None:
+        return no_update, EXPIRED_DATA_MESSAGE
+    order = (ar_order, diff_order, ma_order)
+    try:
+        seasonal_order = normalise_seasonal_order(
+            (seasonal_ar, seasonal_diff, seasonal_ma, period or 0)
+        )
+    except ValueError as error:
+        return no_update, str(error)
+    # The cached fit keeps its state, so the bundle's forecast can be
+    # extended (a fit truncated to a shorter horizon can't be)
+    if (fit := FIT_CACHE.get(fit_key(data, *order, seasonal_order))) is None:
+        return no_update, "The model is still being fitted. Please try again."
+    with span("download_model.dump", size=size_label(len(data))):
+        bundle = dump_model(fit, order, seasonal_order)
+    label = model_label(order, seasonal_order)
+    return dcc.send_bytes(bundle, export_filename(filename, label, "npz")), ""
@@ -1,10 +1,11 @@
 import dash
 from dash import Dash, html
+from ts_app.routes import routes
 
 app = Dash(
     "ts_app",
     suppress_callback_exceptions=True,
-    external_scripts=["https://cdn.plot.ly/plotly-2.22.0.min.js"],
+    external_scripts=["https://cdn.plot.ly/plotly-2.35.2.min.js"],
     title="Time Series App",
     meta_tags=[
         {
@@ -16,3 +17,4 @@ app = Dash(
 )
 
 app.layout = html.Div(dash.page_container)
+app.server.register_blueprint(routes)
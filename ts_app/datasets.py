@@ -0,0 +1,299 @@
+import logging
+import os
+import threading
+import time
+from collections import OrderedDict
+from pathlib import Path
+from typing import Dict, Optional, Tuple, Union
+
+import numpy as np
+import pandas as pd
+from ts_app.cache import column_keys, data_key
+from ts_app.dates import infer_frequency
+
+logger = logging.getLogger(__name__)
+
+# Saved datasets are checked for expiry at most this often, in seconds
+SWEEP_INTERVAL = 60
+
+
+def _date_arrays(index: pd.Index) -> Tuple[np.ndarray, str]:
+    """Get a compact representation of a date index: int64 dates
+    (nanoseconds since the epoch) and the date frequency.
+    """
+    index = pd.DatetimeIndex(index)
+    freq = index.freqstr or infer_frequency(index) or ""
+    return np.ascontiguousarray(index.asi8), freq
+
+
+def _to_arrays(data: pd.Series) -> Tuple[np.ndarray, np.ndarray, str]:
+    """Get a compact representation of a series: float64 values, int64
+    dates (nanoseconds since the epoch) and the date frequency.
+    """
+    dates, freq = _date_arrays(data.index)
+    return np.ascontiguousarray(data.to_numpy(dtype="float64")), dates, freq
+
+
+def _buffer(array: np.ndarray) -> Tuple[int, int]:
+    """Identify the memory an array's data takes, shared by its views."""
+    return array.__array_interface__["data"][0], array.nbytes
+
+
+def _from_arrays(
+    values: np.ndarray, dates: np.ndarray, freq: str
+) -> pd.Series:
+    """Rebuild a series from its compact representation."""
+    index = pd.DatetimeIndex(dates.view("datetime64[ns]"), freq=freq or None)
+    return pd.Series(values, index=index)
+
+
+class DatasetStore:
+    """Keep datasets on the server, so that only an opaque ID needs to be
+    sent to the browser.
+
+    Datasets are held as numpy arrays, and are evicted once they haven't
+    been used for `ttl` seconds, or when the memory limit is exceeded (least
+    recently used first), unless they're pinned. They can also be saved to
+    a local directory as `.npz` files, to share them between worker
+    processes.
+
+    Args:
+        max_bytes (int, optional): Approximate memory limit. Defaults to
+            256MiB.
+        ttl (float, optional): Seconds to keep unused datasets. Defaults to
+            3600.
+        directory (Optional[Union[str, Path]], optional): A folder in which
+            to save datasets. Defaults to None (memory only).
+    """
+
+    def __init__(
+        self,
+        max_bytes: int = 1024**2 * 256,
+        ttl: float = 3600,
+        directory: Optional[Union[str, Path]] = None,
+    ) -> None:
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self._entries = OrderedDict()  # id -> (values, dates, freq)
+        self._last_used = {}
+        self._pinned = set()  # ids never evicted from memory
+        self._bytes = 0  # held by the entries' arrays
+        self._date_users = {}  # dates buffer -> number of entries using it
+        self._last_sweep = time.monotonic()
+        self._lock = threading.RLock()
+        self.directory = None
+        if directory is not None:
+            self.set_directory(directory)
+
+    def __contains__(self, dataset_id: Optional[str]) -> bool:
+        # Unlike `get`, this doesn't mark the dataset as used, or load it
+        if dataset_id is None:
+            return False
+        if dataset_id in self._pinned:
+            return True
+        with self._lock:
+            last_used = self._last_used.get(dataset_id)
+        if last_used is not None and time.monotonic() - last_used <= self.ttl:
+            return True
+        if self.directory is None:
+            return False
+        try:
+            modified = self._path(dataset_id).stat().st_mtime
+        except OSError:
+            return False
+        return time.time() - modified <= self.ttl
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    @property
+    def current_bytes(self) -> int:
+        """Memory held by in-memory datasets."""
+        return self._bytes
+
+    def set_directory(self, directory: Union[str, Path]) -> None:
+        """Save datasets to the given folder, creating it if necessary.
+
+        Args:
+            directory (Union[str, Path]): The dataset folder.
+        """
+        self.directory = Path(directory)
+        self.directory.mkdir(parents=True, exist_ok=True)
+
+    def _path(self, dataset_id: str) -> Path:
+        return self.directory / f"{dataset_id}.npz"
+
+    def put(self, data: pd.Series, pinned: bool = False) -> str:
+        """Store a dataset.
+
+        Args:
+            data (pandas.Series): The data, with a DatetimeIndex.
+            pinned (bool, optional): Whether to keep it in memory for as
+                long as the process runs (e.g. the default sample). Defaults
+                to False.
+
+        Returns:
+            str: The dataset's ID. Identical data gets the same ID.
+        """
+        dataset_id = data_key(data)
+        if pinned:
+            self._pinned.add(dataset_id)
+        self._put(dataset_id, _to_arrays(data))
+        return dataset_id
+
+    def put_columns(self, data: pd.DataFrame) -> Dict[str, str]:
+        """Store each column of a DataFrame as a dataset. The dates are
+        converted, and hashed, once for all columns, and the columns'
+        in-memory entries share one array of dates, counted once against
+        the memory limit.
+
+        Args:
+            data (pandas.DataFrame): The data, with a DatetimeIndex.
+
+        Returns:
+            Dict[str, str]: Each column's name and dataset ID, in order.
+        """
+        dates, freq = _date_arrays(data.index)
+        columns = {}
+        for (column, values), dataset_id in zip(
+            data.items(), column_keys(data)
+        ):
+            values = np.ascontiguousarray(values.to_numpy(dtype="float64"))
+            self._put(dataset_id, (values, dates, freq))
+            columns[str(column)] = dataset_id
+        return columns
+
+    def _put(self, dataset_id: str, arrays: tuple) -> None:
+        """Store a dataset's arrays, and save them if there's a folder."""
+        self._store(dataset_id, arrays)
+        if self.directory is not None:
+            path = self._path(dataset_id)
+            temp_path = path.with_suffix(f".{os.getpid()}.tmp")
+            try:
+                with open(temp_path, "wb") as file:
+                    np.savez(
+                        file,
+                        values=arrays[0],
+                        dates=arrays[1],
+                        freq=np.array(arrays[2]),
+                    )
+                os.replace(temp_path, path)
+            except OSError as error:
+                temp_path.unlink(missing_ok=True)
+                logger.warning("Couldn't save dataset %s: %s", path, error)
+
+    def get(self, dataset_id: Optional[str]) -> Optional[pd.Series]:
+        """Retrieve a dataset.
+
+        Args:
+            dataset_id (Optional[str]): The dataset's ID.
+
+        Returns:
+            Optional[pandas.Series]: The data, or None if it's unknown or
+            has expired.
+        """
+        self.evict_expired()
+        if dataset_id is None:
+            return None
+
+        with self._lock:
+            if (arrays := self._entries.get(dataset_id)) is not None:
+                self._entries.move_to_end(dataset_id)
+                self._last_used[dataset_id] = time.monotonic()
+                return _from_arrays(*arrays)
+
+        if self.directory is not None and (
+            path := self._path(dataset_id)
+        ).exists():
+            if time.time() - path.stat().st_mtime > self.ttl:
+                path.unlink(missing_ok=True)
+                return None
+            try:
+                with np.load(path) as saved:
+                    arrays = (
+                        saved["values"],
+                        saved["dates"],
+                        str(saved["freq"]),
+                    )
+            except (OSError, KeyError, ValueError) as error:
+                logger.warning("Couldn't load dataset %s: %s", path, error)
+                return None
+            self._store(dataset_id, arrays)
+            path.touch()  # keep it alive for other workers
+            return _from_arrays(*arrays)
+        return None
+
+    def _store(self, dataset_id: str, arrays: tuple) -> None:
+        with self._lock:
+            self._remove(dataset_id)
+            self._entries[dataset_id] = arrays
+            self._last_used[dataset_id] = time.monotonic()
+            self._bytes += arrays[0].nbytes
+            # Dates shared with other entries are only counted once
+            dates = _buffer(arrays[1])
+            if (users := self._date_users.get(dates, 0)) == 0:
+                self._bytes += arrays[1].nbytes
+            self._date_users[dates] = users + 1
+
+            # Always keep the newest dataset, even if it exceeds the limit
+            while self._bytes > self.max_bytes:
+                oldest = next(
+                    (
+                        key
+                        for key in self._entries
+                        if key != dataset_id and key not in self._pinned
+                    ),
+                    None,
+                )
+                if oldest is None:
+                    break
+                self._remove(oldest)
+
+    def _remove(self, dataset_id: str) -> None:
+        with self._lock:
+            if (arrays := self._entries.pop(dataset_id, None)) is not None:
+                del self._last_used[dataset_id]
+                self._bytes -= arrays[0].nbytes
+                dates = _buffer(arrays[1])
+                self._date_users[dates] -= 1
+                if self._date_users[dates] == 0:
+                    del self._date_users[dates]
+                    self._bytes -= arrays[1].nbytes
+
+    def evict_expired(self) -> None:
+        """Remove datasets that haven't been used for `ttl` seconds, from
+        memory, and from the dataset folder (checked at most every
+        SWEEP_INTERVAL seconds, or `ttl` if that's shorter).
+        """
+        now = time.monotonic()
+        cutoff = now - self.ttl
+        with self._lock:
+            for dataset_id, last_used in list(self._last_used.items()):
+                if last_used < cutoff and dataset_id not in self._pinned:
+                    self._remove(dataset_id)
+            sweep = now - self._last_sweep >= min(SWEEP_INTERVAL, self.ttl)
+            if sweep:
+                self._last_sweep = now
+        if sweep and self.directory is not None:
+            self._sweep_directory()
+
+    def _sweep_directory(self) -> None:
+        """Delete saved datasets (and leftover temporary files) that haven't
+        been used for `ttl` seconds by any process.
+        """
+        cutoff = time.time() - self.ttl
+        for path in self.directory.iterdir():
+            if path.suffix not in {".npz", ".tmp"}:
+                continue
+            # Datasets this process still holds may be in use elsewhere too
+            dataset_id = path.name.split(".")[0]
+            if dataset_id in self._pinned or dataset_id in self._entries:
+                continue
+            try:
+                if path.stat().st_mtime < cutoff:
+                    path.unlink()
+            except OSError:
+                pass  # e.g. removed by another process
+
+
+DATASETS = DatasetStore()
@@ -0,0 +1,147 @@
+from typing import Optional
+
+import numpy as np
+import pandas as pd
+
+# Points per trace sent to the browser; enough for a full-width plot
+DEFAULT_MAX_POINTS = 4000
+
+
+def minmax_indices(values: np.ndarray, n_out: int) -> np.ndarray:
+    """Get the positions of the minimum and maximum values in each of about
+    `n_out / 2` equal-width buckets, preserving spikes and troughs.
+
+    Args:
+        values (numpy.ndarray): The values to downsample.
+        n_out (int): Maximum number of positions to return.
+
+    Returns:
+        numpy.ndarray: Sorted positions of the selected values.
+    """
+    n = len(values)
+    if n <= n_out:
+        return np.arange(n)
+
+    # Two points per bucket, plus those of a partial bucket and the last point
+    n_buckets = max((n_out - 1) // 2 - 1, 1)
+    bucket_size = n // n_buckets
+    trimmed = n_buckets * bucket_size
+    values = np.nan_to_num(values, nan=np.nanmean(values))
+    buckets = values[:trimmed].reshape(n_buckets, bucket_size)
+    offsets = np.arange(n_buckets) * bucket_size
+    positions = [
+        offsets + buckets.argmin(axis=1),
+        offsets + buckets.argmax(axis=1),
+        [n - 1],
+    ]
+    if trimmed < n:
+        tail = values[trimmed:]
+        positions.append([trimmed + tail.argmin(), trimmed + tail.argmax()])
+    positions = np.concatenate(positions)
+    return np.unique(positions)
+
+
+def lttb_indices(values: np.ndarray, n_out: int) -> np.ndarray:
+    """Get the positions selected by the Largest-Triangle-Three-Buckets
+    algorithm, which preserves the visual shape of a line.
+
+    Points are assumed to be evenly spaced in time.
+
+    Args:
+        values (numpy.ndarray): The values to downsample.
+        n_out (int): Number of positions to return (at least 3).
+
+    Returns:
+        numpy.ndarray: Sorted positions of the selected values.
+    """
+    n = len(values)
+    if n <= n_out or n_out < 3:
+        return np.arange(n)
+
+    values = np.nan_to_num(values, nan=np.nanmean(values))
+    edges = np.linspace(1, n - 1, n_out - 1).astype(int)
+    selected = np.empty(n_out, dtype=int)
+    selected[0], selected[-1] = 0, n - 1
+
+    for i in range(n_out - 2):
+        start, end = edges[i], edges[i + 1]
+        # Average of the next bucket (or the last point)
+        next_end = edges[i + 2] if i + 2 < len(edges) else n
+        next_x = (end + next_end - 1) / 2
+        next_y = values[end:next_end].mean()
+
+        prev = selected[i]
+        x = np.arange(start, end)
+        areas = np.abs(
+            (prev - next_x) * (values[start:end] - values[prev])
+            - (prev - x) * (next_y - values[prev])
+        )
+        selected[i + 1] = start + areas.argmax()
+    return selected
+
+
+def downsample(
+    data: pd.Series,
+    max_points: Optional[int] = DEFAULT_MAX_POINTS,
+    method: str = "minmax",
+) -> pd.Series:
+    """Reduce a series to at most `max_points` points for plotting.
+
+    Args:
+        data (pandas.Series): The series to downsample.
+        max_points (Optional[int], optional): Maximum number of points.
+            Defaults to DEFAULT_MAX_POINTS. None disables downsampling.
+        method (str, optional): "minmax" (min & max per bucket) or "lttb".
+            Defaults to "minmax".
+
+    Returns:
+        pandas.Series: The downsampled series.
+    """
+    if max_points is None or len(data) <= max_points:
+        return data
+
+    if method == "lttb":
+        positions = lttb_indices(data.to_numpy(dtype="float64"), max_points)
+    elif method == "minmax":
+        positions = minmax_indices(data.to_numpy(dtype="float64"), max_points)
+    else:
+        raise ValueError(f"Unknown downsampling method: {method!r}")
+    return data.iloc[positions]
+
+
+def downsample_window(
+    data: pd.Series,
+    start: pd.Timestamp,
+    end: pd.Timestamp,
+    max_points: int = DEFAULT_MAX_POINTS,
+    method: str = "minmax",
+) -> pd.Series:
+    """Downsample a series finely within a date range, and coarsely outside
+    it, so that a zoomed-in plot shows detail while its range slider still
+    shows the whole series.
+
+    Args:
+        data (pandas.Series): The series to downsample, with a sorted
+            DatetimeIndex.
+        start (pandas.Timestamp): Start of the visible range.
+        end (pandas.Timestamp): End of the visible range.
+        max_points (int, optional): Maximum number of points in the visible
+            range. Defaults to DEFAULT_MAX_POINTS.
+        method (str, optional): "minmax" or "lttb". Defaults to "minmax".
+
+    Returns:
+        pandas.Series: The downsampled series.
+    """
+    lower = data.index.searchsorted(start, side="left")
+    upper = data.index.searchsorted(end, side="right")
+    # Include a neighbouring point on each side, so lines reach the edges
+    lower, upper = max(lower - 1, 0), min(upper + 1, len(data))
+    context_points = max(max_points // 8, 2)
+
+    return pd.concat(
+        [
+            downsample(data.iloc[:lower], context_points, method),
+            downsample(data.iloc[lower:upper], max_points, method),
+            downsample(data.iloc[upper:], context_points, method),
+        ]
+    )
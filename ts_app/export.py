@@ -0,0 +1,389 @@
+import io
+import json
+import re
+import zipfile
+from importlib.util import find_spec
+from pathlib import Path
+from typing import Iterable, Iterator, NamedTuple, Optional, Sequence, Tuple
+
+import numpy as np
+import pandas as pd
+from ts_app.ts_functions import (
+    NO_SEASON,
+    ArimaFit,
+    ForecastState,
+    extend_forecast,
+    fourier_period,
+    truncate_forecast,
+)
+
+# Media types and file extensions of the table export formats
+EXPORT_FORMATS = {
+    "csv": ("text/csv", "csv"),
+    "parquet": ("application/vnd.apache.parquet", "parquet"),
+    "arrow": ("application/vnd.apache.arrow.stream", "arrows"),
+}
+# Rows per chunk of a streamed export (a Parquet row group, or Arrow batch)
+EXPORT_CHUNK_ROWS = 2**16
+BUNDLE_VERSION = 1
+# Parquet and Arrow exports need pyarrow
+PYARROW_INSTALLED = find_spec("pyarrow") is not None
+PYARROW_MESSAGE = (
+    "Parquet and Arrow exports need pyarrow: pip install ts-app[arrow]"
+)
+
+
+class ModelBundle(NamedTuple):
+    """A fitted model, loaded from a bundle (see `dump_model`)."""
+
+    order: Tuple[int, int, int]
+    seasonal_order: Tuple[int, int, int, int]
+    fit: ArimaFit  # without its in-sample predictions
+
+
+def export_filename(name: str, label: str, extension: str) -> str:
+    """Get a file name for an export, e.g. "sales-arima-1-0-1.csv" for data
+    from "sales.csv", with characters other than letters, digits, "." and
+    "-" replaced by "_".
+    """
+    stem = re.sub(r"[^\w.-]+", "_", Path(name).stem).strip("_") or "data"
+    return f"{stem}-{label}.{extension}"
+
+
+def model_label(
+    order: Sequence[int], seasonal_order: Sequence[int] = NO_SEASON
+) -> str:
+    """Label a model in file names, e.g. "arima-1-0-1", or
+    "sarima-1-0-1-1-1-1-12" with a seasonal order, or
+    "arima-1-0-1-fourier-24" with Fourier terms in its place.
+    """
+    label = "arima-" + "-".join(map(str, order))
+    if tuple(seasonal_order) == NO_SEASON:
+        return label
+    elif period := fourier_period(seasonal_order):
+        return f"{label}-fourier-{period}"
+    return "s" + "-".join(map(str, (label, *seasonal_order)))
+
+
+def model_description(
+    order: Sequence[int], seasonal_order: Sequence[int] = NO_SEASON
+) -> str:
+    """Describe a model, e.g. "ARIMA(1, 0, 1)", or "SARIMA(1, 0, 1)(1, 1, 1,
+    12)" with a seasonal order, or "ARIMA(1, 0, 1) with Fourier terms of
+    period 24" in its place.
+    """
+    label = "ARIMA({}, {}, {})".format(*order)
+    if tuple(seasonal_order) == NO_SEASON:
+        return label
+    elif period := fourier_period(seasonal_order):
+        return f"{label} with Fourier terms of period {period}"
+    return "S{}({}, {}, {}, {})".format(label, *seasonal_order)
+
+
+def _interval_columns(fit: ArimaFit) -> dict:
+    """Get a fit's prediction interval bounds by column name, e.g. "lower
+    95%".
+    """
+    if fit.intervals is None:
+        return {}
+    columns = {}
+    for alpha in fit.intervals.columns.unique("alpha"):
+        level = f"{100 * (1 - alpha):g}%"
+        columns[f"lower {level}"] = fit.intervals[alpha, "lower"]
+        columns[f"upper {level}"] = fit.intervals[alpha, "upper"]
+    return columns
+
+
+def export_frames(
+    fit: ArimaFit,
+    data: Optional[pd.Series] = None,
+    components: Optional[pd.DataFrame] = None,
+    rows: int = EXPORT_CHUNK_ROWS,
+) -> Iterator[pd.DataFrame]:
+    """Get a fit's predictions, forecast and prediction intervals, with the
+    data and its decomposition if given, as a table of `rows` rows at a
+    time, so that a long series' table is never held in memory at once.
+
+    The table has a row per date of the data (or of the predictions), then
+    per forecast period, and float64 columns: "value" (the data),
+    "prediction", "forecast", the interval bounds (e.g. "lower 95%" and
+    "upper 95%"), and the decomposition's columns. Values that don't apply
+    to a row (e.g. the forecast, before it starts) are missing.
+
+    Args:
+        fit (ArimaFit): The fitted model's outputs.
+        data (Optional[pandas.Series], optional): The data the model was
+            fitted on. Defaults to None (not exported).
+        components (Optional[pandas.DataFrame], optional): The data's
+            seasonal decomposition. Defaults to None (not exported).
+        rows (int, optional): Rows per chunk. Defaults to EXPORT_CHUNK_ROWS.
+
+    Yields:
+        pandas.DataFrame: The table's chunks, in order, indexed by "date".
+    """
+    intervals = _interval_columns(fit)
+    columns = ["value"] if data is not None else []
+    columns += ["prediction", "forecast", *intervals]
+    if components is not None:
+        columns += list(components.columns)
+    history = fit.predictions.index if data is None else data.index
+
+    def chunk(index: pd.Index, parts: Iterable[pd.Series]) -> pd.DataFrame:
+        if isinstance(index, pd.DatetimeIndex):
+            # Keep the same column types in every chunk
+            index = index.as_unit("ns")
+        frame = pd.DataFrame(
+            np.nan, index=index.rename("date"), columns=columns
+        )
+        for part in parts:
+            frame[part.name] = part.reindex(index).to_numpy(dtype="float64")
+        return frame
+
+    for start in range(0, len(history), rows):
+        stop = start + rows
+        index = history[start:stop]
+        # Slice by label before reindexing: reindexing a whole long series
+        # builds a hash table of all its dates
+        predictions = fit.predictions.loc[index[0]:index[-1]]
+        parts = [predictions.rename("prediction")]
+        if data is not None:
+            parts.append(data.iloc[start:stop].rename("value"))
+        if components is not None:
+            window = components.loc[index[0]:index[-1]]
+            parts.extend(column for _, column in window.items())
+        yield chunk(index, parts)
+    for start in range(0, len(fit.forecast), rows):
+        stop = start + rows
+        parts = [fit.forecast.iloc[start:stop].rename("forecast")] + [
+            bound.iloc[start:stop].rename(name)
+            for name, bound in intervals.items()
+        ]
+        yield chunk(fit.forecast.index[start:stop], parts)
+
+
+class _StreamBuffer(io.RawIOBase):
+    """A write-only file that holds what's written until it's drained, and
+    counts every byte written as its position (which Parquet's footer
+    refers to).
+    """
+
+    def __init__(self) -> None:
+        super().__init__()
+        self._chunks = []
+        self._position = 0
+
+    def writable(self) -> bool:
+        return True
+
+    def write(self, data: bytes) -> int:
+        self._chunks.append(bytes(data))
+        self._position += len(data)
+        return len(data)
+
+    def tell(self) -> int:
+        return self._position
+
+    def drain(self) -> bytes:
+        """Get the bytes written since the last drain."""
+        data = b"".join(self._chunks)
+        self._chunks.clear()
+        return data
+
+
+def _import_pyarrow():
+    """Import pyarrow, which Parquet and Arrow exports need."""
+    try:
+        import pyarrow as pa
+    except ImportError:
+        raise ImportError(PYARROW_MESSAGE) from None
+    return pa
+
+
+def export_chunks(
+    frames: Iterable[pd.DataFrame], export_format: str = "csv"
+) -> Iterator[bytes]:
+    """Encode a table, chunk by chunk (e.g. from `export_frames`), yielding
+    the file's bytes as each chunk is written, so that it can be streamed
+    as it's encoded.
+
+    Args:
+        frames (Iterable[pandas.DataFrame]): The table's chunks, with the
+            same columns and types.
+        export_format (str, optional): "csv", "parquet" (a row group per
+            chunk) or "arrow" (an IPC stream, with a record batch per
+            chunk). Defaults to "csv".
+
+    Raises:
+        ValueError: If the format is unknown.
+        ImportError: If pyarrow is needed, and isn't installed.
+
+    Yields:
+        bytes: The file's contents, in order.
+    """
+    if export_format not in EXPORT_FORMATS:
+        raise ValueError(f"Unknown export format: {export_format!r}")
+    if export_format == "csv":
+        header = True
+        for frame in frames:
+            yield frame.to_csv(header=header).encode()
+            header = False
+        return
+
+    pa = _import_pyarrow()
+    if export_format == "parquet":
+        import pyarrow.parquet as pq
+    sink, writer = _StreamBuffer(), None
+    try:
+        for frame in frames:
+            table = pa.Table.from_pandas(frame, preserve_index=True)
+            if writer is None and export_format == "parquet":
+                writer = pq.ParquetWriter(sink, table.schema)
+            elif writer is None:
+                writer = pa.ipc.new_stream(sink, table.schema)
+            writer.write_table(table)
+            yield sink.drain()
+    finally:
+        if writer is not None:
+            writer.close()
+    yield sink.drain()
+
+
+def dump_model(
+    fit: ArimaFit,
+    order: Sequence[int],
+    seasonal_order: Sequence[int] = NO_SEASON,
+) -> bytes:
+    """Save a fitted model as a compact bundle: its parameters, forecast and
+    prediction intervals, and the state after the forecast, from which it
+    can be extended without refitting (see `extend_forecast`).
+
+    The bundle is a compressed NumPy archive (as datasets are saved), with
+    the model's order and other details as JSON. It has no in-sample
+    predictions, so its size doesn't grow with the data, and no pickled
+    objects, so it's safe to load.
+
+    Args:
+        fit (ArimaFit): The fitted model's outputs.
+        order (Sequence[int]): The AR, differencing and MA orders.
+        seasonal_order (Sequence[int], optional): The seasonal order.
+            Defaults to NO_SEASON.
+
+    Returns:
+        bytes: The bundle.
+    """
+    index = fit.forecast.index
+    details = {
+        "version": BUNDLE_VERSION,
+        "order": [int(value) for value in order],
+        "seasonal_order": [int(value) for value in seasonal_order],
+        "name": fit.forecast.name,
+        "aic": float(fit.aic),
+        "bic": float(fit.bic),
+        "freq": getattr(index, "freqstr", None),
+        "dated": isinstance(index, pd.DatetimeIndex),
+    }
+    arrays = {
+        "params": fit.params.to_numpy(dtype="float64"),
+        "param_names": fit.params.index.to_numpy(dtype=str),
+        "forecast": fit.forecast.to_numpy(dtype="float64"),
+        "index": index.asi8 if details["dated"] else index.to_numpy(),
+    }
+    if fit.intervals is not None:
+        arrays["intervals"] = fit.intervals.to_numpy(dtype="float64")
+        columns = fit.intervals.columns
+        arrays["alphas"] = columns.get_level_values("alpha").to_numpy(float)
+        arrays["bounds"] = columns.get_level_values("bound").to_numpy(str)
+    if fit.state is not None:
+        for field, value in fit.state._asdict().items():
+            if value is not None:
+                arrays[f"state_{field}"] = np.asarray(value)
+
+    buffer = io.BytesIO()
+    np.savez_compressed(
+        buffer, details=np.array(json.dumps(details)), **arrays
+    )
+    return buffer.getvalue()
+
+
+def load_model(bundle: bytes) -> ModelBundle:
+    """Load a fitted model from a bundle saved by `dump_model`.
+
+    Args:
+        bundle (bytes): The bundle.
+
+    Raises:
+        ValueError: If it isn't a valid bundle.
+
+    Returns:
+        ModelBundle: The model's order, and its outputs, whose forecast can
+        be extended (see `forecast_model`).
+    """
+    try:
+        with np.load(io.BytesIO(bundle), allow_pickle=False) as saved:
+            arrays = dict(saved)
+        details = json.loads(str(arrays.pop("details")))
+        if details["version"] != BUNDLE_VERSION:
+            raise ValueError(f"unsupported version {details['version']}")
+        return ModelBundle(
+            tuple(details["order"]),
+            tuple(details["seasonal_order"]),
+            _bundled_fit(arrays, details),
+        )
+    except (OSError, KeyError, ValueError, zipfile.BadZipFile) as error:
+        raise ValueError(f"This isn't a model bundle: {error}") from None
+
+
+def _bundled_fit(arrays: dict, details: dict) -> ArimaFit:
+    """Rebuild a fit's outputs from a bundle's arrays and details."""
+    if details["dated"]:
+        index = pd.DatetimeIndex(arrays["index"], freq=details["freq"])
+    else:
+        index = pd.Index(arrays["index"])
+    intervals = None
+    if "intervals" in arrays:
+        columns = pd.MultiIndex.from_arrays(
+            [arrays["alphas"], arrays["bounds"]], names=["alpha", "bound"]
+        )
+        intervals = pd.DataFrame(arrays["intervals"], index, columns)
+    state = None
+    if "state_mean" in arrays:
+        fields = {
+            field: arrays[f"state_{field}"]
+            for field in ForecastState._fields
+            if f"state_{field}" in arrays
+        }
+        for field in ("obs_var", "obs_intercept"):
+            fields[field] = float(fields[field])
+        for field in ("period", "position"):
+            fields[field] = int(fields.get(field, 0))
+        state = ForecastState(**fields)
+
+    return ArimaFit(
+        predictions=pd.Series(
+            dtype="float64", index=index[:0], name=details["name"]
+        ),
+        forecast=pd.Series(arrays["forecast"], index, name=details["name"]),
+        params=pd.Series(arrays["params"], index=arrays["param_names"]),
+        aic=details["aic"],
+        bic=details["bic"],
+        intervals=intervals,
+        state=state,
+    )
+
+
+def forecast_model(bundle: ModelBundle, horizon: int) -> ArimaFit:
+    """Forecast `horizon` periods with a loaded model, without refitting it:
+    from its saved forecast, extended by only the extra periods.
+
+    Args:
+        bundle (ModelBundle): The loaded model.
+        horizon (int): Periods to forecast.
+
+    Raises:
+        ValueError: If a longer forecast is needed than was saved, and the
+            model has no forecast state (e.g. it's an approximate fit).
+
+    Returns:
+        ArimaFit: The model's outputs, with a forecast of `horizon` periods.
+    """
+    return truncate_forecast(extend_forecast(bundle.fit, horizon), horizon)
@@ -1,7 +1,33 @@
-from typing import Optional
+import io
+import logging
+from base64 import b64decode
+from pathlib import Path
+from typing import BinaryIO, Callable, Dict, NamedTuple, Optional, Union
 
 import pandas as pd
 from dateutil.parser import ParserError as dtParserError
+from pandas.api.types import is_bool_dtype, is_numeric_dtype
+from ts_app.dates import infer_frequency, parse_dates
+
+logger = logging.getLogger(__name__)
+
+# Rows read up-front to validate a file before parsing all of it
+PREVIEW_ROWS = 256
+CHUNK_ROWS = 25_000
+
+DATE_ERROR = (
+    "Please try again... it seems that the values in the 1st column "
+    "could not be read as dates."
+)
+NUMBER_ERROR = (
+    "Please try again... the column {!r} has values further down that "
+    "could not be read as numbers."
+)
+FREQUENCY_ERROR = (
+    "Please try again... a uniform date frequency "
+    "(which is needed in some of the time series functions used) "
+    "could not be determined."
+)
 
 
 def process_upload(data: pd.DataFrame) -> Optional[str]:
@@ -24,19 +50,12 @@ def process_upload(data: pd.DataFrame) -> Optional[str]:
     # If date frequency can't be inferred, or is not consistent, some
     # statsmodels time series functions won't work.
     try:
-        data.index = pd.to_datetime(data.index)
-
-        if pd.infer_freq(data.index) in {None, "N"}:
-            return (
-                "Please try again... a uniform date frequency "
-                "(which is needed in some of the time series functions used) "
-                "could not be determined."
-            )
+        data.index = parse_dates(data.index, evenly_spaced=True).index
+
+        if infer_frequency(data.index) in {None, "N"}:
+            return FREQUENCY_ERROR
     except (dtParserError, TypeError, ValueError):
-        return (
-            "Please try again... it seems that the values in the 1st column "
-            "could not be read as dates."
-        )
+        return DATE_ERROR
 
     # Ensure the data has at least 2 columns, since the first column is read
     # as the index.
@@ -48,3 +67,196 @@ def process_upload(data: pd.DataFrame) -> Optional[str]:
             "Please ensure that the data has a date index and at least one "
             "other column with numeric values."
         )
+
+
+class Base64Reader(io.RawIOBase):
+    """A binary file-like object that decodes base64 text lazily, a chunk at
+    a time, so that the whole decoded file is never held in memory.
+
+    Args:
+        encoded (str): Base64-encoded text.
+        start (int, optional): Position in `encoded` at which the data
+            begins, e.g. after a data-URL prefix. Defaults to 0.
+        chunk_size (int, optional): Number of characters to decode at a time.
+            Defaults to 256KiB.
+    """
+
+    def __init__(
+        self, encoded: str, start: int = 0, chunk_size: int = 1024 * 256
+    ) -> None:
+        self._encoded = encoded
+        self._position = start
+        self._chunk_size = chunk_size - chunk_size % 4  # whole base64 blocks
+        self._pending = bytearray()
+
+    def readable(self) -> bool:
+        return True
+
+    def readinto(self, buffer) -> int:
+        while len(self._pending) < len(buffer) and self._position < len(
+            self._encoded
+        ):
+            start, end = self._position, self._position + self._chunk_size
+            self._pending += b64decode(self._encoded[start:end])
+            self._position = end
+
+        size = min(len(buffer), len(self._pending))
+        buffer[:size] = self._pending[:size]
+        del self._pending[:size]
+        return size
+
+
+class UploadResult(NamedTuple):
+    """The outcome of reading an uploaded file."""
+
+    data: Optional[pd.DataFrame]  # numeric columns, sharing one date index
+    error: Optional[str]
+
+
+def _open_upload(contents: str) -> io.BufferedReader:
+    """Get a decoded stream of a `dcc.Upload` data-URL."""
+    return io.BufferedReader(
+        Base64Reader(contents, start=contents.index(",") + 1)
+    )
+
+
+def _read_csv(open_file: Callable[[], BinaryIO]) -> UploadResult:
+    """Validate a preview of a CSV file, then read its date column and
+    numeric columns in chunks.
+    """
+    with open_file() as file:
+        preview = pd.read_csv(file, index_col=0, nrows=PREVIEW_ROWS)
+    if (error := process_upload(data=preview)) is not None:
+        return UploadResult(None, error)
+
+    # Columns are picked by position, as their names may repeat
+    value_columns = [
+        position + 1
+        for position, dtype in enumerate(preview.dtypes)
+        if is_numeric_dtype(dtype) and not is_bool_dtype(dtype)
+    ]
+    parts = []
+    # The preview's date format is remembered, so it's tried first when
+    # detecting the first chunk's format, which is then reused
+    date_formats = None
+    with open_file() as file:
+        chunks = pd.read_csv(
+            file,
+            index_col=0,
+            usecols=[0, *value_columns],
+            chunksize=CHUNK_ROWS,
+        )
+        try:
+            for chunk in chunks:
+                # The preview's numeric columns may have text further down
+                for name, dtype in chunk.dtypes.items():
+                    if not is_numeric_dtype(dtype):
+                        return UploadResult(None, NUMBER_ERROR.format(name))
+                # Parse dates a chunk at a time, to discard raw strings early
+                chunk.index, date_format = parse_dates(
+                    chunk.index, date_formats
+                )
+                if date_format is not None:
+                    date_formats = [date_format]
+                parts.append(chunk)
+        except (dtParserError, TypeError, ValueError):
+            return UploadResult(None, DATE_ERROR)
+    return UploadResult(pd.concat(parts), None)
+
+
+def _read_excel(open_file: Callable[[], BinaryIO]) -> UploadResult:
+    """Read an Excel file. Excel files are zip archives, so they can't be
+    read in chunks.
+    """
+    with open_file() as file:
+        if not file.seekable():
+            file = io.BytesIO(file.read())
+        data = pd.read_excel(file, index_col=0)
+    if (error := process_upload(data=data.head(PREVIEW_ROWS))) is not None:
+        return UploadResult(None, error)
+    try:
+        data.index = parse_dates(data.index, evenly_spaced=True).index
+    except (dtParserError, TypeError, ValueError):
+        return UploadResult(None, DATE_ERROR)
+    return UploadResult(data.select_dtypes(include="number"), None)
+
+
+def read_upload(contents: str, filename: str) -> UploadResult:
+    """Extract and validate the data in an uploaded file.
+
+    A preview of the file is validated first, so that invalid files are
+    rejected before being read in full. Only the date column and numeric
+    columns of CSV files are parsed, and the dates are parsed and validated
+    once for all columns.
+
+    Args:
+        contents (str): A base64-encoded data-URL, as given by `dcc.Upload`.
+        filename (str): The name of the uploaded file.
+
+    Raises:
+        ValueError: If the file extension isn't supported.
+
+    Returns:
+        UploadResult: The numeric columns, or the validation error.
+    """
+    return _read_file(lambda: _open_upload(contents), filename)
+
+
+def read_upload_file(path: Union[str, Path], filename: str) -> UploadResult:
+    """Extract and validate the data in a file saved on disk, e.g. a large
+    file streamed to the server.
+
+    Args:
+        path (Union[str, Path]): Where the file is saved.
+        filename (str): The file's original name.
+
+    Raises:
+        ValueError: If the file extension isn't supported.
+
+    Returns:
+        UploadResult: The numeric columns, or the validation error.
+    """
+    return _read_file(lambda: open(path, "rb"), filename)
+
+
+def _read_file(
+    open_file: Callable[[], BinaryIO], filename: str
+) -> UploadResult:
+    """Read a file with the reader for its type. The reader validates a
+    preview of the file, so only the frequency of all its dates is checked
+    afterwards.
+    """
+    if filename.endswith(".csv"):
+        reader = _read_csv
+    elif filename.endswith(".xls") or filename.endswith(".xlsx"):
+        reader = _read_excel
+    else:
+        raise ValueError(f"Unsupported file type: {filename!r}")
+
+    data, error = reader(open_file)
+    if data is not None and infer_frequency(data.index) in {None, "N"}:
+        data, error = None, FREQUENCY_ERROR
+    logger.info(
+        "Read %s (%d rows)", filename, 0 if data is None else len(data)
+    )
+    return UploadResult(data, error)
+
+
+def upload_info(filename: str, columns: Dict[str, str]) -> dict:
+    """Get the information stored in the browser about an uploaded file.
+
+    Args:
+        filename (str): The file's name.
+        columns (Dict[str, str]): Each numeric column's name and dataset ID.
+
+    Returns:
+        dict: The file name, every column's dataset ID, and the name and
+        dataset ID of the analysed (right-most) column.
+    """
+    column, dataset_id = list(columns.items())[-1]
+    return {
+        "filename": filename,
+        "dataset_id": dataset_id,
+        "column": column,
+        "columns": columns,
+    }
@@ -0,0 +1,477 @@
+import hashlib
+import json
+import logging
+import multiprocessing
+import os
+import threading
+import time
+from collections import deque
+from concurrent.futures import (
+    CancelledError,
+    Executor,
+    Future,
+    ProcessPoolExecutor,
+)
+from concurrent.futures import TimeoutError as FutureTimeoutError
+from pathlib import Path
+from typing import Any, Callable, Optional, Tuple, Union
+
+logger = logging.getLogger(__name__)
+
+
+class JobCancelled(Exception):
+    """Raised when a job is superseded by a newer job from the same session."""
+
+
+class JobTimeout(Exception):
+    """Raised when a job takes longer than the allowed time."""
+
+
+def _timed_call(
+    func: Callable, *args: Any, **kwargs: Any
+) -> Tuple[float, float, Any]:
+    """Run a function in a worker process, noting when it started and how
+    long it took.
+
+    Returns:
+        Tuple[float, float, Any]: The start time, run time and result.
+    """
+    start = time.time()
+    result = func(*args, **kwargs)
+    return start, time.time() - start, result
+
+
+class Job:
+    """A unit of work submitted to a `JobManager`.
+
+    Args:
+        session (str): The session that submitted the job.
+        future (concurrent.futures.Future): The job's pending result.
+    """
+
+    def __init__(self, session: str, future: Future) -> None:
+        self.session = session
+        self.future = future
+        self.submitted = time.time()
+        self.superseded = False
+        # The future handed out by a SessionExecutor, if any
+        self.relay: Optional[Future] = None
+
+    @property
+    def state(self) -> str:
+        """One of "queued", "running", "cancelled" or "done"."""
+        if self.superseded or self.future.cancelled():
+            return "cancelled"
+        elif self.future.done():
+            return "done"
+        elif self.future.running():
+            return "running"
+        return "queued"
+
+
+class _Request:
+    """A token identifying one of a session's requests, marked once a newer
+    request (or an expiry) supersedes it.
+    """
+
+    def __init__(self) -> None:
+        self.superseded = False
+
+
+class SessionExecutor(Executor):
+    """An executor that runs one session request's jobs through a
+    `JobManager`, e.g. the candidate fits of an order search. Its jobs are
+    superseded together by the session's next request.
+
+    Its futures give the job function's return value, and are cancelled as
+    soon as their job is superseded, even if it's still running.
+
+    Args:
+        manager (JobManager): The manager to submit jobs to.
+        session (str): The session that made the request.
+        request (_Request): A token identifying the request.
+    """
+
+    def __init__(
+        self, manager: "JobManager", session: str, request: _Request
+    ) -> None:
+        self._manager = manager
+        self._session = session
+        self._request = request
+
+    def submit(self, fn: Callable, /, *args: Any, **kwargs: Any) -> Future:
+        job = self._manager._add(
+            self._session, self._request, fn, args, kwargs
+        )
+        future = Future()
+        lock = threading.RLock()
+        settled = []
+
+        def relay(done: Optional[Future]) -> None:
+            """Pass on the job's outcome, or (if `done` is None, or the job
+            was cancelled) notify anyone waiting that `future` is cancelled.
+            Only the first call has any effect.
+            """
+            with lock:
+                if settled:
+                    return
+                settled.append(True)
+                if done is None or done.cancelled() or job.superseded:
+                    future.cancel()
+                if not future.set_running_or_notify_cancel():
+                    return
+            if (error := done.exception()) is not None:
+                future.set_exception(error)
+            else:
+                future.set_result(done.result()[2])
+
+        def cancel_job(result: Future) -> None:
+            if result.cancelled():
+                job.future.cancel()
+                relay(None)
+
+        job.relay = future
+        job.future.add_done_callback(relay)
+        future.add_done_callback(cancel_job)
+        return future
+
+
+class JobManager:
+    """Run CPU-bound jobs in a pool of worker processes, keeping only the
+    latest request from each session.
+
+    When a session submits a new job, the jobs of its earlier request are
+    cancelled if they haven't started yet, or have their results discarded
+    otherwise. Running jobs can't be interrupted, so a timed-out job still
+    occupies its worker until it completes. A session is forgotten once its
+    jobs have finished, or it has expired.
+
+    Args:
+        max_workers (Optional[int], optional): Number of worker processes.
+            Defaults to None (the number of CPUs).
+        timeout (float, optional): Seconds to wait for a job's result.
+            Defaults to 60.
+    """
+
+    def __init__(
+        self, max_workers: Optional[int] = None, timeout: float = 60
+    ) -> None:
+        self.max_workers = max_workers
+        self.timeout = timeout
+        self.completed = 0
+        self.cancelled = 0
+        self.timed_out = 0
+        self.latencies = deque(maxlen=1000)  # (queued, running) seconds
+        self._executor = None
+        # session -> (its latest request, that request's unfinished jobs)
+        self._requests = {}
+        self._lock = threading.Lock()
+
+    @property
+    def executor(self) -> ProcessPoolExecutor:
+        """The process pool, created when the first job is submitted."""
+        with self._lock:
+            if self._executor is None:
+                self._executor = ProcessPoolExecutor(
+                    max_workers=self.max_workers,
+                    # Forking a multi-threaded server process is unsafe
+                    mp_context=multiprocessing.get_context("spawn"),
+                )
+            return self._executor
+
+    @property
+    def stats(self) -> dict:
+        """Queue depth, job counts and latency summaries (in seconds)."""
+        with self._lock:
+            jobs = [job for _, jobs in self._requests.values() for job in jobs]
+            latencies = list(self.latencies)
+        waits = [wait for wait, _ in latencies]
+        runs = [run for _, run in latencies]
+        return {
+            "queue_depth": sum(job.state == "queued" for job in jobs),
+            "running": sum(job.state == "running" for job in jobs),
+            "completed": self.completed,
+            "cancelled": self.cancelled,
+            "timed_out": self.timed_out,
+            "mean_wait": sum(waits) / len(waits) if waits else 0.0,
+            "mean_run": sum(runs) / len(runs) if runs else 0.0,
+            "max_latency": max(map(sum, latencies), default=0.0),
+        }
+
+    def submit(
+        self, session: str, func: Callable, *args: Any, **kwargs: Any
+    ) -> Job:
+        """Queue a job, superseding any earlier jobs from the same session.
+
+        Args:
+            session (str): An identifier for the submitting user session.
+            func (Callable): A picklable function to run.
+            *args, **kwargs: Arguments for `func`.
+
+        Returns:
+            Job: The queued job.
+        """
+        request = self._supersede(session)
+        return self._add(session, request, func, args, kwargs)
+
+    def session_executor(self, session: str) -> SessionExecutor:
+        """Start a request that runs several jobs, superseding any earlier
+        jobs from the same session.
+
+        Args:
+            session (str): An identifier for the submitting user session.
+
+        Returns:
+            SessionExecutor: An executor for the request's jobs.
+        """
+        return SessionExecutor(self, session, self._supersede(session))
+
+    def expire(self, session: str) -> None:
+        """Cancel a session's pending jobs because its request took too long,
+        counting it as timed out, and forget the session.
+
+        Args:
+            session (str): The session identifier.
+        """
+        self._supersede(session, timed_out=True)
+
+    def _supersede(self, session: str, timed_out: bool = False) -> _Request:
+        """Start a new request for a session (unless it timed out),
+        cancelling its earlier jobs.
+
+        Returns:
+            _Request: A token identifying the new request.
+        """
+        request = _Request()
+        with self._lock:
+            previous, jobs = self._requests.pop(session, (None, []))
+            if previous is not None:
+                previous.superseded = True
+            if timed_out:
+                request.superseded = True
+            else:
+                self._requests[session] = (request, [])
+            stale = [job for job in jobs if not job.future.done()]
+            for job in stale:
+                job.superseded = True
+            if timed_out:
+                self.timed_out += 1
+            else:
+                self.cancelled += len(stale)
+
+        for job in stale:
+            job.future.cancel()  # only succeeds if it hasn't started
+            if job.relay is not None:
+                job.relay.cancel()
+        return request
+
+    def _add(
+        self,
+        session: str,
+        request: _Request,
+        func: Callable,
+        args: tuple,
+        kwargs: dict,
+    ) -> Job:
+        """Queue a job for a session's request, or cancel it straight away if
+        the request has been superseded.
+        """
+        future = self.executor.submit(_timed_call, func, *args, **kwargs)
+        job = Job(session, future)
+
+        with self._lock:
+            # The session is forgotten between jobs if they've all finished
+            if not request.superseded:
+                current, jobs = self._requests.setdefault(
+                    session, (request, [])
+                )
+                job.superseded = current is not request
+            else:
+                job.superseded = True
+            if job.superseded:
+                self.cancelled += 1
+            else:
+                jobs.append(job)
+
+        future.add_done_callback(lambda _: self._record(job))
+
+        if job.superseded:
+            future.cancel()
+        return job
+
+    def _record(self, job: Job) -> None:
+        """Collect latency data for a finished job, and forget its session
+        if it has no other unfinished jobs. Superseded jobs were already
+        counted as cancelled, even if they ran to completion.
+        """
+        with self._lock:
+            _, jobs = self._requests.get(job.session, (None, []))
+            if job in jobs:
+                jobs.remove(job)
+                if not jobs:
+                    del self._requests[job.session]
+
+        if job.future.cancelled() or job.future.exception() is not None:
+            return
+        start, run_time, _ = job.future.result()
+        with self._lock:
+            if job.superseded:
+                return
+            self.completed += 1
+            self.latencies.append((max(start - job.submitted, 0), run_time))
+
+    def result(self, job: Job, timeout: Optional[float] = None) -> Any:
+        """Wait for a job's result.
+
+        Args:
+            job (Job): A submitted job.
+            timeout (Optional[float], optional): Seconds to wait. Defaults to
+                None (the manager's `timeout`).
+
+        Raises:
+            JobCancelled: If a newer job from the same session superseded it.
+            JobTimeout: If the result isn't ready in time.
+
+        Returns:
+            Any: The job function's return value.
+        """
+        if timeout is None:
+            timeout = self.timeout
+        try:
+            _, _, result = job.future.result(timeout=timeout)
+        except CancelledError:
+            raise JobCancelled("Superseded by a newer job.") from None
+        except FutureTimeoutError:
+            job.future.cancel()
+            with self._lock:
+                self.timed_out += 1
+            raise JobTimeout(
+                f"The job took longer than {timeout} seconds."
+            ) from None
+
+        if job.superseded:
+            raise JobCancelled("Superseded by a newer job.")
+        return result
+
+    def status(self, session: str) -> str:
+        """Describe the progress of a session's latest job.
+
+        Args:
+            session (str): The session identifier.
+
+        Returns:
+            str: A progress message, or an empty string if there's no
+            pending job.
+        """
+        with self._lock:
+            _, jobs = self._requests.get(session, (None, []))
+            states = {job.state: job.submitted for job in reversed(jobs)}
+        if "running" in states:
+            elapsed = time.time() - states["running"]
+            return f"Fitting the model... ({elapsed:.0f}s)"
+        elif "queued" in states:
+            elapsed = time.time() - states["queued"]
+            return (
+                f"Waiting for a free worker... {self.stats['queue_depth']}"
+                f" job(s) queued ({elapsed:.0f}s)"
+            )
+        return ""
+
+    def shutdown(self) -> None:
+        """Stop the worker processes, cancelling queued jobs."""
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=False, cancel_futures=True)
+
+
+class ProgressStore:
+    """Keep the progress of long-running requests (e.g. order searches), so
+    that any server process can report it.
+
+    Records are JSON objects, held in memory, or saved to a local directory
+    to share them between worker processes.
+
+    Args:
+        directory (Optional[Union[str, Path]], optional): A folder in which
+            to save records. Defaults to None (memory only).
+    """
+
+    def __init__(self, directory: Optional[Union[str, Path]] = None) -> None:
+        self._records = {}
+        self._lock = threading.Lock()
+        self.directory = None
+        if directory is not None:
+            self.set_directory(directory)
+
+    def set_directory(self, directory: Union[str, Path]) -> None:
+        """Save records to the given folder, creating it if necessary.
+
+        Args:
+            directory (Union[str, Path]): The progress folder.
+        """
+        self.directory = Path(directory)
+        self.directory.mkdir(parents=True, exist_ok=True)
+
+    def _path(self, key: str) -> Path:
+        # Keys come from the browser, so they aren't used as file names
+        digest = hashlib.blake2b(key.encode(), digest_size=16).hexdigest()
+        return self.directory / f"{digest}.json"
+
+    def get(self, key: Optional[str]) -> Optional[dict]:
+        """Read a record.
+
+        Args:
+            key (Optional[str]): The record's key.
+
+        Returns:
+            Optional[dict]: The record, or None if it's unknown.
+        """
+        if key is None:
+            return None
+        if self.directory is None:
+            with self._lock:
+                record = self._records.get(key)
+            return None if record is None else dict(record)
+
+        try:
+            return json.loads(self._path(key).read_text())
+        except FileNotFoundError:
+            return None
+        except (OSError, ValueError) as error:
+            logger.warning("Couldn't read progress of %s: %s", key, error)
+            return None
+
+    def put(self, key: str, record: dict) -> None:
+        """Save a record, replacing any earlier record with the same key.
+
+        Args:
+            key (str): The record's key.
+            record (dict): A JSON-serialisable record.
+        """
+        if self.directory is None:
+            with self._lock:
+                self._records[key] = dict(record)
+            return
+
+        path = self._path(key)
+        temp_path = path.with_suffix(f".{os.getpid()}.tmp")
+        try:
+            temp_path.write_text(json.dumps(record))
+            os.replace(temp_path, path)  # atomic, for concurrent workers
+        except OSError as error:
+            logger.warning("Couldn't save progress of %s: %s", key, error)
+
+    def pop(self, key: str) -> None:
+        """Remove a record, if it exists.
+
+        Args:
+            key (str): The record's key.
+        """
+        with self._lock:
+            self._records.pop(key, None)
+        if self.directory is not None:
+            self._path(key).unlink(missing_ok=True)
+
+
+JOB_MANAGER = JobManager()
@@ -0,0 +1,175 @@
+import logging
+import math
+import threading
+import time
+from contextlib import contextmanager
+from typing import Dict, Iterator, Optional, Sequence, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Upper bounds of the latency histogram buckets, in seconds
+DEFAULT_BUCKETS = (
+    0.005,
+    0.01,
+    0.025,
+    0.05,
+    0.1,
+    0.25,
+    0.5,
+    1.0,
+    2.5,
+    5.0,
+    10.0,
+    30.0,
+    60.0,
+)
+
+
+def size_label(size: int) -> str:
+    """Get a coarse label for a series length, e.g. "<=1e3", to keep the
+    number of distinct label values small.
+
+    Args:
+        size (int): The series length.
+
+    Returns:
+        str: The smallest power of 10 that's at least `size`.
+    """
+    return f"<=1e{max(math.ceil(math.log10(max(size, 1))), 0)}"
+
+
+def _format_labels(labels: Tuple[Tuple[str, str], ...]) -> str:
+    if not labels:
+        return ""
+    escaped = (
+        (name, value.replace("\\", "\\\\").replace('"', '\\"'))
+        for name, value in labels
+    )
+    return "{" + ",".join(f'{name}="{value}"' for name, value in escaped) + "}"
+
+
+class Histogram:
+    """A Prometheus-style histogram, with one set of buckets per distinct
+    combination of label values.
+
+    Args:
+        name (str): The metric's name.
+        description (str): A help text for the metric.
+        buckets (Sequence[float], optional): Bucket upper bounds. Defaults
+            to DEFAULT_BUCKETS.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        description: str,
+        buckets: Sequence[float] = DEFAULT_BUCKETS,
+    ) -> None:
+        self.name = name
+        self.description = description
+        self.buckets = tuple(sorted(buckets))
+        self._series = {}  # labels -> (bucket counts, sum, count)
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, **labels: str) -> None:
+        """Record an observation.
+
+        Args:
+            value (float): The observed value.
+            **labels (str): Label values, e.g. `stage="fit"`.
+        """
+        key = tuple(sorted((name, str(val)) for name, val in labels.items()))
+        with self._lock:
+            counts, total, count = self._series.get(
+                key, ([0] * len(self.buckets), 0.0, 0)
+            )
+            counts = [
+                n + (value <= bound) for n, bound in zip(counts, self.buckets)
+            ]
+            self._series[key] = (counts, total + value, count + 1)
+
+    def collect(self) -> Dict[Tuple[Tuple[str, str], ...], tuple]:
+        """Get the bucket counts, sum and count for each set of labels."""
+        with self._lock:
+            return dict(self._series)
+
+    def render(self) -> str:
+        """Get the histogram in the Prometheus text exposition format."""
+        lines = [
+            f"# HELP {self.name} {self.description}",
+            f"# TYPE {self.name} histogram",
+        ]
+        for labels, (counts, total, count) in sorted(self.collect().items()):
+            for bound, n in zip(self.buckets, counts):
+                bucket_labels = _format_labels(labels + (("le", f"{bound}"),))
+                lines.append(f"{self.name}_bucket{bucket_labels} {n}")
+            inf_labels = _format_labels(labels + (("le", "+Inf"),))
+            lines.append(f"{self.name}_bucket{inf_labels} {count}")
+            lines.append(f"{self.name}_sum{_format_labels(labels)} {total}")
+            lines.append(f"{self.name}_count{_format_labels(labels)} {count}")
+        return "\n".join(lines)
+
+    def clear(self) -> None:
+        """Remove all observations."""
+        with self._lock:
+            self._series.clear()
+
+
+SPAN_SECONDS = Histogram(
+    "ts_app_span_seconds", "Time spent in each stage of a callback."
+)
+REQUEST_SECONDS = Histogram(
+    "ts_app_request_seconds", "Time spent handling each HTTP request."
+)
+
+
+@contextmanager
+def span(name: str, **labels: str) -> Iterator[Dict[str, str]]:
+    """Time a block of code, recording the duration in the
+    `ts_app_span_seconds` histogram, and logging it at DEBUG level.
+
+    Labels can be added inside the block, through the yielded dict (e.g.
+    once the data's size is known).
+
+    Args:
+        name (str): The stage's name, e.g. "model_and_predict.fit".
+        **labels (str): Extra label values, e.g. `order="1-0-1"`.
+
+    Yields:
+        Dict[str, str]: The span's labels.
+    """
+    labels = {"span": name, **labels}
+    start = time.perf_counter()
+    try:
+        yield labels
+    finally:
+        duration = time.perf_counter() - start
+        SPAN_SECONDS.observe(duration, **labels)
+        logger.debug(
+            "span %s took %.4fs",
+            name,
+            duration,
+            extra={"span": labels, "duration": duration},
+        )
+
+
+def render_metrics(
+    extra: Optional[Dict[str, Tuple[str, str, float]]] = None
+) -> str:
+    """Get all metrics in the Prometheus text exposition format.
+
+    Args:
+        extra (Optional[Dict[str, Tuple[str, str, float]]], optional):
+            Other metrics to include, as {name: (type, description, value)}
+            where type is "counter" or "gauge". Defaults to None.
+
+    Returns:
+        str: The metrics, ending with a newline.
+    """
+    sections = [SPAN_SECONDS.render(), REQUEST_SECONDS.render()]
+    for name, (kind, description, value) in (extra or {}).items():
+        sections.append(
+            f"# HELP {name} {description}\n# TYPE {name} {kind}\n"
+            f"{name} {value}"
+        )
+    return "\n".join(sections) + "\n"
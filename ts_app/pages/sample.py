@@ -1,7 +1,11 @@
+from typing import Optional
+
 import dash
 from dash import Input, Output, callback, dcc, html
 from ts_app.components import modelling
-from ts_app.ts_functions import create_arma_sample
+from ts_app.datasets import DATASETS
+from ts_app.metrics import size_label, span
+from ts_app.samples import SAMPLE_BANK, SAMPLE_SIZE
 
 dash.register_page(__name__)
 
@@ -30,6 +34,7 @@ sample_param_dropdown = html.Div(
             value=1,
             options=[{"label": f"{i}", "value": i} for i in range(1, 5)],
         ),
+        html.Button("New sample", id="sample-new", className="button"),
     ],
 )
 
@@ -38,21 +43,40 @@ layout = modelling.generate_layout(input_source=sample_param_dropdown)
 
 @callback(
     Output("sample-data-store", "data"),
-    [Input("sample-ar", "value"), Input("sample-ma", "value")],
+    [
+        Input("sample-ar", "value"),
+        Input("sample-ma", "value"),
+        Input("sample-new", "n_clicks"),
+    ],
 )
-def get_sample(ar_order: int, ma_order: int) -> dict:
-    """Generate a random ARMA sample with the provided parameters.
+def get_sample(
+    ar_order: int, ma_order: int, new_samples: Optional[int] = None
+) -> dict:
+    """Get a seeded ARMA sample with the provided parameters, from the
+    sample bank. The same parameters always give the same sample, until the
+    "New sample" button is clicked.
 
     Args:
         ar_order (int): AR order.
         ma_order (int): MA order.
+        new_samples (Optional[int]): Number of times a new sample was
+            requested, used as the seed.
 
     Returns:
-        dict: The sample's description and data.
+        dict: The sample's description and dataset ID.
     """
-    sample = create_arma_sample(ar_order, ma_order, size=365)
+    labels = {
+        "size": size_label(SAMPLE_SIZE),
+        "order": f"{ar_order}-{ma_order}",
+    }
+    with span("get_sample.create", **labels):
+        sample = SAMPLE_BANK.get(
+            ar_order, ma_order, SAMPLE_SIZE, new_samples or 0
+        )
+    with span("get_sample.store", **labels):
+        dataset_id = DATASETS.put(sample)
 
     return {
         "filename": f"an ARMA({ar_order}, {ma_order}) sample",
-        "data": sample.to_json(),
+        "dataset_id": dataset_id,
     }
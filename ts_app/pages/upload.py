@@ -1,12 +1,14 @@
-from base64 import b64decode
-from io import BytesIO, StringIO
+import logging
 from typing import Optional, Tuple
 
 import dash
-import pandas as pd
 from dash import Input, Output, callback, dcc, html
-from ts_app.components import modelling
-from ts_app.file_upload import process_upload
+from ts_app.components import batch, modelling
+from ts_app.datasets import DATASETS
+from ts_app.file_upload import read_upload, upload_info
+from ts_app.metrics import size_label, span
+
+logger = logging.getLogger(__name__)
 
 dash.register_page(__name__)
 
@@ -23,7 +25,7 @@ file_upload_component = html.Div(
                     children=[
                         html.Li("At most 7MiB"),
                         html.Li("Dates in first column"),
-                        html.Li("Numeric data in right-most column"),
+                        html.Li("Numeric data in the other columns"),
                         html.Li("At least 32 rows"),
                     ]
                 ),
@@ -31,7 +33,14 @@ file_upload_component = html.Div(
             min_size=32,
             max_size=1024**2 * 7,  # 7MiB
         ),
+        # Larger files are streamed to the server by assets/large_upload.js
+        html.Button(
+            "Choose a large file (up to 1GiB)",
+            id="large-file-upload",
+            className="button large-file-upload",
+        ),
         html.P(id="file-info"),
+        batch.batch_forecast_component,
     ]
 )
 
@@ -43,57 +52,64 @@ layout = modelling.generate_layout(input_source=file_upload_component)
         Output("file-info", "children"),
         Output("file-info", "style"),
         Output("file-upload-store", "data"),
+        Output("batch-table", "data", allow_duplicate=True),
     ],
     [Input("file-upload", "contents"), Input("file-upload", "filename")],
+    prevent_initial_call="initial_duplicate",
 )
 def get_upload_data(
     contents: str, filename: str
-) -> Tuple[str, dict, Optional[dict]]:
+) -> Tuple[str, dict, Optional[dict], list]:
     """Extract and validate data from uploaded files.
 
+    Every numeric column is stored as a dataset, and the right-most one is
+    analysed first.
+
     Args:
         contents (str): Base64-encoded string with the file's contents.
         filename (str): The name of the uploaded file.
 
     Returns:
-        Tuple[str, dict, Optional[dict]]: file-info message, file-info style
-        and the data-dict to store.
+        Tuple[str, dict, Optional[dict], list]: file-info message, file-info
+        style, the file name & dataset IDs to store, and an empty batch
+        summary table.
     """
     if contents is None:
         return (
             "",  # No file information
             {},  # No special style
             None,  # No data to store
+            [],  # No batch results
         )
-    else:
-        content_string = contents.split(",")[1]
-        file_content = b64decode(content_string)
 
     try:
-        if filename.endswith(".csv"):
-            df = pd.read_csv(
-                StringIO(file_content.decode("utf-8")), index_col=0
-            )
-        elif filename.endswith(".xls") or filename.endswith(".xlsx"):
-            df = pd.read_excel(BytesIO(file_content), index_col=0)
-    except Exception as error:
-        print(error)
+        with span("get_upload_data.read") as labels:
+            data, validation_error = read_upload(contents, filename)
+            labels["size"] = size_label(0 if data is None else len(data))
+        if validation_error is None:
+            with span("get_upload_data.store", size=size_label(len(data))):
+                columns = DATASETS.put_columns(data)
+    except Exception:
+        logger.exception("Upload failed")
         return (
             "There was an error processing the file.",
             {"color": "orangered"},
             None,  # No data to store
+            [],  # No batch results
         )
 
-    if (validation_error := process_upload(data=df)) is not None:
+    if validation_error is not None:
         return (
             validation_error,
             {"color": "orangered"},
             None,  # No data to store
+            [],  # No batch results
         )
     else:
         # If file-upload and data-extraction succeed
         return (
             f"Analysing {filename}",
             {"color": "#31bf2c"},
-            {"filename": filename, "data": df.iloc[:, -1].to_json()},
+            upload_info(filename, columns),
+            [],  # No batch results
         )
@@ -1,10 +1,39 @@
+from base64 import b64encode
+from typing import Optional, Sequence, Tuple, Union
+
+import numpy as np
+import pandas as pd
 import plotly.graph_objects as go
 from pandas.core.series import Series
 from plotly.subplots import make_subplots
+from ts_app.downsampling import DEFAULT_MAX_POINTS, downsample
+
+# Figures with more points than these use WebGL traces, and binary-encoded
+# arrays, respectively
+WEBGL_THRESHOLD = 5000
+BINARY_THRESHOLD = 1000
+
+
+def _scatter_type(
+    *series: Series, webgl: Optional[bool] = None
+) -> type[go.Scatter]:
+    """Get the trace type to use: `Scattergl` (WebGL) for many points, if
+    `webgl` is None, or as specified otherwise.
+    """
+    if webgl is None:
+        webgl = sum(len(data) for data in series) > WEBGL_THRESHOLD
+    return go.Scattergl if webgl else go.Scatter
 
 
 def plot_ts_components(
-    trend: Series, seasonal: Series, residuals: Series, file_name: str
+    trend: Series,
+    seasonal: Series,
+    residuals: Series,
+    file_name: str,
+    max_points: Optional[int] = DEFAULT_MAX_POINTS,
+    webgl: Optional[bool] = None,
+    period: Optional[Union[int, Sequence[int]]] = None,
+    method: Optional[str] = None,
 ) -> go.Figure:
     """Get subplots of time series components (trend, seasonal, residuals).
 
@@ -13,41 +42,72 @@ def plot_ts_components(
         seasonal (pandas.Series): Estimated seasonal component.
         residuals (pandas.Series): Estimated residual component.
         file_name (str): Data source information.
+        max_points (Optional[int], optional): Maximum number of points per
+            trace; longer series are downsampled. Defaults to
+            DEFAULT_MAX_POINTS. None disables downsampling.
+        webgl (Optional[bool], optional): Whether to use WebGL traces.
+            Defaults to None (only above WEBGL_THRESHOLD points).
+        period (Optional[Union[int, Sequence[int]]], optional): The
+            seasonal component's period (or periods), shown in its title.
+            Defaults to None (not shown).
+        method (Optional[str], optional): Name of the decomposition method
+            (e.g. "STL"), shown in the title. Defaults to None (not shown).
 
     Returns:
         plotly.graph_objs._figure.Figure: Subplots of time series components.
     """
+    trend, seasonal, residuals = (
+        downsample(component, max_points)
+        for component in (trend, seasonal, residuals)
+    )
+    Scatter = _scatter_type(trend, seasonal, residuals, webgl=webgl)
+    periods = list(period) if isinstance(period, Sequence) else [period]
+    periods = [str(period) for period in periods if period]
+    seasonal_title = "Seasonal"
+    if periods:
+        label = "periods" if len(periods) > 1 else "period"
+        seasonal_title = f"Seasonal ({label} {', '.join(periods)})"
     fig = make_subplots(
         rows=3,
         cols=1,
         shared_xaxes=True,
-        subplot_titles=("Trend", "Seasonal", "Residuals"),
+        subplot_titles=(
+            "Trend",
+            seasonal_title,
+            "Residuals",
+        ),
         vertical_spacing=0.24,
     )
-    fig.add_scatter(
-        x=trend.index,
-        y=trend,
-        mode="lines",
-        name="trend",
-        line_color="navy",
+    fig.add_trace(
+        Scatter(
+            x=trend.index.to_numpy(),
+            y=trend,
+            mode="lines",
+            name="trend",
+            line_color="navy",
+        ),
         row=1,
         col=1,
     )
-    fig.add_scatter(
-        x=seasonal.index,
-        y=seasonal,
-        mode="lines",
-        name="seasonal",
-        line_color="seagreen",
+    fig.add_trace(
+        Scatter(
+            x=seasonal.index.to_numpy(),
+            y=seasonal,
+            mode="lines",
+            name="seasonal",
+            line_color="seagreen",
+        ),
         row=2,
         col=1,
     )
-    fig.add_scatter(
-        x=residuals.index,
-        y=residuals,
-        mode="lines",
-        name="residuals",
-        line_color="#ff3322",
+    fig.add_trace(
+        Scatter(
+            x=residuals.index.to_numpy(),
+            y=residuals,
+            mode="lines",
+            name="residuals",
+            line_color="#ff3322",
+        ),
         row=3,
         col=1,
     )
@@ -58,26 +118,60 @@ def plot_ts_components(
         paper_bgcolor="#eee",
         plot_bgcolor="#eee",
         showlegend=False,
-        title=f"Seasonal Decomposition for {file_name}",
+        title=f"Seasonal Decomposition for {file_name}"
+        + (f" ({method})" if method else ""),
         title_font_size=14,
+        uirevision=file_name,  # keep the zoom level when data is resampled
         xaxis1_showticklabels=True,
         xaxis2_showticklabels=True,
     )
     fig.update_traces(hovertemplate="%{x}: <b>%{y:,.4f}</b>", line_width=1)
-    fig.update_xaxes(rangeslider=dict(visible=True, thickness=0.035))
+    fig.update_xaxes(
+        rangeslider=dict(visible=True, thickness=0.035), type="date"
+    )
     fig.update_yaxes(fixedrange=True)
     return fig
 
 
+def interval_band(
+    intervals: pd.DataFrame, alpha: float
+) -> Tuple[np.ndarray, np.ndarray]:
+    """Get the outline of a prediction interval's band, to fill: along the
+    upper bounds, and back along the lower ones.
+
+    Args:
+        intervals (pandas.DataFrame): Lower and upper bounds by forecast
+            period, with columns by ("alpha", "bound").
+        alpha (float): The interval's significance level.
+
+    Returns:
+        Tuple[numpy.ndarray, numpy.ndarray]: The outline's x and y values.
+    """
+    dates = intervals.index.to_numpy()
+    return np.r_[dates, dates[::-1]], np.r_[
+        intervals[alpha, "upper"].to_numpy(),
+        intervals[alpha, "lower"].to_numpy()[::-1],
+    ]
+
+
 def plot_forecast(
     actual_data: Series,
     predictions: Series,
     forecast: Series,
     model_info: str,
     file_name: str,
+    max_points: Optional[int] = DEFAULT_MAX_POINTS,
+    webgl: Optional[bool] = None,
+    intervals: Optional[pd.DataFrame] = None,
 ) -> go.Figure:
     """Get a line-plot of the data, along with predicted values and a
-    14-period forecast.
+    forecast, and optionally its prediction intervals as filled bands,
+    shaded more deeply where they overlap (a fan chart, if there are
+    several).
+
+    The bands' traces come after the lines', so that the lines' positions
+    don't depend on the number of bands. Long forecasts are downsampled like
+    the data, and their bands at the same periods.
 
     Args:
         actual_data (pandas.Series): The original/input data.
@@ -85,33 +179,50 @@ def plot_forecast(
         forecast (pandas.Series): Out-of-sample forecast values.
         model_info (str): A description of the model's type and order.
         file_name (str): Input data source information.
+        max_points (Optional[int], optional): Maximum number of points per
+            trace; longer series are downsampled. Defaults to
+            DEFAULT_MAX_POINTS. None disables downsampling.
+        webgl (Optional[bool], optional): Whether to use WebGL traces.
+            Defaults to None (only above WEBGL_THRESHOLD points).
+        intervals (Optional[pandas.DataFrame], optional): Lower and upper
+            bounds by forecast period, with columns by ("alpha", "bound"),
+            as in `ArimaFit.intervals`. Defaults to None (no bands).
 
     Returns:
         plotly.graph_objs._figure.Figure: A line-plot of time series
         forecasting results.
     """
+    actual_data, predictions, forecast = (
+        downsample(series, max_points)
+        for series in (actual_data, predictions, forecast)
+    )
+    Scatter = _scatter_type(actual_data, predictions, forecast, webgl=webgl)
     fig = go.Figure(
-        go.Scatter(
+        Scatter(
             y=actual_data,
-            x=actual_data.index,
+            x=actual_data.index.to_numpy(),
             mode="lines",
             name="actual data",
             line_color="#8888ff",
         ),
     )
-    fig.add_scatter(
-        x=predictions.index,
-        y=predictions,
-        mode="lines",
-        name="predictions",
-        line_color="navy",
+    fig.add_trace(
+        Scatter(
+            x=predictions.index.to_numpy(),
+            y=predictions,
+            mode="lines",
+            name="predictions",
+            line_color="navy",
+        )
     )
-    fig.add_scatter(
-        x=forecast.index,
-        y=forecast,
-        mode="lines",
-        name="forecast",
-        line_color="lime",
+    fig.add_trace(
+        Scatter(
+            x=forecast.index.to_numpy(),
+            y=forecast,
+            mode="lines",
+            name="forecast",
+            line_color="lime",
+        )
     )
 
     fig.update_layout(
@@ -122,8 +233,212 @@ def plot_forecast(
         plot_bgcolor="#eee",
         title=f"An {model_info} model fitted on {file_name}",
         title_font_size=13,
+        uirevision=file_name,  # keep the zoom level when data is resampled
     )
     fig.update_traces(hovertemplate="<b>%{y:,.4f}</b>", line_width=1)
-    fig.update_xaxes(rangeslider=dict(visible=True, thickness=0.15))
+
+    if intervals is not None:
+        intervals = intervals.reindex(forecast.index)
+        for alpha in sorted(intervals.columns.unique("alpha")):  # widest first
+            x, y = interval_band(intervals, alpha)
+            fig.add_trace(
+                go.Scatter(
+                    x=x,
+                    y=y,
+                    fill="toself",
+                    fillcolor="rgba(50, 205, 50, 0.2)",
+                    line_width=0,
+                    hoverinfo="skip",
+                    name=f"{100 * (1 - alpha):g}% interval",
+                )
+            )
+    fig.update_xaxes(
+        rangeslider=dict(visible=True, thickness=0.15), type="date"
+    )
     fig.update_yaxes(fixedrange=True)
     return fig
+
+
+def plot_correlograms(
+    acf: pd.Series, pacf: pd.Series, bound: float, diff: int, file_name: str
+) -> go.Figure:
+    """Get bar charts of the autocorrelation and partial autocorrelation
+    functions, with the bounds within which they aren't significantly
+    different from 0.
+
+    Args:
+        acf (pandas.Series): Autocorrelations, by lag (from 0).
+        pacf (pandas.Series): Partial autocorrelations, by lag (from 0).
+        bound (float): The significance bound.
+        diff (int): The number of times the data was differenced.
+        file_name (str): Input data source information.
+
+    Returns:
+        plotly.graph_objs._figure.Figure: Side-by-side correlograms.
+    """
+    fig = make_subplots(
+        rows=1,
+        cols=2,
+        shared_yaxes=True,
+        subplot_titles=("Autocorrelation", "Partial autocorrelation"),
+        horizontal_spacing=0.05,
+    )
+    for col, (correlations, color) in enumerate(
+        [(acf, "navy"), (pacf, "seagreen")], start=1
+    ):
+        lags = correlations.index.to_numpy()[1:]  # lag 0 is always 1
+        fig.add_trace(
+            go.Bar(x=lags, y=correlations.iloc[1:], marker_color=color),
+            row=1,
+            col=col,
+        )
+        for level in (bound, -bound):
+            fig.add_hline(
+                y=level,
+                line_color="#ff3322",
+                line_dash="dot",
+                line_width=1,
+                row=1,
+                col=col,
+            )
+
+    times = "once" if diff == 1 else f"{diff} times"
+    fig.update_annotations(font_size=12)  # subplot titles are annotations
+    fig.update_layout(
+        bargap=0.6,
+        font_family="serif",
+        margin={"l": 10, "t": 80, "r": 10, "b": 10},
+        paper_bgcolor="#eee",
+        plot_bgcolor="#eee",
+        showlegend=False,
+        title=(
+            f"Correlograms of {file_name}"
+            + (f", differenced {times}" if diff else "")
+        ),
+        title_font_size=13,
+    )
+    fig.update_traces(hovertemplate="Lag %{x}: <b>%{y:,.3f}</b>")
+    fig.update_xaxes(title_text="Lag")
+    fig.update_yaxes(fixedrange=True)
+    return fig
+
+
+def plot_backtest(
+    horizons: pd.DataFrame, model_info: str, file_name: str
+) -> go.Figure:
+    """Get a line-plot of backtesting errors against the number of periods
+    ahead forecast.
+
+    Args:
+        horizons (pandas.DataFrame): "mae", "rmse" and "mape" by steps
+            ahead, as in `BacktestResult.horizons`.
+        model_info (str): A description of the model's type and order.
+        file_name (str): Input data source information.
+
+    Returns:
+        plotly.graph_objs._figure.Figure: A line-plot of forecast errors.
+    """
+    steps = horizons.index.to_numpy()
+    fig = make_subplots(specs=[[{"secondary_y": True}]])
+    fig.add_trace(
+        go.Scatter(
+            x=steps, y=horizons["mae"], name="MAE", line_color="navy"
+        ),
+    )
+    fig.add_trace(
+        go.Scatter(
+            x=steps, y=horizons["rmse"], name="RMSE", line_color="seagreen"
+        ),
+    )
+    fig.add_trace(
+        go.Scatter(
+            x=steps,
+            y=horizons["mape"],
+            name="MAPE (%)",
+            line_color="#ff3322",
+            line_dash="dot",
+        ),
+        secondary_y=True,
+    )
+
+    fig.update_layout(
+        font_family="serif",
+        hovermode="x unified",
+        margin={"l": 10, "t": 80, "r": 10, "b": 10},
+        paper_bgcolor="#eee",
+        plot_bgcolor="#eee",
+        title=(
+            f"Backtesting errors of an {model_info} model fitted on"
+            f" {file_name}"
+        ),
+        title_font_size=13,
+    )
+    fig.update_traces(
+        hovertemplate="<b>%{y:,.4f}</b>", line_width=1, mode="lines+markers"
+    )
+    fig.update_xaxes(title_text="Periods ahead")
+    fig.update_yaxes(title_text="Error", fixedrange=True)
+    fig.update_yaxes(
+        title_text="MAPE (%)", secondary_y=True, showgrid=False
+    )
+    return fig
+
+
+def encode_array(values: np.ndarray) -> dict:
+    """Get a plotly.js typed-array specification of numeric values, which is
+    far more compact than a JSON list.
+
+    Args:
+        values (numpy.ndarray): Numeric values. Dates are converted to
+            milliseconds since the epoch, which date axes understand.
+
+    Returns:
+        dict: The values' dtype and base64-encoded bytes.
+    """
+    values = np.asarray(values)
+    if np.issubdtype(values.dtype, np.datetime64):
+        values = values.astype("datetime64[ns]").astype("int64") / 1e6
+    values = np.ascontiguousarray(values, dtype="<f8")
+    return {"dtype": "f8", "bdata": b64encode(values.tobytes()).decode()}
+
+
+def _encode_dates(dates: np.ndarray) -> dict:
+    """Describe evenly spaced dates by their start and step (in
+    milliseconds), or else encode them as a typed array.
+    """
+    dates = np.asarray(dates, dtype="datetime64[ns]")
+    steps = np.diff(dates.astype("int64"))
+    if len(dates) > 1 and np.all(steps == steps[0]):
+        start = pd.Timestamp(dates[0]).isoformat()
+        return {"x0": start, "dx": float(steps[0]) / 1e6}
+    return {"x": encode_array(dates)}
+
+
+def serialise_figure(fig: go.Figure, binary: Optional[bool] = None) -> dict:
+    """Get a figure as a dict ready to send to the browser, optionally with
+    numeric data as base64-encoded typed arrays, and evenly spaced dates
+    described by their start date and step.
+
+    Args:
+        fig (plotly.graph_objs._figure.Figure): The figure.
+        binary (Optional[bool], optional): Whether to use binary encoding.
+            Defaults to None (only above BINARY_THRESHOLD points).
+
+    Returns:
+        dict: The figure's data and layout.
+    """
+    figure = fig.to_plotly_json()
+    if binary is None:
+        binary = (
+            sum(len(trace.get("y", ())) for trace in figure["data"])
+            > BINARY_THRESHOLD
+        )
+    if not binary:
+        return figure
+
+    for trace in figure["data"]:
+        if trace.get("x") is not None and len(trace["x"]) > 0:
+            trace.update(_encode_dates(trace.pop("x")))
+        if trace.get("y") is not None and len(trace["y"]) > 0:
+            trace["y"] = encode_array(trace["y"])
+    return figure
@@ -0,0 +1,171 @@
+import logging
+import os
+import signal
+import socket
+import time
+from typing import Callable, Dict
+
+import waitress
+
+logger = logging.getLogger(__name__)
+
+# Seconds to wait for workers to finish in-flight requests when stopping
+SHUTDOWN_TIMEOUT = 30
+
+
+def bind_socket(host: str, port: int, backlog: int = 1024) -> socket.socket:
+    """Create a listening TCP socket, to be shared by worker processes.
+
+    Args:
+        host (str): A host-name or IP address.
+        port (int): TCP port to listen at (0 for any free port).
+        backlog (int, optional): Maximum number of queued connections.
+            Defaults to 1024.
+
+    Returns:
+        socket.socket: The listening socket.
+    """
+    family, kind, proto, _, address = socket.getaddrinfo(
+        host, port, type=socket.SOCK_STREAM
+    )[0]
+    sock = socket.socket(family, kind, proto)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    sock.bind(address)
+    sock.listen(backlog)
+    return sock
+
+
+def _raise_system_exit(signum: int, frame) -> None:
+    raise SystemExit(0)
+
+
+def _run_worker(
+    app: Callable,
+    sock: socket.socket,
+    threads: int,
+    on_start: Callable,
+    on_exit: Callable,
+) -> None:
+    """Serve requests from the shared socket until told to stop. On SIGTERM
+    or SIGINT, waitress stops accepting connections and lets in-flight
+    requests finish.
+    """
+    signal.signal(signal.SIGTERM, _raise_system_exit)
+    signal.signal(signal.SIGINT, _raise_system_exit)
+    try:
+        on_start()
+        server = waitress.create_server(app, sockets=[sock], threads=threads)
+        server.run()
+    finally:
+        on_exit()
+
+
+def serve_prefork(
+    app: Callable,
+    sock: socket.socket,
+    workers: int = 2,
+    threads: int = 4,
+    on_start: Callable = lambda: None,
+    on_exit: Callable = lambda: None,
+) -> None:
+    """Serve a WSGI app from several forked worker processes sharing one
+    listening socket, restarting any worker that exits unexpectedly.
+
+    On SIGTERM or SIGINT, workers are asked to stop, and are given
+    SHUTDOWN_TIMEOUT seconds to finish in-flight requests before being
+    killed. The app shouldn't start threads or processes before forking.
+
+    Args:
+        app (Callable): The WSGI app.
+        sock (socket.socket): A listening socket, e.g. from `bind_socket`.
+        workers (int, optional): Number of worker processes. Defaults to 2.
+        threads (int, optional): Request threads per worker. Defaults to 4.
+        on_start (Callable, optional): Called in each worker before it
+            starts serving, e.g. to warm up. Defaults to doing nothing.
+        on_exit (Callable, optional): Called in each worker after it stops,
+            e.g. to release resources. Defaults to doing nothing.
+    """
+    children: Dict[int, int] = {}  # pid -> worker number
+    stopping = False
+
+    def spawn(number: int) -> None:
+        pid = os.fork()
+        if pid == 0:
+            code = 0
+            try:
+                _run_worker(app, sock, threads, on_start, on_exit)
+            except SystemExit:
+                pass
+            except BaseException:
+                logger.exception("Worker %d failed", number)
+                code = 1
+            finally:
+                os._exit(code)
+        children[pid] = number
+
+    def stop(signum: int, frame) -> None:
+        nonlocal stopping
+        stopping = True
+
+    previous_handlers = {
+        signum: signal.signal(signum, stop)
+        for signum in (signal.SIGTERM, signal.SIGINT)
+    }
+    try:
+        for number in range(workers):
+            spawn(number)
+        logger.info(
+            "Serving on %s with %d workers x %d threads",
+            sock.getsockname(),
+            workers,
+            threads,
+        )
+
+        while not stopping:
+            try:
+                pid, status = os.waitpid(-1, os.WNOHANG)
+            except ChildProcessError:
+                break
+            if pid == 0:
+                time.sleep(0.2)
+            elif (number := children.pop(pid, None)) is not None and (
+                not stopping
+            ):
+                logger.warning(
+                    "Worker %d exited with status %s; restarting it",
+                    number,
+                    os.waitstatus_to_exitcode(status),
+                )
+                spawn(number)
+    finally:
+        for signum, handler in previous_handlers.items():
+            signal.signal(signum, handler)
+        _stop_children(children)
+        sock.close()
+
+
+def _stop_children(children: Dict[int, int]) -> None:
+    """Ask worker processes to stop, killing those that take too long."""
+    for pid in children:
+        try:
+            os.kill(pid, signal.SIGTERM)
+        except ProcessLookupError:
+            pass
+
+    deadline = time.monotonic() + SHUTDOWN_TIMEOUT
+    while children and time.monotonic() < deadline:
+        for pid in list(children):
+            try:
+                if os.waitpid(pid, os.WNOHANG)[0] != 0:
+                    del children[pid]
+            except ChildProcessError:
+                del children[pid]
+        time.sleep(0.1)
+
+    for pid in children:
+        logger.warning("Worker %d didn't stop in time; killing it", pid)
+        try:
+            os.kill(pid, signal.SIGKILL)
+            os.waitpid(pid, 0)
+        except (ProcessLookupError, ChildProcessError):
+            pass
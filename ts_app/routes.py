@@ -0,0 +1,330 @@
+import cProfile
+import io
+import logging
+import os
+import pstats
+import tempfile
+import time
+from functools import partial
+from pathlib import Path
+from uuid import uuid4
+
+from flask import (
+    Blueprint,
+    Response,
+    current_app,
+    g,
+    jsonify,
+    request,
+    stream_with_context,
+)
+from ts_app.api import (
+    RequestError,
+    encode_forecast,
+    parse_decomposition,
+    parse_export_format,
+    parse_horizon,
+    parse_order,
+    parse_seasonal_order,
+    parse_series,
+)
+from ts_app.cache import (
+    FIT_CACHE,
+    cached_arima_fits,
+    cached_decomposition,
+    cached_forecast,
+    fit_key,
+)
+from ts_app.datasets import DATASETS
+from ts_app.export import (
+    EXPORT_FORMATS,
+    export_chunks,
+    export_filename,
+    export_frames,
+    model_description,
+    model_label,
+)
+from ts_app.file_upload import read_upload_file, upload_info
+from ts_app.jobs import JOB_MANAGER
+from ts_app.metrics import (
+    REQUEST_SECONDS,
+    render_metrics,
+    size_label,
+    span,
+)
+
+logger = logging.getLogger(__name__)
+
+routes = Blueprint("ts_app_routes", __name__)
+
+LARGE_UPLOAD_MAX_SIZE = 1024**3  # 1GiB
+# Requests with this header are profiled if the "TS_APP_PROFILE" setting is
+# "header"; every request is profiled if it's "all"
+PROFILE_HEADER = "X-Profile"
+PROFILE_LINES = 25
+
+
+def _should_profile() -> bool:
+    mode = current_app.config.get("TS_APP_PROFILE", "off")
+    return mode == "all" or (
+        mode == "header" and request.headers.get(PROFILE_HEADER)
+    )
+
+
+@routes.before_app_request
+def start_request_timer() -> None:
+    """Note when a request started, and start profiling it if required."""
+    g.request_start = time.perf_counter()
+    if _should_profile():
+        g.profiler = cProfile.Profile()
+        g.profiler.enable()
+
+
+@routes.after_app_request
+def record_request_time(response: Response) -> Response:
+    """Record the request's duration, labelled by route (and by output for
+    Dash callbacks), and log its profile if it was profiled.
+    """
+    if (start := g.pop("request_start", None)) is None:
+        return response
+    duration = time.perf_counter() - start
+    route = request.url_rule.rule if request.url_rule else "unmatched"
+    labels = {"route": route, "status": str(response.status_code)}
+    if route.endswith("_dash-update-component"):
+        # Dash has already parsed the body, and Flask caches the result
+        body = request.get_json(silent=True) or {}
+        labels["output"] = str(body.get("output", ""))
+    REQUEST_SECONDS.observe(duration, **labels)
+
+    if (profiler := g.pop("profiler", None)) is not None:
+        profiler.disable()
+        summary = io.StringIO()
+        stats = pstats.Stats(profiler, stream=summary)
+        stats.sort_stats("cumulative").print_stats(PROFILE_LINES)
+        logger.info(
+            "Profile of %s %s (%.3fs):\n%s",
+            request.method,
+            request.path,
+            duration,
+            summary.getvalue(),
+        )
+    return response
+
+
+@routes.get("/metrics")
+def metrics():
+    """Expose request and callback latency histograms, along with cache and
+    worker pool statistics, in the Prometheus text format.
+
+    Returns:
+        flask.Response: The metrics as plain text.
+    """
+    jobs = JOB_MANAGER.stats
+    cache = FIT_CACHE.stats
+    extra = {
+        "ts_app_fit_cache_hits_total": (
+            "counter",
+            "Fit cache hits.",
+            cache["hits"],
+        ),
+        "ts_app_fit_cache_misses_total": (
+            "counter",
+            "Fit cache misses.",
+            cache["misses"],
+        ),
+        "ts_app_fit_cache_bytes": (
+            "gauge",
+            "Memory held by the fit cache.",
+            cache["bytes"],
+        ),
+        "ts_app_jobs_queued": (
+            "gauge",
+            "Jobs waiting for a worker process.",
+            jobs["queue_depth"],
+        ),
+        "ts_app_jobs_running": ("gauge", "Jobs running.", jobs["running"]),
+        "ts_app_jobs_completed_total": (
+            "counter",
+            "Jobs completed.",
+            jobs["completed"],
+        ),
+        "ts_app_jobs_cancelled_total": (
+            "counter",
+            "Jobs superseded by newer ones.",
+            jobs["cancelled"],
+        ),
+        "ts_app_jobs_timed_out_total": (
+            "counter",
+            "Jobs that took too long.",
+            jobs["timed_out"],
+        ),
+        "ts_app_datasets": ("gauge", "Datasets in memory.", len(DATASETS)),
+    }
+    return Response(
+        render_metrics(extra),
+        content_type="text/plain; version=0.0.4; charset=utf-8",
+    )
+
+
+@routes.post("/upload-large")
+def upload_large_file():
+    """Stream a large file to disk, then read it into the dataset store.
+
+    The file is sent as the raw request body, with its name in the
+    `filename` query parameter. This avoids base64-encoding the file in the
+    browser, and holding it in memory, as `dcc.Upload` does.
+
+    Returns:
+        flask.Response: The file name and dataset IDs, or an error message.
+    """
+    filename = request.args.get("filename", "")
+    if not filename.endswith((".csv", ".xls", ".xlsx")):
+        return jsonify(error="Please upload a CSV or Excel file."), 400
+    if (request.content_length or 0) > LARGE_UPLOAD_MAX_SIZE:
+        return jsonify(error="The file is larger than 1GiB."), 413
+
+    with tempfile.NamedTemporaryFile(
+        suffix=Path(filename).suffix, delete=False
+    ) as file:
+        size = 0
+        while chunk := request.stream.read(1024**2):
+            if (size := size + len(chunk)) > LARGE_UPLOAD_MAX_SIZE:
+                break
+            file.write(chunk)
+    try:
+        if size > LARGE_UPLOAD_MAX_SIZE:
+            return jsonify(error="The file is larger than 1GiB."), 413
+        data, error = read_upload_file(file.name, filename)
+        if error is None:
+            columns = DATASETS.put_columns(data)
+    except Exception:
+        logger.exception("Large upload failed")
+        return jsonify(error="There was an error processing the file."), 400
+    finally:
+        os.unlink(file.name)
+
+    if error is not None:
+        return jsonify(error=error), 400
+    return jsonify(upload_info(filename, columns))
+
+
+@routes.post("/api/forecast")
+def forecast_api():
+    """Fit an ARIMA model on each series in the request body, and return
+    the predictions, forecasts and seasonal decompositions as JSON.
+
+    The series are sent as CSV (dates in the first column, and a series in
+    each numeric column), columnar JSON or an Arrow IPC stream, with the
+    order in the `ar`, `diff` and `ma` query parameters, an optional
+    seasonal order in `sar`, `sdiff`, `sma` and `period`, and the number of
+    periods to forecast in `horizon`. The decompositions are classical,
+    unless `decompose` is "stl" or "mstl", and skipped with `decompose=0`.
+    Models are fitted in parallel, in the same worker pool and fit cache as
+    the dashboard.
+
+    Returns:
+        flask.Response: The order and seasonal order, and a list of results
+        (or an error) per series, in the request's order. Or an error
+        message.
+    """
+    if (request.content_length or 0) > LARGE_UPLOAD_MAX_SIZE:
+        return jsonify(error="The request is larger than 1GiB."), 413
+    try:
+        order = parse_order(request.args)
+        seasonal_order = parse_seasonal_order(request.args)
+        horizon = parse_horizon(request.args)
+        decomposition = parse_decomposition(request.args)
+        series = parse_series(request.get_data(), request.content_type or "")
+    except RequestError as error:
+        return jsonify(error=str(error)), error.status
+
+    # Each request is a session of its own, tracked by the job manager
+    job_session = f"api:{uuid4().hex}"
+    size = size_label(max(map(len, series.values())))
+    with span("forecast_api.fit", size=size, order="-".join(map(str, order))):
+        fits = cached_arima_fits(
+            series,
+            *order,
+            JOB_MANAGER.session_executor(job_session),
+            JOB_MANAGER.timeout,
+            horizon,
+            seasonal_order,
+            on_timeout=partial(JOB_MANAGER.expire, job_session),
+        )
+
+    results = []
+    for name, fit in fits.items():
+        if fit is None:
+            results.append({"name": name, "error": "The model fit failed."})
+            continue
+        components = None
+        if decomposition is not None:
+            try:
+                with span("forecast_api.decompose", size=size):
+                    components = cached_decomposition(
+                        series[name], decomposition
+                    )
+            except ValueError as error:
+                results.append({"name": name, "error": str(error)})
+                continue
+        with span("forecast_api.encode", size=size):
+            results.append({"name": name, **encode_forecast(fit, components)})
+    return jsonify(
+        order=order,
+        seasonal_order=seasonal_order,
+        model=model_description(order, seasonal_order),
+        series=results,
+    )
+
+
+@routes.get("/api/export")
+def export_api():
+    """Stream a fitted model's predictions, forecast and prediction
+    intervals, with the data and its seasonal decomposition, as a CSV,
+    Parquet or Arrow file (see `export.export_frames`).
+
+    The data is identified by its dataset ID in `dataset`, and the model by
+    the forecast API's query parameters. The file's format is set with
+    `format` ("csv", "parquet" or "arrow"), and its name with `name`. The
+    export is built from the fit cache, so the model must have been fitted
+    already (e.g. in the dashboard). It's encoded and sent in chunks, which
+    avoids holding the whole file in memory, and base64-encoding it, as
+    `dcc.Download` does.
+
+    Returns:
+        flask.Response: The file, or an error message.
+    """
+    try:
+        order = parse_order(request.args)
+        seasonal_order = parse_seasonal_order(request.args)
+        horizon = parse_horizon(request.args)
+        decomposition = parse_decomposition(request.args)
+        export_format = parse_export_format(request.args)
+    except RequestError as error:
+        return jsonify(error=str(error)), error.status
+    if (data := DATASETS.get(request.args.get("dataset"))) is None:
+        return jsonify(error="The data is no longer available."), 404
+    key = fit_key(data, *order, seasonal_order)
+    if (fit := cached_forecast(key, horizon)) is None:
+        return jsonify(error="The model hasn't been fitted yet."), 404
+
+    components = None
+    if decomposition is not None:
+        try:
+            components = cached_decomposition(data, decomposition)
+        except ValueError as error:
+            return jsonify(error=str(error)), 400
+    media_type, extension = EXPORT_FORMATS[export_format]
+    filename = export_filename(
+        request.args.get("name", "data"),
+        model_label(order, seasonal_order),
+        extension,
+    )
+    chunks = export_chunks(
+        export_frames(fit, data, components), export_format
+    )
+    return Response(
+        stream_with_context(chunks),
+        mimetype=media_type,
+        headers={"Content-Disposition": f'attachment; filename="{filename}"'},
+    )
@@ -0,0 +1,94 @@
+import threading
+from collections import OrderedDict
+from datetime import date
+from typing import Iterable
+
+import numpy as np
+import pandas as pd
+from ts_app.ts_functions import create_arma_samples
+
+# Size of the samples on the sample page
+SAMPLE_SIZE = 365
+
+
+class SampleBank:
+    """A store of seeded ARMA samples, generated in batches, so that the
+    same orders, size and seed always give the same sample, and fetching a
+    sample is usually a look-up.
+
+    Samples are generated `batch_size` seeds at a time: asking for seed 3
+    also generates seeds 0 to `batch_size - 1`.
+
+    Args:
+        batch_size (int, optional): Number of seeds generated together.
+            Defaults to 16.
+        max_batches (int, optional): Number of batches to keep, evicting the
+            least recently used. Defaults to 256.
+    """
+
+    def __init__(self, batch_size: int = 16, max_batches: int = 256) -> None:
+        self.batch_size = batch_size
+        self.max_batches = max_batches
+        self._batches = OrderedDict()  # (ar, ma, size, first seed) -> array
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._batches) * self.batch_size
+
+    def _batch(
+        self, ar_order: int, ma_order: int, size: int, first_seed: int
+    ) -> np.ndarray:
+        key = (ar_order, ma_order, size, first_seed)
+        with self._lock:
+            if (batch := self._batches.get(key)) is None:
+                seeds = range(first_seed, first_seed + self.batch_size)
+                batch = create_arma_samples(ar_order, ma_order, size, seeds)
+                batch.flags.writeable = False  # shared by every caller
+                self._batches[key] = batch
+                if len(self._batches) > self.max_batches:
+                    self._batches.popitem(last=False)
+            self._batches.move_to_end(key)
+        return batch
+
+    def get(
+        self,
+        ar_order: int = 1,
+        ma_order: int = 1,
+        size: int = 100,
+        seed: int = 0,
+    ) -> pd.Series:
+        """Get a seeded ARMA sample, with daily dates starting today.
+
+        Args:
+            ar_order (int, optional): AR order. Defaults to 1.
+            ma_order (int, optional): MA order. Defaults to 1.
+            size (int, optional): Sample size. Defaults to 100.
+            seed (int, optional): The sample's seed. Defaults to 0.
+
+        Returns:
+            pandas.Series: The sample.
+        """
+        first_seed = seed - seed % self.batch_size
+        batch = self._batch(ar_order, ma_order, size, first_seed)
+        index = pd.date_range(start=date.today(), periods=size, freq="D")
+        sample = batch[seed - first_seed].copy()
+        return pd.Series(sample, index=index, name="sample")
+
+    def precompute(
+        self, ar_orders: Iterable[int], ma_orders: Iterable[int], size: int
+    ) -> None:
+        """Generate the first batch of samples for each combination of
+        orders.
+
+        Args:
+            ar_orders (Iterable[int]): AR orders.
+            ma_orders (Iterable[int]): MA orders.
+            size (int): Sample size.
+        """
+        ma_orders = list(ma_orders)
+        for ar_order in ar_orders:
+            for ma_order in ma_orders:
+                self._batch(ar_order, ma_order, size, 0)
+
+
+SAMPLE_BANK = SampleBank()
@@ -1,18 +1,158 @@
+import os
+import threading
 import warnings
+from concurrent.futures import (
+    FIRST_COMPLETED,
+    CancelledError,
+    Executor,
+    Future,
+    ProcessPoolExecutor,
+    wait,
+)
 from datetime import date
-from typing import Tuple
+from itertools import product, repeat
+from multiprocessing import get_context
+from multiprocessing.shared_memory import SharedMemory
+from statistics import NormalDist
+from typing import (
+    TYPE_CHECKING,
+    Iterator,
+    List,
+    NamedTuple,
+    Optional,
+    Sequence,
+    Tuple,
+    Union,
+)
 
 import numpy as np
 import pandas as pd
-from statsmodels.api import tsa
+
+# statsmodels takes most of a second to import, so its modules are imported
+# when first needed, to keep the app and CLI quick to start.
+if TYPE_CHECKING:
+    from statsmodels.tsa.arima.model import ARIMA
 
 # Ignore warnings from statsmodels. `ConvergenceWarning`s and `ValueWarning`s
 # are all too frequent when fitting models on arbitrary data.
 warnings.filterwarnings("ignore", module="statsmodels")
 
+# Periods forecast by default, and at most
+FORECAST_HORIZON = 15
+MAX_HORIZON = 5000
+# Significance levels of the forecast's prediction intervals: 95% and 80%
+INTERVAL_ALPHAS = (0.05, 0.2)
+# Levels of a fan chart's bands, from 95% to 10% coverage
+FAN_ALPHAS = (0.05, 0.2, 0.4, 0.6, 0.8, 0.9)
+# Seasonal order (P, D, Q, s) of a model without seasonal terms
+NO_SEASON = (0, 0, 0, 0)
+# Seasonal periods up to this are modelled with seasonal ARIMA terms, and
+# longer ones with this many pairs of Fourier terms
+SEASONAL_LAG_LIMIT = 12
+FOURIER_HARMONICS = 4
+# Seasonal orders standing for Fourier terms, whose own orders don't matter
+FOURIER_ORDERS = (1, 0, 0)
+# Periods are detected from at most this many of the latest observations
+PERIOD_SAMPLE = 2**16
+# Seasonal decompositions: by moving averages, or by STL (or MSTL, for the
+# calendar's seasons too)
+DECOMPOSITION_METHODS = ("classical", "stl", "mstl")
+# Longer series are decomposed by STL at a coarser resolution, averaged over
+# blocks of values, and periods spanning fewer blocks than this are
+# estimated as fixed profiles instead
+DECOMPOSITION_POINTS = 4096
+MIN_CYCLE_BLOCKS = 4
+# Seasonal periods of the calendar, by the data's frequency
+CALENDAR_PERIODS = {
+    "s": (60, 3600),
+    "min": (60, 1440),
+    "h": (24, 168),
+    "D": (7, 365),
+    "B": (5, 260),
+    "W": (52,),
+    "M": (12,),
+    "Q": (4,),
+}
+
+
+class ForecastState(NamedTuple):
+    """The predicted state of a fitted state-space model for the period
+    after its forecast, and the (time-invariant) system matrices, from
+    which the forecast can be extended without refitting or refiltering.
+    """
+
+    mean: np.ndarray
+    cov: np.ndarray
+    design: np.ndarray
+    transition: np.ndarray
+    state_noise_cov: np.ndarray  # selection @ state_cov @ selection.T
+    obs_var: float
+    obs_intercept: float  # e.g. the constant of an ARIMA model
+    state_intercept: np.ndarray
+    # Coefficients of Fourier terms of the given period, if any, added to
+    # the forecast, and the position of the next period in the data
+    harmonics: Optional[np.ndarray] = None
+    period: int = 0
+    position: int = 0
+
+
+class ArimaFit(NamedTuple):
+    """The outputs of a fitted ARIMA model."""
+
+    predictions: pd.Series
+    forecast: pd.Series
+    params: pd.Series
+    aic: float
+    bic: float
+    # Lower and upper bounds by forecast period, with columns by
+    # ("alpha", "bound"). None for fits cached before intervals were added.
+    intervals: Optional[pd.DataFrame] = None
+    # None for approximate fits, and fits cached before horizons could be
+    # extended
+    state: Optional[ForecastState] = None
+
+
+def create_arma_samples(
+    ar_order: int = 1,
+    ma_order: int = 1,
+    size: int = 100,
+    seeds: Union[int, Sequence[Optional[int]]] = 1,
+) -> np.ndarray:
+    """Generate several ARMA samples at once, by filtering a 2-D array of
+    white noise.
+
+    Each sample's noise is drawn from its own seeded generator, so a sample
+    is the same whether it's generated alone or in a batch.
+
+    Args:
+        ar_order (int, optional): Desired AR order. Defaults to 1.
+        ma_order (int, optional): Desired MA order. Defaults to 1.
+        size (int, optional): Desired sample size. Defaults to 100.
+        seeds (Union[int, Sequence[Optional[int]]], optional): A seed for
+            each sample (None for an unseeded sample), or the number of
+            unseeded samples. Defaults to 1.
+
+    Returns:
+        numpy.ndarray: The samples, with shape (number of samples, size).
+    """
+    from scipy.signal import lfilter
+
+    if isinstance(seeds, int):
+        seeds = [None] * seeds
+    noise = np.empty((len(seeds), size))
+    for row, seed in zip(noise, seeds):
+        np.random.default_rng(seed).standard_normal(out=row)
+
+    ar_coeff = np.linspace(1, -0.9, ar_order + 1)  # arbitrary ar coefficients
+    ma_coeff = np.linspace(1, 0.9, ma_order + 1)  # arbitrary ma coefficients
+    return lfilter(ma_coeff, ar_coeff, noise, axis=1)
+
 
 def create_arma_sample(
-    ar_order: int = 1, ma_order: int = 1, size: int = 100
+    ar_order: int = 1,
+    ma_order: int = 1,
+    size: int = 100,
+    seed: Optional[int] = None,
 ) -> pd.Series:
     """Get a random ARMA sample.
 
@@ -20,36 +160,1597 @@ def create_arma_sample(
         ar_order (int, optional): Desired AR order. Defaults to 1.
         ma_order (int, optional): Desired MA order. Defaults to 1.
         size (int, optional): Desired sample size. Defaults to 100.
+        seed (Optional[int], optional): A seed, for a reproducible sample.
+            Defaults to None.
 
     Returns:
         pandas.Series: An ARMA sample.
     """
-    ar_coeff = np.linspace(1, -0.9, ar_order + 1)  # arbitrary ar coefficients
-    ma_coeff = np.linspace(1, 0.9, ma_order + 1)  # arbitrary ma coefficients
-    sample = tsa.ArmaProcess(ar_coeff, ma_coeff).generate_sample(size)
+    sample = create_arma_samples(ar_order, ma_order, size, [seed])[0]
     index = pd.date_range(start=date.today(), periods=size, freq="D")
 
     return pd.Series(sample, index=index, name="sample")
 
 
-def fit_arima_model(
-    data: pd.Series, ar_order: int = 1, diff: int = 0, ma_order: int = 1
-) -> Tuple[pd.Series, pd.Series]:
-    """Fit an ARIMA model on the data and get predictions.
+def _start_params(model: "ARIMA", params: pd.Series) -> Optional[np.ndarray]:
+    """Map the parameters of another fitted model onto a model's parameter
+    names, padding new lag coefficients with zeros.
+
+    Args:
+        model (statsmodels.tsa.arima.model.ARIMA): The model to fit.
+        params (pandas.Series): Parameters of a fitted model, indexed by
+            name.
+
+    Returns:
+        Optional[numpy.ndarray]: Starting parameters, or None if they aren't
+        stationary and invertible (e.g. after dropping a lag), or don't
+        include a parameter other than a lag coefficient.
+    """
+    from statsmodels.tsa.statespace.tools import is_invertible
+
+    start = params.reindex(model.param_names)
+    lags = start.index.str.match(r"^(ar|ma)\.(S\.)?L\d+$")
+    if start[~lags].isna().any():
+        return None
+    start = start.fillna(0)
+
+    # The seasonal polynomials, in powers of the seasonal lag, are checked
+    # separately from the non-seasonal ones
+    for pattern, sign in (
+        (r"^ar\.L", -1),
+        (r"^ar\.S\.L", -1),
+        (r"^ma\.L", 1),
+        (r"^ma\.S\.L", 1),
+    ):
+        coefficients = start[start.index.str.match(pattern)].to_numpy()
+        polynomial = np.r_[1, sign * coefficients]
+        if len(polynomial) > 1 and not is_invertible(polynomial):
+            return None
+    return start.to_numpy()
+
+
+def normalise_seasonal_order(
+    seasonal_order: Sequence[int],
+) -> Tuple[int, int, int, int]:
+    """Get a seasonal order as a tuple of integers, so that equivalent
+    orders compare equal (e.g. as fit cache keys).
+
+    Periods longer than SEASONAL_LAG_LIMIT are modelled with the same
+    Fourier terms whatever the seasonal AR and MA orders (see
+    `get_arima_fit`), so all their orders become FOURIER_ORDERS and the
+    period.
+    Seasonal differencing isn't supported at those periods: it would remove
+    the seasonal pattern that the Fourier terms are meant to follow.
+
+    Args:
+        seasonal_order (Sequence[int]): Seasonal AR, differencing and MA
+            orders, and the seasonal period.
+
+    Raises:
+        ValueError: If there's seasonal differencing at a period longer than
+            SEASONAL_LAG_LIMIT.
+
+    Returns:
+        Tuple[int, int, int, int]: The order, or NO_SEASON if it has no
+        seasonal terms, or a period under 2.
+    """
+    seasonal_ar, seasonal_diff, seasonal_ma, period = map(int, seasonal_order)
+    if period < 2 or not (seasonal_ar or seasonal_diff or seasonal_ma):
+        return NO_SEASON
+    if period > SEASONAL_LAG_LIMIT:
+        if seasonal_diff:
+            raise ValueError(
+                f"Periods over {SEASONAL_LAG_LIMIT} are modelled with Fourier"
+                " terms, which can't be combined with seasonal differencing."
+            )
+        return (*FOURIER_ORDERS, period)
+    return seasonal_ar, seasonal_diff, seasonal_ma, period
+
+
+def fourier_period(seasonal_order: Sequence[int]) -> int:
+    """Get the period of the Fourier terms that model a normalised seasonal
+    order (see `normalise_seasonal_order`).
+
+    Args:
+        seasonal_order (Sequence[int]): Seasonal AR, differencing and MA
+            orders, and the seasonal period.
+
+    Returns:
+        int: The period, or 0 if the order is modelled without Fourier
+        terms.
+    """
+    period = seasonal_order[3]
+    return period if period > SEASONAL_LAG_LIMIT else 0
+
+
+def fourier_terms(
+    positions: np.ndarray,
+    period: int,
+    harmonics: int,
+    index: Optional[pd.Index] = None,
+) -> pd.DataFrame:
+    """Get Fourier terms of a seasonal period: a sine and cosine wave per
+    harmonic, whose weighted sum can follow any smooth seasonal pattern.
+
+    Args:
+        positions (numpy.ndarray): Positions of the periods in the data.
+        period (int): The seasonal period.
+        harmonics (int): Number of harmonics, at most (period - 1) // 2.
+        index (Optional[pandas.Index], optional): The terms' index. Defaults
+            to None (a RangeIndex).
+
+    Returns:
+        pandas.DataFrame: The terms, with columns "sin1", "cos1", "sin2"...
+    """
+    angles = np.outer(positions, np.arange(1, harmonics + 1))
+    angles = angles * (2 * np.pi / period)
+    terms = np.stack([np.sin(angles), np.cos(angles)], axis=2)
+    columns = [
+        f"{wave}{k}"
+        for k in range(1, harmonics + 1)
+        for wave in ("sin", "cos")
+    ]
+    return pd.DataFrame(
+        terms.reshape(len(angles), -1), index=index, columns=columns
+    )
+
+
+def _fourier_exog(
+    data: pd.Series,
+    seasonal_order: Tuple[int, int, int, int],
+    horizon: int = 0,
+) -> Optional[pd.DataFrame]:
+    """Get the Fourier terms replacing a seasonal order whose period is too
+    long for seasonal ARIMA terms, or None if the order has none or a short
+    period. With a horizon, the terms continue that many periods past the
+    data, on a RangeIndex.
+    """
+    if not (period := fourier_period(seasonal_order)):
+        return None
+    harmonics = min(FOURIER_HARMONICS, (period - 1) // 2)
+    positions = np.arange(len(data) + horizon)
+    index = None if horizon else data.index
+    return fourier_terms(positions, period, harmonics, index)
+
+
+def _arima_model(
+    data: pd.Series,
+    order: Tuple[int, int, int],
+    seasonal_order: Tuple[int, int, int, int] = NO_SEASON,
+) -> "ARIMA":
+    """Get a statsmodels ARIMA model of the given (normalised) orders, with
+    Fourier terms as exogenous variables in place of long seasonal periods'
+    seasonal terms.
+    """
+    from statsmodels.tsa.arima.model import ARIMA
+
+    if (exog := _fourier_exog(data, seasonal_order)) is not None:
+        return ARIMA(data, exog=exog, order=order)
+    return ARIMA(data, order=order, seasonal_order=seasonal_order)
+
+
+def _prediction_index(data: pd.Series, periods: int) -> pd.Index:
+    """Get the data's index extended by `periods` steps, as statsmodels
+    would: using its frequency if it has (or implies) one, or positions
+    otherwise.
+    """
+    index = data.index
+    freq = getattr(index, "freq", None)
+    if freq is None and isinstance(index, pd.DatetimeIndex) and len(index) > 2:
+        freq = pd.infer_freq(index)
+    if freq is None:
+        return pd.RangeIndex(len(index) + periods)
+    future = pd.date_range(index[-1], periods=periods + 1, freq=freq)[1:]
+    return index.append(future)
+
+
+def _extend_index(index: pd.Index, periods: int) -> pd.Index:
+    """Get the `periods` dates (or positions) following a forecast's index,
+    which has a frequency, or at least 3 evenly spaced dates.
+    """
+    if isinstance(index, pd.DatetimeIndex):
+        freq = index.freq or pd.infer_freq(index)
+        return pd.date_range(index[-1], periods=periods + 1, freq=freq)[1:]
+    return pd.RangeIndex(index[-1] + 1, index[-1] + 1 + periods)
+
+
+def forecast_state(results, origin: int = -1) -> ForecastState:
+    """Get the predicted state of filtered state-space results for the
+    first period after the data (or another period), from which to
+    forecast.
+
+    Args:
+        results: Filtered statsmodels state-space results, e.g. of an ARIMA
+            model. The system matrices and intercepts at the last period are
+            assumed to hold in the future, as for ARIMA models without
+            exogenous variables other than a constant.
+        origin (int, optional): Position of the period, e.g. a backtest's
+            forecast origin, whose state is predicted from the data before
+            it. Defaults to -1 (the period after the data).
+
+    Returns:
+        ForecastState: The state's mean and covariance, and the system
+        matrices.
+    """
+    ssm = results.filter_results
+    selection = ssm.selection[..., -1]
+    return ForecastState(
+        mean=ssm.predicted_state[:, origin],
+        cov=ssm.predicted_state_cov[..., origin],
+        design=ssm.design[0, :, -1],
+        transition=ssm.transition[..., -1],
+        state_noise_cov=selection @ ssm.state_cov[..., -1] @ selection.T,
+        obs_var=float(ssm.obs_cov[0, 0, -1]),
+        obs_intercept=float(ssm.obs_intercept[0, -1]),
+        state_intercept=ssm.state_intercept[:, -1],
+    )
+
+
+def propagate_forecast(
+    state: ForecastState, steps: int
+) -> Tuple[np.ndarray, np.ndarray, ForecastState]:
+    """Forecast `steps` periods from a state, by the Kalman filter's
+    prediction step: a few small matrix products per period.
+
+    Args:
+        state (ForecastState): The predicted state for the first period.
+        steps (int): Periods to forecast.
+
+    Returns:
+        Tuple[numpy.ndarray, numpy.ndarray, ForecastState]: The forecast's
+        means and variances, and the predicted state for the period after
+        it.
+    """
+    design, transition = state.design, state.transition
+    means, variances = np.empty(steps), np.empty(steps)
+    mean, cov = state.mean, state.cov
+    for step in range(steps):
+        means[step] = design @ mean + state.obs_intercept
+        variances[step] = design @ cov @ design + state.obs_var
+        mean = transition @ mean + state.state_intercept
+        cov = transition @ cov @ transition.T + state.state_noise_cov
+    if state.harmonics is not None:
+        positions = state.position + np.arange(steps)
+        means += fourier_terms(
+            positions, state.period, len(state.harmonics) // 2
+        ).to_numpy() @ state.harmonics
+    return means, variances, state._replace(
+        mean=mean, cov=cov, position=state.position + steps
+    )
+
+
+def _interval_frame(
+    bounds: np.ndarray, index: pd.Index, alphas: Sequence[float]
+) -> pd.DataFrame:
+    """Label bounds with shape (periods, 2 * len(alphas)), ordered lower,
+    upper for each alpha in turn.
+    """
+    columns = pd.MultiIndex.from_product(
+        [alphas, ["lower", "upper"]], names=["alpha", "bound"]
+    )
+    return pd.DataFrame(bounds, index=index, columns=columns)
+
+
+def normal_intervals(
+    forecast: pd.Series,
+    variance: Union[pd.Series, np.ndarray],
+    alphas: Sequence[float] = INTERVAL_ALPHAS,
+) -> pd.DataFrame:
+    """Get Gaussian prediction intervals around a forecast, at several
+    significance levels at once, as statsmodels' `conf_int` gets one.
+
+    Args:
+        forecast (pandas.Series): The forecast means.
+        variance (Union[pandas.Series, numpy.ndarray]): Their variances.
+        alphas (Sequence[float], optional): Significance levels, e.g. 0.05
+            for 95% intervals. Defaults to INTERVAL_ALPHAS.
+
+    Returns:
+        pandas.DataFrame: The lower and upper bounds, by forecast period,
+        with columns by ("alpha", "bound").
+    """
+    quantiles = np.array([NormalDist().inv_cdf(1 - a / 2) for a in alphas])
+    widths = np.sqrt(np.asarray(variance, dtype="float64"))[:, None]
+    mean = forecast.to_numpy(dtype="float64")[:, None]
+    bounds = np.stack(
+        [mean - quantiles * widths, mean + quantiles * widths], axis=2
+    )
+    return _interval_frame(
+        bounds.reshape(len(forecast), -1), forecast.index, alphas
+    )
+
+
+def simulate_forecast_errors(
+    state: ForecastState,
+    steps: int,
+    repetitions: int = 1000,
+    seed: Optional[int] = None,
+) -> np.ndarray:
+    """Simulate the errors of a state-space model's forecast, for every
+    repetition at once.
+
+    The state at the forecast origin is drawn from its predicted
+    distribution, then every path's state is propagated through the
+    model's transition with random shocks, one matrix product per step.
+    Unlike statsmodels' `simulate(..., repetitions=)`, which runs the
+    simulation smoother once per repetition, this takes a few milliseconds
+    for thousands of paths. The model is linear, so each simulated path is
+    the forecast plus these errors.
+
+    Args:
+        state (ForecastState): The predicted state for the first period,
+            from `forecast_state`.
+        steps (int): Periods to simulate.
+        repetitions (int, optional): Number of paths. Defaults to 1000.
+        seed (Optional[int], optional): A seed, for reproducible paths.
+            Defaults to None.
+
+    Returns:
+        numpy.ndarray: The errors, with shape (repetitions, steps).
+    """
+    def factor(cov: np.ndarray) -> np.ndarray:
+        # A square root of a (possibly singular) covariance matrix
+        values, vectors = np.linalg.eigh(cov)
+        return vectors * np.sqrt(np.clip(values, 0, None))
+
+    rng = np.random.default_rng(seed)
+    k_states = len(state.mean)
+    states = rng.standard_normal((repetitions, k_states)) @ factor(
+        state.cov
+    ).T
+    shock_loadings = factor(state.state_noise_cov).T
+    shocks = rng.standard_normal((steps, repetitions, k_states))
+    noise = rng.standard_normal((steps, repetitions)) * np.sqrt(state.obs_var)
+
+    errors = np.empty((repetitions, steps))
+    for step in range(steps):
+        errors[:, step] = states @ state.design + noise[step]
+        states = states @ state.transition.T + shocks[step] @ shock_loadings
+    return errors
+
+
+def simulated_intervals(
+    forecast: pd.Series,
+    errors: np.ndarray,
+    alphas: Sequence[float] = FAN_ALPHAS,
+) -> pd.DataFrame:
+    """Get prediction intervals (e.g. a fan chart's bands) around a forecast
+    from the quantiles of simulated forecast errors.
+
+    Args:
+        forecast (pandas.Series): The forecast.
+        errors (numpy.ndarray): Simulated errors, with shape (repetitions,
+            periods), from `simulate_forecast_errors`.
+        alphas (Sequence[float], optional): Significance levels. Defaults
+            to FAN_ALPHAS.
+
+    Returns:
+        pandas.DataFrame: The lower and upper bounds, by forecast period,
+        with columns by ("alpha", "bound").
+    """
+    probabilities = [p for a in alphas for p in (a / 2, 1 - a / 2)]
+    quantiles = np.quantile(errors, probabilities, axis=0).T
+    bounds = forecast.to_numpy(dtype="float64")[:, None] + quantiles
+    return _interval_frame(bounds, forecast.index, alphas)
+
+
+def _lag_polynomial(coefficients: np.ndarray, period: int = 1) -> np.ndarray:
+    """Get the coefficients of 1 + c1 L^period + c2 L^(2 period) + ..., by
+    power of the lag operator L.
+    """
+    if not len(coefficients):
+        return np.ones(1)
+    polynomial = np.zeros(len(coefficients) * period + 1)
+    polynomial[0] = 1
+    polynomial[period::period] = coefficients
+    return polynomial
+
+
+def css_fit(
+    data: pd.Series,
+    ar_order: int = 1,
+    diff: int = 0,
+    ma_order: int = 1,
+    alphas: Sequence[float] = INTERVAL_ALPHAS,
+    horizon: int = FORECAST_HORIZON,
+    seasonal_order: Sequence[int] = NO_SEASON,
+) -> ArimaFit:
+    """Fit an ARIMA model by conditional sum-of-squares: minimising the
+    squared one-step errors, computed by filtering the differenced data with
+    pre-sample values set to zero.
+
+    This takes a few vectorised passes over the data per optimizer step,
+    without a Kalman filter, so it's typically 50 to 100 times faster than
+    the exact fit. The estimates are close to the exact ones for long,
+    stationary series, but can differ for short or over-differenced series,
+    and stationarity and invertibility aren't enforced. It's meant for
+    previews. A constant is included when there's no differencing, as with
+    `get_arima_fit`. Prediction intervals ignore the uncertainty of the
+    pre-sample values, which only matters for the first few periods.
+
+    Seasonal terms multiply the non-seasonal polynomials, as in a SARIMA
+    model. Periods longer than SEASONAL_LAG_LIMIT are modelled with the same
+    Fourier terms as in `get_arima_fit`, by regression with ARIMA errors, so
+    that the preview fits the same model as the exact fit.
+
+    Args:
+        data (pandas.Series): The data to model, with a DatetimeIndex.
+        ar_order (int, optional): AR order. Defaults to 1.
+        diff (int, optional): Differencing order. Defaults to 0.
+        ma_order (int, optional): MA order. Defaults to 1.
+        alphas (Sequence[float], optional): Significance levels of the
+            prediction intervals. Defaults to INTERVAL_ALPHAS.
+        horizon (int, optional): Periods to forecast. Defaults to
+            FORECAST_HORIZON.
+        seasonal_order (Sequence[int], optional): Seasonal AR, differencing
+            and MA orders, and the seasonal period. Defaults to NO_SEASON.
+
+    Returns:
+        ArimaFit: The same outputs as `get_arima_fit`, with information
+        criteria from the conditional likelihood, and no forecast state.
+    """
+    from scipy.optimize import least_squares
+    from scipy.signal import lfilter
+
+    seasonal_ar, seasonal_diff, seasonal_ma, period = normalise_seasonal_order(
+        seasonal_order
+    )
+    # Differencing polynomial: (1 - L)^diff (1 - L^period)^seasonal_diff
+    integration = np.ones(1)
+    for _ in range(diff):
+        integration = np.convolve(integration, [1, -1])
+    for _ in range(seasonal_diff):
+        integration = np.convolve(integration, _lag_polynomial([-1], period))
+    lost = len(integration) - 1  # observations lost to differencing
+
+    values = data.to_numpy(dtype=float)
+    differenced = lfilter(integration, 1, values)[lost:]
+    m = len(differenced)
+    k_const = int(lost == 0)
+    # Fourier terms over the data and the forecast, differenced like the
+    # data, as the errors rather than the terms follow the ARIMA process
+    exog = _fourier_exog(data, (*FOURIER_ORDERS, period), horizon)
+    if exog is not None:
+        seasonal_ar = seasonal_ma = 0  # The terms replace them
+    if exog is None:
+        exog_names, exog = [], np.zeros((len(data) + horizon - lost, 0))
+    else:
+        exog_names = list(exog.columns)
+        exog = lfilter(integration, 1, exog.to_numpy(), axis=0)[lost:]
+    k_exog = exog.shape[1]
+    sizes = np.cumsum([k_const, k_exog, ar_order, ma_order, seasonal_ar])
+
+    def unpack(
+        params: np.ndarray,
+    ) -> Tuple[float, np.ndarray, np.ndarray, np.ndarray]:
+        const, beta, ar, ma, sar, sma = np.split(params, sizes)
+        # const is empty after differencing, and beta without Fourier terms
+        ar_polynomial = np.convolve(
+            _lag_polynomial(-ar), _lag_polynomial(-sar, period)
+        )
+        ma_polynomial = np.convolve(
+            _lag_polynomial(ma), _lag_polynomial(sma, period)
+        )
+        return const.sum(), beta, ar_polynomial, ma_polynomial
+
+    def errors(params: np.ndarray) -> np.ndarray:
+        const, beta, ar_polynomial, ma_polynomial = unpack(params)
+        centred = differenced - const - exog[:m] @ beta
+        errors = lfilter(ar_polynomial, ma_polynomial, centred)
+        # Non-invertible MA terms make the errors explode
+        return np.nan_to_num(errors, nan=1e10, posinf=1e10, neginf=-1e10)
+
+    params = np.zeros(sizes[-1] + seasonal_ma)
+    if k_const + k_exog:
+        # Start the regression terms from their least-squares estimates
+        regressors = np.c_[np.ones((m, k_const)), exog[:m]]
+        params[:k_const + k_exog] = np.linalg.lstsq(
+            regressors, differenced, rcond=None
+        )[0]
+    if len(params) > k_const + k_exog:
+        params = least_squares(errors, params, method="lm").x
+    resid = errors(params)
+
+    # Forecast the differenced series, with future errors set to zero, and
+    # pre-sample values and errors set to zero, as when filtering
+    const, beta, ar_polynomial, ma_polynomial = unpack(params)
+    steps = horizon
+    regression = const + exog @ beta
+    lags = max(len(ar_polynomial), len(ma_polynomial)) - 1
+    centred = np.r_[
+        np.zeros(lags), differenced - regression[:m], np.zeros(steps)
+    ]
+    shocks = np.r_[np.zeros(lags), resid, np.zeros(steps)]
+    ar_lags, ma_lags = ar_polynomial[:0:-1], ma_polynomial[:0:-1]
+    for t in range(lags + m, lags + m + steps):
+        centred[t] = shocks[t - len(ma_lags):t] @ ma_lags - (
+            centred[t - len(ar_lags):t] @ ar_lags
+        )
+    # Undo the differencing, one period at a time
+    n = len(data)
+    levels = np.r_[values, centred[-steps:] + regression[m:]]
+    undifferencing = integration[:0:-1]
+    for t in range(n, n + steps):
+        levels[t] -= levels[t - lost:t] @ undifferencing
+
+    # One-step predictions are the data less the one-step errors
+    fitted = np.r_[np.full(lost, np.nan), values[lost:] - resid, levels[n:]]
+    fitted = pd.Series(
+        fitted, index=_prediction_index(data, steps), name="predicted_mean"
+    )
+
+    sigma2 = resid @ resid / m
+    # The forecast errors' variances follow from the model's MA(infinity)
+    # weights, including the differencing in the AR polynomial
+    weights = lfilter(
+        ma_polynomial,
+        np.convolve(ar_polynomial, integration),
+        np.eye(1, steps)[0],
+    )
+    variance = sigma2 * np.cumsum(weights**2)
+
+    llf = -m / 2 * (np.log(2 * np.pi * sigma2) + 1)
+    k_params = len(params) + 1
+    names = (
+        ["const"] * k_const
+        + exog_names
+        + [f"ar.L{i}" for i in range(1, ar_order + 1)]
+        + [f"ma.L{i}" for i in range(1, ma_order + 1)]
+        + [f"ar.S.L{i * period}" for i in range(1, seasonal_ar + 1)]
+        + [f"ma.S.L{i * period}" for i in range(1, seasonal_ma + 1)]
+        + ["sigma2"]
+    )
+    forecast = fitted.iloc[n:]
+    return ArimaFit(
+        fitted.iloc[int(0.7 * n):n + 1],
+        forecast,
+        pd.Series(np.r_[params, sigma2], index=names),
+        -2 * llf + 2 * k_params,
+        -2 * llf + np.log(m) * k_params,
+        normal_intervals(forecast, variance, alphas),
+    )
+
+
+def get_arima_fit(
+    data: pd.Series,
+    ar_order: int = 1,
+    diff: int = 0,
+    ma_order: int = 1,
+    start_params: Optional[pd.Series] = None,
+    refit: bool = True,
+    method: str = "mle",
+    alphas: Sequence[float] = INTERVAL_ALPHAS,
+    simulations: int = 0,
+    seed: Optional[int] = None,
+    horizon: int = FORECAST_HORIZON,
+    seasonal_order: Sequence[int] = NO_SEASON,
+) -> ArimaFit:
+    """Fit an ARIMA model on the data, and get its predictions, forecast,
+    prediction intervals and estimated parameters.
+
+    The fit can be warm-started from the parameters of a similar model
+    (e.g. one lag fewer, or the same order on fewer observations), which
+    takes fewer optimizer iterations. Without refitting, the parameters are
+    reused as they are, and only the Kalman filter is run over the data, as
+    with statsmodels' `results.append(..., refit=False)`.
+
+    The in-sample predictions are read from the filter's output, and the
+    forecast and its variances are propagated from the filter's last
+    predicted state (see `propagate_forecast`), from which the intervals at
+    every level are computed, rather than running a pass for each of
+    `predict`, `get_forecast` and `conf_int`. With `simulations`, the
+    intervals are instead quantiles of simulated paths (see
+    `simulate_forecast_errors`), e.g. for a fan chart. The state after the
+    forecast is kept, so that `extend_forecast` can lengthen it later.
+
+    A seasonal order adds seasonal AR, differencing and MA terms of the
+    given period (a SARIMA model). Those multiply the size of the Kalman
+    filter's state by about the period, and the time per observation by its
+    square, so for periods longer than SEASONAL_LAG_LIMIT (e.g. 24 for
+    hourly or 52 for weekly data), the seasonal terms are replaced by
+    FOURIER_HARMONICS pairs of Fourier terms as exogenous variables: a
+    fixed seasonal pattern, fitted by regression with ARIMA errors, which
+    costs the same for any period.
+
+    The "css" method is a fast approximation, for previews: see `css_fit`.
 
     Args:
         data (pandas.Series): The data to model, with a DatetimeIndex.
         ar_order (int, optional): AR order. Defaults to 1.
         diff (int, optional): Differencing order. Defaults to 0.
         ma_order (int, optional): MA order. Defaults to 1.
+        start_params (Optional[pandas.Series], optional): Fitted parameters
+            of a similar model, indexed by name. Defaults to None (the
+            default starting values).
+        refit (bool, optional): Whether to estimate the parameters, rather
+            than reuse `start_params`. Ignored if `start_params` is missing
+            or doesn't match the model. Defaults to True.
+        method (str, optional): "mle" for the exact maximum likelihood fit,
+            or "css" for a conditional sum-of-squares fit, which ignores
+            `start_params`, `refit` and `simulations`. Defaults to "mle".
+        alphas (Sequence[float], optional): Significance levels of the
+            prediction intervals. Defaults to INTERVAL_ALPHAS.
+        simulations (int, optional): Number of paths to simulate for the
+            intervals. Defaults to 0 (Gaussian intervals, from the forecast
+            variances).
+        seed (Optional[int], optional): A seed for the simulations. Defaults
+            to None.
+        horizon (int, optional): Periods to forecast. Defaults to
+            FORECAST_HORIZON.
+        seasonal_order (Sequence[int], optional): Seasonal AR, differencing
+            and MA orders, and the seasonal period. Defaults to NO_SEASON.
+
+    Raises:
+        ValueError: If the method is unknown.
 
     Returns:
-        Tuple[pandas.Series, pandas.Series]: In-sample predictions covering
-        the latter 30% of the data, and a 14-period out-of-sample forecast.
+        ArimaFit: In-sample predictions covering the latter 30% of the data,
+        and the first forecast period, the out-of-sample forecast, the
+        fitted parameters, information criteria, the forecast's prediction
+        intervals and the state after it.
     """
-    arima_model = tsa.arima.ARIMA(data, order=(ar_order, diff, ma_order)).fit()
+    seasonal_order = normalise_seasonal_order(seasonal_order)
+    if method == "css":
+        return css_fit(
+            data, ar_order, diff, ma_order, alphas, horizon, seasonal_order
+        )
+    elif method != "mle":
+        raise ValueError(f"Unknown fitting method: {method!r}")
+
+    model = _arima_model(data, (ar_order, diff, ma_order), seasonal_order)
+    start = None
+    if start_params is not None:
+        start = _start_params(model, start_params)
+
+    if start is not None and not refit and (
+        start_params.index.equals(pd.Index(model.param_names))
+    ):
+        # Parameter covariances take several more filter passes, unused here
+        arima_model = model.filter(start, cov_type="none")
+    else:
+        arima_model = model.fit(start_params=start)
     n = len(data)
-    predictions = arima_model.predict(start=int(0.7 * n), end=n)
-    forecast = arima_model.predict(start=n, end=n + 14)
+    state = forecast_state(arima_model)
+    fourier = [name for name in model.exog_names or () if name != "const"]
+    if fourier:
+        # The Fourier terms vary with time, unlike the filter's intercept
+        params = arima_model.params
+        state = state._replace(
+            obs_intercept=float(params.get("const", 0)),
+            harmonics=params[fourier].to_numpy(),
+            period=seasonal_order[3],
+            position=n,
+        )
+    means, variances, end_state = propagate_forecast(state, horizon)
+    forecast = pd.Series(
+        means,
+        index=_prediction_index(data, horizon)[n:],
+        name="predicted_mean",
+    )
+    predictions = pd.concat(
+        [arima_model.predict(start=int(0.7 * n), end=n - 1), forecast[:1]]
+    )
+    if simulations:
+        errors = simulate_forecast_errors(state, horizon, simulations, seed)
+        intervals = simulated_intervals(forecast, errors, alphas)
+    else:
+        intervals = normal_intervals(forecast, variances, alphas)
+
+    return ArimaFit(
+        predictions,
+        forecast,
+        arima_model.params,
+        arima_model.aic,
+        arima_model.bic,
+        intervals,
+        end_state,
+    )
+
+
+def extend_forecast(fit: ArimaFit, horizon: int) -> ArimaFit:
+    """Lengthen a fit's forecast to `horizon` periods, computing only the
+    extra periods, from the state after the forecast: without refitting the
+    model, or filtering the data, or recomputing the in-sample predictions.
+
+    The extra periods' intervals are Gaussian, at the fit's levels, even if
+    the fit's own were simulated.
+
+    Args:
+        fit (ArimaFit): An exact fit, from `get_arima_fit`.
+        horizon (int): Periods to forecast.
+
+    Raises:
+        ValueError: If the fit has no forecast state, e.g. it's an
+            approximate fit.
+
+    Returns:
+        ArimaFit: The fit, with a forecast of at least `horizon` periods.
+    """
+    extra = horizon - len(fit.forecast)
+    if extra <= 0:
+        return fit
+    if fit.state is None or fit.intervals is None:
+        raise ValueError("The fit's forecast can't be extended.")
+
+    index = fit.forecast.index
+    if isinstance(index, pd.DatetimeIndex) and index.freq is None:
+        # Enough dates to infer the frequency from
+        index = fit.predictions.index[:-1].append(index)
+    means, variances, state = propagate_forecast(fit.state, extra)
+    forecast = pd.Series(
+        means, index=_extend_index(index, extra), name=fit.forecast.name
+    )
+    intervals = normal_intervals(
+        forecast, variances, fit.intervals.columns.unique("alpha")
+    )
+    return fit._replace(
+        forecast=pd.concat([fit.forecast, forecast]),
+        intervals=pd.concat([fit.intervals, intervals]),
+        state=state,
+    )
+
+
+def truncate_forecast(fit: ArimaFit, horizon: int) -> ArimaFit:
+    """Shorten a fit's forecast (and its intervals) to `horizon` periods,
+    e.g. to show a fit cached with a longer forecast. The result has no
+    forecast state, so it can't be extended.
+
+    Args:
+        fit (ArimaFit): The fit.
+        horizon (int): Periods to keep.
+
+    Returns:
+        ArimaFit: The fit, with a forecast of at most `horizon` periods.
+    """
+    if len(fit.forecast) <= horizon:
+        return fit
+    intervals = fit.intervals
+    return fit._replace(
+        forecast=fit.forecast.iloc[:horizon],
+        intervals=None if intervals is None else intervals.iloc[:horizon],
+        state=None,
+    )
+
+
+def fit_arima_model(
+    data: pd.Series,
+    ar_order: int = 1,
+    diff: int = 0,
+    ma_order: int = 1,
+    method: str = "mle",
+    alphas: Sequence[float] = INTERVAL_ALPHAS,
+    simulations: int = 0,
+    horizon: int = FORECAST_HORIZON,
+) -> Tuple[pd.Series, pd.Series, pd.DataFrame]:
+    """Fit an ARIMA model on the data and get predictions, with prediction
+    intervals.
+
+    Args:
+        data (pandas.Series): The data to model, with a DatetimeIndex.
+        ar_order (int, optional): AR order. Defaults to 1.
+        diff (int, optional): Differencing order. Defaults to 0.
+        ma_order (int, optional): MA order. Defaults to 1.
+        method (str, optional): "mle" for the exact fit, or "css" for a
+            fast approximation. Defaults to "mle".
+        alphas (Sequence[float], optional): Significance levels of the
+            prediction intervals. Defaults to INTERVAL_ALPHAS.
+        simulations (int, optional): Number of paths to simulate for the
+            intervals (e.g. 1000 for a fan chart with FAN_ALPHAS). Defaults
+            to 0 (Gaussian intervals).
+        horizon (int, optional): Periods to forecast. Defaults to
+            FORECAST_HORIZON.
+
+    Returns:
+        Tuple[pandas.Series, pandas.Series, pandas.DataFrame]: In-sample
+        predictions covering the latter 30% of the data, the out-of-sample
+        forecast, and its prediction intervals, with columns by ("alpha",
+        "bound").
+    """
+    fit = get_arima_fit(
+        data,
+        ar_order,
+        diff,
+        ma_order,
+        method=method,
+        alphas=alphas,
+        simulations=simulations,
+        horizon=horizon,
+    )
+
+    return fit.predictions, fit.forecast, fit.intervals
+
+
+class BacktestResult(NamedTuple):
+    """Out-of-sample forecast errors of an ARIMA model, from backtesting."""
+
+    folds: pd.DataFrame  # MAE, RMSE and MAPE of each fold, by origin
+    horizons: pd.DataFrame  # MAE, RMSE and MAPE over all folds, by step
+
+
+def backtest_origins(
+    size: int, horizon: int = 14, folds: int = 5, step: Optional[int] = None
+) -> np.ndarray:
+    """Get the forecast origins (positions of the first forecast period) of
+    backtesting folds, spaced `step` periods apart, with the last fold's
+    horizon ending at the end of the data.
+
+    Args:
+        size (int): Number of observations.
+        horizon (int, optional): Periods forecast in each fold. Defaults to
+            14.
+        folds (int, optional): Number of folds. Defaults to 5.
+        step (Optional[int], optional): Periods between origins. Defaults to
+            None (the horizon, so that folds don't overlap).
+
+    Raises:
+        ValueError: If there's too little data before the first origin.
+
+    Returns:
+        numpy.ndarray: The origins, in ascending order.
+    """
+    step = horizon if step is None else step
+    first = size - horizon - step * (folds - 1)
+    if horizon < 1 or folds < 1 or step < 1 or first < 32:
+        raise ValueError(
+            f"{size} observations are too few for {folds} folds of"
+            f" {horizon} periods, {step} periods apart."
+        )
+    return first + step * np.arange(folds)
+
+
+def _error_metrics(
+    errors: np.ndarray, actual: np.ndarray, axis: int
+) -> pd.DataFrame:
+    """Get the mean absolute, root mean squared and mean absolute percentage
+    errors along an axis. Percentage errors ignore actual values of zero.
+    """
+    with np.errstate(divide="ignore", invalid="ignore"):
+        percentages = np.abs(errors / actual) * 100
+    percentages[~np.isfinite(percentages)] = np.nan
+    with warnings.catch_warnings():  # all-zero actual values
+        warnings.simplefilter("ignore", RuntimeWarning)
+        mape = np.nanmean(percentages, axis=axis)
+    return pd.DataFrame(
+        {
+            "mae": np.abs(errors).mean(axis=axis),
+            "rmse": np.sqrt((errors**2).mean(axis=axis)),
+            "mape": mape,
+        }
+    )
+
+
+def _forecast_window(
+    window: pd.Series,
+    order: Tuple[int, int, int],
+    params: np.ndarray,
+    horizon: int,
+) -> np.ndarray:
+    """Forecast from the end of a training window with fixed parameters, as
+    with statsmodels' `results.apply`, e.g. in a worker process.
+    """
+    from statsmodels.tsa.arima.model import ARIMA
+
+    results = ARIMA(window, order=order).filter(params, cov_type="none")
+    return results.forecast(horizon).to_numpy()
+
+
+def backtest(
+    data: pd.Series,
+    ar_order: int = 1,
+    diff: int = 0,
+    ma_order: int = 1,
+    horizon: int = 14,
+    folds: int = 5,
+    step: Optional[int] = None,
+    window: Optional[int] = None,
+    params: Optional[pd.Series] = None,
+    executor: Optional[Executor] = None,
+    timeout: Optional[float] = None,
+) -> BacktestResult:
+    """Evaluate an ARIMA model's out-of-sample forecasts by rolling-origin
+    cross-validation: forecasting `horizon` periods from several origins,
+    using only the data before each origin.
+
+    The model is fitted once, on the data before the first origin, and its
+    parameters are reused in every fold rather than refitted. With an
+    expanding window (the default), a single Kalman filter pass over the
+    data gives the predicted state at every origin, and each fold's
+    forecast is propagated from that state (see `propagate_forecast`),
+    without filtering again. With a fixed-size window, the filter is re-run
+    over each fold's window, optionally in parallel.
+    Parameter covariances, which take several more filter passes, aren't
+    computed.
+
+    Args:
+        data (pandas.Series): The data to model, with a DatetimeIndex.
+        ar_order (int, optional): AR order. Defaults to 1.
+        diff (int, optional): Differencing order. Defaults to 0.
+        ma_order (int, optional): MA order. Defaults to 1.
+        horizon (int, optional): Periods forecast in each fold. Defaults to
+            14.
+        folds (int, optional): Number of folds. Defaults to 5.
+        step (Optional[int], optional): Periods between origins. Defaults to
+            None (the horizon).
+        window (Optional[int], optional): Observations to train on in each
+            fold. Defaults to None (all observations before the origin).
+        params (Optional[pandas.Series], optional): Fitted parameters to use,
+            e.g. from a cached fit on the data before the first origin.
+            Defaults to None (fit the model on that data).
+        executor (Optional[Executor], optional): A process pool in which to
+            run fixed-size windows' folds. Defaults to None (in this
+            process).
+        timeout (Optional[float], optional): Seconds to wait for the folds
+            run in `executor`. Defaults to None (no limit).
+
+    Raises:
+        ValueError: If there's too little data for the folds.
+        concurrent.futures.TimeoutError: If the folds run in `executor`
+            take longer than `timeout`.
+
+    Returns:
+        BacktestResult: Error metrics by fold, and by steps ahead.
+    """
+    from statsmodels.tsa.arima.model import ARIMA
+
+    order = (ar_order, diff, ma_order)
+    origins = backtest_origins(len(data), horizon, folds, step)
+    if params is None:
+        model = ARIMA(data.iloc[:origins[0]], order=order)
+        params = model.fit().params
+
+    if window is None:
+        model = ARIMA(data, order=order)
+        results = model.filter(params.to_numpy(), cov_type="none")
+        forecasts = [
+            propagate_forecast(forecast_state(results, origin), horizon)[0]
+            for origin in origins
+        ]
+    else:
+        windows = [
+            data.iloc[max(origin - window, 0):origin] for origin in origins
+        ]
+        args = (
+            _forecast_window,
+            windows,
+            repeat(order),
+            repeat(params.to_numpy()),
+            repeat(horizon),
+        )
+        if executor is None:
+            forecasts = map(*args)
+        else:
+            forecasts = executor.map(*args, timeout=timeout)
+
+    values = data.to_numpy(dtype="float64")
+    actual = np.stack([values[origin:origin + horizon] for origin in origins])
+    errors = actual - np.stack(list(forecasts))
+
+    by_fold = _error_metrics(errors, actual, axis=1)
+    by_fold.index = data.index[origins].rename("origin")
+    by_step = _error_metrics(errors, actual, axis=0)
+    by_step.index = pd.RangeIndex(1, horizon + 1, name="steps ahead")
+    return BacktestResult(by_fold, by_step)
+
+
+# Stationarity tests use at most this many of the latest observations
+STATIONARITY_SAMPLE = 5000
+
+
+class Diagnostics(NamedTuple):
+    """Autocorrelation and stationarity diagnostics of a series, after each
+    differencing order.
+    """
+
+    acf: pd.DataFrame  # by lag (from 0), with a column per differencing order
+    pacf: pd.DataFrame
+    tests: pd.DataFrame  # "adf" and "kpss" p-values, and "size", by order
+
+
+def _stationarity_pvalues(values: np.ndarray) -> Tuple[float, float]:
+    """Get the p-values of the Augmented Dickey-Fuller test (whose null
+    hypothesis is a unit root) and the KPSS test (whose null hypothesis is
+    stationarity), on the latest STATIONARITY_SAMPLE values.
+
+    Both tests choose a lag length, the ADF test by fitting a regression per
+    candidate length, and have more candidates for longer series, so their
+    cost grows faster than the number of values.
+    """
+    from statsmodels.tsa.stattools import adfuller, kpss
+
+    values = values[-STATIONARITY_SAMPLE:]
+    with warnings.catch_warnings():  # p-values outside look-up tables
+        warnings.simplefilter("ignore")
+        adf_pvalue = adfuller(values, autolag="AIC")[1]
+        kpss_pvalue = kpss(values, nlags="auto")[1]
+    return adf_pvalue, kpss_pvalue
+
+
+def autocorrelation(values: np.ndarray, nlags: int) -> np.ndarray:
+    """Get the sample autocorrelation function, as statsmodels' `acf`
+    computes it (from the biased autocovariance).
+
+    Each lag's autocovariance is a dot product of the demeaned values with
+    themselves, shifted. That takes O(n * nlags) time, without the O(n^2)
+    correlation of every lag that statsmodels does without an FFT, and for
+    the few dozen lags plotted, it's several times faster than an FFT.
+
+    Args:
+        values (numpy.ndarray): The data.
+        nlags (int): The number of lags.
+
+    Returns:
+        numpy.ndarray: The autocorrelations at lags 0 to `nlags`.
+    """
+    demeaned = values - values.mean()
+    size = len(demeaned)
+    covariances = np.array(
+        [demeaned[:size - lag] @ demeaned[lag:] for lag in range(nlags + 1)]
+    )
+    return covariances / covariances[0]
+
+
+def diagnose(
+    data: pd.Series, max_diff: int = 5, nlags: int = 40
+) -> Diagnostics:
+    """Compute the autocorrelation function (ACF), partial autocorrelation
+    function (PACF), and ADF and KPSS stationarity tests of the data after
+    each differencing order.
+
+    The PACF is derived from the ACF by the Durbin-Levinson recursion,
+    rather than by a regression per lag.
+
+    Args:
+        data (pandas.Series): The data to diagnose.
+        max_diff (int, optional): Highest differencing order. Defaults to 5.
+        nlags (int, optional): Number of lags of the ACF and PACF. Defaults
+            to 40.
+
+    Returns:
+        Diagnostics: The correlations and test results. Orders that leave
+        fewer than 10 values, or constant values, are left out.
+    """
+    from statsmodels.tsa.stattools import levinson_durbin
+
+    values = np.asarray(data, dtype="float64")
+    acfs, pacfs, tests = {}, {}, {}
+    for diff in range(max_diff + 1):
+        differenced = np.diff(values, n=diff)
+        if len(differenced) < 10 or np.ptp(differenced) == 0:
+            break
+        lags = min(nlags, len(differenced) // 2 - 1)
+        correlations = autocorrelation(differenced, lags)
+        acfs[diff] = pd.Series(correlations)
+        pacfs[diff] = pd.Series(
+            levinson_durbin(correlations, nlags=lags, isacov=True)[2]
+        )
+        tests[diff] = (*_stationarity_pvalues(differenced), len(differenced))
+
+    acf_frame, pacf_frame = (
+        pd.DataFrame(frame).rename_axis(index="lag", columns="diff")
+        for frame in (acfs, pacfs)
+    )
+    test_frame = pd.DataFrame.from_dict(
+        tests, orient="index", columns=["adf", "kpss", "size"]
+    ).rename_axis("diff")
+    return Diagnostics(acf_frame, pacf_frame, test_frame)
+
+
+def significance_bound(size: int, alpha: float = 0.05) -> float:
+    """Get the bound within which a white-noise series' sample
+    autocorrelations fall with probability 1 - `alpha`.
+
+    Args:
+        size (int): The number of observations.
+        alpha (float, optional): Significance level. Defaults to 0.05.
+
+    Returns:
+        float: The bound.
+    """
+    return NormalDist().inv_cdf(1 - alpha / 2) / np.sqrt(size)
+
+
+def detect_period(
+    values: np.ndarray, alpha: float = 1e-3, harmonics: int = 3
+) -> Optional[int]:
+    """Detect the dominant seasonal period of a series from its periodogram,
+    in O(n log n) time: one FFT of the latest PERIOD_SAMPLE values, after
+    removing a linear trend.
+
+    A frequency is significant if its power exceeds the local background
+    (a running median of the periodogram, robust to the peaks themselves
+    and to the red spectrum of trending data) by more than white noise
+    would at any of the frequencies, with probability `alpha`. Of those
+    with at least 3 cycles in the data, the one with the most power
+    (relative to the background) at its first few harmonics is chosen, so
+    that a pattern's fundamental period is preferred to its harmonics (e.g.
+    24 hours, rather than 12). The
+    periodogram only resolves periods of n / k values, so the integer
+    period is then refined by the power of the harmonics at every period
+    near n / k, and kept if the series is positively autocorrelated at it.
+
+    Args:
+        values (numpy.ndarray): The data.
+        alpha (float, optional): Significance level. Defaults to 1e-3.
+        harmonics (int, optional): Harmonics by which to rank and refine
+            periods. Defaults to 3.
+
+    Returns:
+        Optional[int]: The period, or None if none is significant.
+    """
+    values = np.asarray(values, dtype="float64")[-PERIOD_SAMPLE:]
+    size = len(values)
+    if size < 8 or not np.isfinite(values).all():
+        return None
+    positions = np.arange(size)
+    trend = np.polyfit(positions, values, 1)
+    detrended = values - np.polyval(trend, positions)
+    # Power at k cycles per `size` values, for k from 1 to below Nyquist
+    power = np.abs(np.fft.rfft(detrended)[1:(size + 1) // 2]) ** 2
+    if len(power) < 3:
+        return None
+
+    # Medians of windows spaced a few bins apart, interpolated between,
+    # are a running median at a fraction of the cost
+    half = max(10, len(power) // 200)
+    step = max(1, half // 4)
+    windows = np.lib.stride_tricks.sliding_window_view(
+        np.pad(power, half, mode="reflect"), 2 * half + 1
+    )[::step]
+    background = np.interp(
+        np.arange(len(power)),
+        np.arange(len(windows)) * step,
+        np.median(windows, axis=1),
+    )
+    # The periodogram of white noise is exponentially distributed about
+    # its mean, so its ratio to the median (ln 2 times the mean) exceeds
+    # x with probability 2^-x
+    background = np.maximum(background, np.finfo(float).tiny)
+    ratio = power / background
+    cycles = np.arange(1, len(power) + 1)
+    significant = cycles[
+        (ratio > np.log2(len(power) / alpha)) & (cycles >= 3)
+    ]
+    if not len(significant):
+        return None
+
+    # A harmonic's bin is only known to within half a bin per multiple of
+    # the fundamental, so each is scored by the largest ratio near it
+    scores = np.zeros(len(significant))
+    for multiple in range(1, harmonics + 1):
+        nearest = np.lib.stride_tricks.sliding_window_view(
+            np.pad(ratio, multiple), 2 * multiple + 1
+        ).max(axis=1)
+        bins = significant * multiple
+        in_range = bins <= len(power)
+        scores[in_range] += nearest[bins[in_range] - 1]
+    best = significant[np.argmax(scores)]
+
+    def period_score(period: int) -> float:
+        # The power at a period's harmonics is that of the series folded
+        # onto one period (summing the values at each phase), so it takes a
+        # pass over the data and a short DFT per period
+        folded = np.bincount(positions % period, weights=detrended)
+        multiples = np.arange(1, harmonics + 1)
+        multiples = multiples[multiples * size / period <= len(power)]
+        waves = np.exp(
+            -2j * np.pi * np.outer(multiples, np.arange(period)) / period
+        )
+        noise = np.interp(
+            multiples * size / period - 1, cycles - 1, background
+        )
+        return float(np.sum(np.abs(waves @ folded) ** 2 / noise))
+
+    lowest = max(int(size / (best + 0.5)), 2)
+    highest = min(int(np.ceil(size / (best - 0.5))), size // 3)
+    periods = np.unique(
+        np.linspace(lowest, highest, min(highest - lowest + 1, 64)).astype(int)
+    )
+    period = int(max(periods, key=period_score))
+
+    correlation = detrended[:-period] @ detrended[period:] / (
+        detrended @ detrended
+    )
+    return period if correlation > 2 / np.sqrt(size) else None
+
+
+def decomposition_periods(
+    data: pd.Series, method: str = "stl", period: int = 0
+) -> Tuple[int, ...]:
+    """Get the seasonal periods to decompose a series by: the detected
+    period, or if there's none, the default for the data's frequency (e.g. 7
+    for daily data). MSTL also uses the calendar's periods for the frequency
+    (e.g. 24 and 168 for hourly data). Periods without two full cycles in
+    the data are left out.
+
+    Args:
+        data (pandas.Series): The data, with a DatetimeIndex.
+        method (str, optional): "stl" or "mstl". Defaults to "stl".
+        period (int, optional): The detected period, or 0 if there's none.
+            Defaults to 0.
+
+    Raises:
+        ValueError: If there's no period to decompose the series by.
+
+    Returns:
+        Tuple[int, ...]: The periods, in ascending order.
+    """
+    from statsmodels.tsa.tsatools import freq_to_period
+
+    freq = getattr(data.index, "freq", None)
+    periods = {period} if period else set()
+    if not periods and freq is not None:
+        periods.add(freq_to_period(freq))
+    if method == "mstl" and freq is not None and freq.n == 1:
+        # e.g. "MS", "QE-DEC" and "W-SUN" are months, quarters and weeks
+        base = freq.rule_code.split("-")[0]
+        base = base[:-1] if base[-1:] in ("S", "E") else base
+        periods.update(CALENDAR_PERIODS.get(base, ()))
+    periods = tuple(sorted(p for p in periods if 2 <= p <= len(data) // 2))
+    if not periods:
+        raise ValueError("The data has no seasonal period to decompose by.")
+    return periods
+
+
+def _seasonal_profile(values: np.ndarray, period: int) -> np.ndarray:
+    """Get the mean deviation from a centred moving average of one period
+    (2 x period, if it's even) at each phase, as in a classical
+    decomposition, adjusted to sum to 0. The moving average is computed
+    from cumulative sums, in O(n) time for any period.
+    """
+    sums = np.concatenate(([0.0], np.cumsum(values)))
+    means = (sums[period:] - sums[:-period]) / period
+    if period % 2 == 0:
+        means = (means[:-1] + means[1:]) / 2
+    offset = period // 2
+    deviations = values[offset:offset + len(means)] - means
+    phases = (np.arange(len(means)) + offset) % period
+    profile = np.bincount(
+        phases, weights=deviations, minlength=period
+    ) / np.bincount(phases, minlength=period)
+    return profile - profile.mean()
+
+
+def _decomposition_block(size: int, periods: Sequence[int]) -> int:
+    """Get the number of values per block that keeps a series to at most
+    DECOMPOSITION_POINTS blocks: the least that divides the longest period
+    it resolves (into at least MIN_CYCLE_BLOCKS blocks), so that its cycles
+    line up with blocks, if any.
+    """
+    least = -(-size // DECOMPOSITION_POINTS)
+    if least == 1:
+        return 1
+    for period in sorted(periods, reverse=True):
+        for block in range(least, period // MIN_CYCLE_BLOCKS + 1):
+            if period % block == 0:
+                return block
+    return least
+
+
+def decompose(data: pd.Series, periods: Sequence[int]) -> pd.DataFrame:
+    """Decompose a series into trend, seasonal and residual components by
+    STL (robust to outliers) for one seasonal period, or MSTL for several.
+
+    STL's cost grows with the series' length and its periods, so series
+    longer than DECOMPOSITION_POINTS are decomposed at a coarser
+    resolution, with their values averaged over blocks (see
+    `_decomposition_block`). Periods spanning fewer than MIN_CYCLE_BLOCKS
+    blocks are removed first, as fixed profiles (see `_seasonal_profile`).
+    The trend and other seasonal components of the averaged series are
+    interpolated back onto every value, and the detail within blocks is
+    restored to each seasonal component as a fixed profile of what's left.
+    The residuals are the rest.
+
+    Args:
+        data (pandas.Series): The data to decompose.
+        periods (Sequence[int]): The seasonal periods (see
+            `decomposition_periods`).
+
+    Returns:
+        pandas.DataFrame: The "trend", "seasonal" and "resid" components,
+        and with several periods, the "seasonal_{period}" component of each.
+    """
+    from statsmodels.tsa.seasonal import MSTL, STL
+
+    values = data.to_numpy(dtype="float64")
+    size = len(values)
+    periods = sorted(set(periods))
+    block = _decomposition_block(size, periods)
+
+    seasonal = {}
+    remainder = values.copy()
+    for period in periods:
+        if block > 1 and (period % block or period < block * MIN_CYCLE_BLOCKS):
+            seasonal[period] = np.resize(
+                _seasonal_profile(remainder, period), size
+            )
+            remainder -= seasonal[period]
+    resolved = [period for period in periods if period not in seasonal]
+
+    positions = np.arange(size)
+    blocks = positions // block
+    counts = np.bincount(blocks)
+    view = np.bincount(blocks, weights=remainder) / counts
+    if len(resolved) == 1:
+        result = STL(view, period=resolved[0] // block, robust=True).fit()
+    elif resolved:
+        result = MSTL(view, periods=[p // block for p in resolved]).fit()
+    if resolved:
+        trend = result.trend
+        views = list(np.reshape(result.seasonal, (len(view), -1)).T)
+    else:
+        trend, views = view, []
+    if block > 1:
+        # Interpolate between the blocks' middle positions
+        middles = np.bincount(blocks, weights=positions) / counts
+        trend = np.interp(positions, middles, trend)
+        views = [np.interp(positions, middles, column) for column in views]
+    seasonal.update(zip(resolved, views))
+    if block > 1:
+        # Restore the detail within blocks, lost by averaging over them
+        remainder -= trend + np.sum(views, axis=0)
+        for period in resolved:
+            detail = np.resize(_seasonal_profile(remainder, period), size)
+            seasonal[period] = seasonal[period] + detail
+            remainder -= detail
+
+    total = np.sum([seasonal[period] for period in periods], axis=0)
+    components = pd.DataFrame(
+        {"trend": trend, "seasonal": total, "resid": values - trend - total},
+        index=data.index,
+    )
+    if len(periods) > 1:
+        for period in periods:
+            components[f"seasonal_{period}"] = seasonal[period]
+    return components
+
+
+def _cut_off(
+    correlations: pd.Series, bound: float, max_order: int
+) -> Optional[int]:
+    """Get the last lag before the first correlation within +/-bound, or
+    None if the correlations tail off beyond `max_order` lags instead.
+    """
+    within = np.abs(correlations.iloc[1:max_order + 2].to_numpy()) < bound
+    return int(np.argmax(within)) if within.any() else None
+
+
+def suggest_order(
+    diagnostics: Diagnostics, alpha: float = 0.05, max_order: int = 5
+) -> Optional[Tuple[int, int, int]]:
+    """Suggest a model order from diagnostics, following the Box-Jenkins
+    method.
+
+    The differencing order is the lowest at which the ADF test rejects a
+    unit root, and the KPSS test doesn't reject stationarity. Then, if the
+    PACF cuts off after lag p while the ACF tails off, an AR(p) model is
+    suggested; if the ACF cuts off after lag q while the PACF tails off, an
+    MA(q) model. If both cut off, both orders are used, and if both tail
+    off, an ARMA(1, 1) model is suggested to start with.
+
+    Args:
+        diagnostics (Diagnostics): The data's diagnostics.
+        alpha (float, optional): Significance level. Defaults to 0.05.
+        max_order (int, optional): Highest AR and MA order. Defaults to 5.
+
+    Returns:
+        Optional[Tuple[int, int, int]]: The AR, differencing and MA orders,
+        or None if no differencing order passes both tests.
+    """
+    tests = diagnostics.tests
+    stationary = tests.index[(tests["adf"] < alpha) & (tests["kpss"] >= alpha)]
+    if stationary.empty:
+        return None
+    diff = int(stationary[0])
+    bound = significance_bound(tests.at[diff, "size"], alpha)
+    ar_order = _cut_off(diagnostics.pacf[diff].dropna(), bound, max_order)
+    ma_order = _cut_off(diagnostics.acf[diff].dropna(), bound, max_order)
+
+    if ar_order is None and ma_order is None:
+        return 1, diff, 1
+    return ar_order or 0, diff, ma_order or 0
+
+
+class OrderSearchResult(NamedTuple):
+    """A candidate model evaluated during an ARIMA order search."""
+
+    order: Tuple[int, int, int]
+    aic: float
+    bic: float
+    fit: ArimaFit
+
+
+def suggest_diff_orders(
+    data: pd.Series, max_diff: int = 5, alpha: float = 0.05
+) -> List[int]:
+    """Suggest differencing orders using stationarity tests.
+
+    The lowest order at which the Augmented Dickey-Fuller test rejects a unit
+    root, and the KPSS test doesn't reject stationarity, is suggested along
+    with the next one (in case the tests are inconclusive).
+
+    Args:
+        data (pandas.Series): The data to test.
+        max_diff (int, optional): Highest differencing order to consider.
+            Defaults to 5.
+        alpha (float, optional): Significance level. Defaults to 0.05.
+
+    Returns:
+        List[int]: Suggested differencing orders.
+    """
+    values = np.asarray(data, dtype="float64")
+
+    for diff in range(max_diff + 1):
+        differenced = np.diff(values, n=diff)
+        if len(differenced) < 10 or np.ptp(differenced) == 0:
+            break
+        adf_pvalue, kpss_pvalue = _stationarity_pvalues(differenced)
+        if adf_pvalue < alpha and kpss_pvalue >= alpha:
+            return list(range(diff, min(diff + 1, max_diff) + 1))
+    return list(range(min(2, max_diff) + 1))  # tests were inconclusive
+
+
+def _fit_shared_series(
+    values_name: str, index_name: str, size: int, order: Tuple[int, int, int]
+) -> ArimaFit:
+    """Fit an ARIMA model on a series held in shared memory, in a worker
+    process.
+
+    Args:
+        values_name (str): Name of the shared memory block with the values.
+        index_name (str): Name of the shared memory block with the dates (as
+            int64 nanoseconds).
+        size (int): Number of observations.
+        order (Tuple[int, int, int]): The ARIMA order.
+
+    Returns:
+        ArimaFit: The fitted model's outputs.
+    """
+    blocks = [SharedMemory(name=values_name), SharedMemory(name=index_name)]
+    try:
+        values = np.ndarray((size,), dtype="float64", buffer=blocks[0].buf)
+        dates = np.ndarray((size,), dtype="int64", buffer=blocks[1].buf)
+        index = pd.DatetimeIndex(dates.copy())
+        data = pd.Series(values.copy(), index=index)
+    finally:
+        for block in blocks:
+            block.close()
+    return get_arima_fit(data, *order)
+
+
+def _release_when_done(
+    futures: Sequence[Future], blocks: Sequence[SharedMemory]
+) -> None:
+    """Close and unlink shared memory blocks once the futures of the fits
+    reading them are done, without waiting for them: fits that are already
+    running can't be cancelled.
+    """
+    remaining = [len(futures)]
+    lock = threading.Lock()
+
+    def release() -> None:
+        for block in blocks:
+            block.close()
+            block.unlink()
+
+    def count_done(_: Future) -> None:
+        with lock:
+            remaining[0] -= 1
+            last = remaining[0] == 0
+        if last:
+            release()
+
+    if not futures:
+        release()
+    for future in futures:
+        future.add_done_callback(count_done)
+
+
+def search_arima_orders(
+    data: pd.Series,
+    max_ar: int = 5,
+    max_diff: int = 5,
+    max_ma: int = 5,
+    criterion: str = "aic",
+    patience: int = 12,
+    executor: Optional[Executor] = None,
+    timeout: Optional[float] = None,
+) -> Iterator[OrderSearchResult]:
+    """Fit candidate ARIMA models in parallel, yielding each one as soon as
+    it's fitted.
+
+    Differencing orders are pruned using stationarity tests, and simpler
+    models are fitted first. The search stops early once `patience`
+    consecutive fits fail to improve on the best `criterion` value, or when
+    its fits are cancelled. The data is shared with worker processes through
+    shared memory, rather than being pickled for each candidate, and is
+    released once the last fit using it finishes, without making the caller
+    wait for fits that are still running when the search stops.
+
+    Args:
+        data (pandas.Series): The data to model, with a DatetimeIndex.
+        max_ar (int, optional): Highest AR order. Defaults to 5.
+        max_diff (int, optional): Highest differencing order. Defaults to 5.
+        max_ma (int, optional): Highest MA order. Defaults to 5.
+        criterion (str, optional): "aic" or "bic". Defaults to "aic".
+        patience (int, optional): Fits without improvement before stopping.
+            Defaults to 12.
+        executor (Optional[Executor], optional): A process pool to use.
+            Defaults to None (a temporary pool).
+        timeout (Optional[float], optional): Seconds to wait for the next
+            fit to finish. Defaults to None (no limit).
+
+    Raises:
+        TimeoutError: If no fit finishes within `timeout` seconds.
+
+    Yields:
+        OrderSearchResult: Each fitted candidate, in order of completion.
+    """
+    candidates = sorted(
+        (
+            (ar, diff, ma)
+            for diff in suggest_diff_orders(data, max_diff)
+            for ar, ma in product(range(max_ar + 1), range(max_ma + 1))
+        ),
+        key=lambda order: (order[0] + order[2], order),
+    )
+    own_executor = executor is None
+    if own_executor:
+        executor = ProcessPoolExecutor(mp_context=get_context("spawn"))
+    max_pending = 2 * (os.cpu_count() or 1)  # keep every worker busy
+
+    size = len(data)
+    arrays = [
+        np.asarray(data, dtype="float64"),
+        np.asarray(pd.DatetimeIndex(data.index).asi8, dtype="int64"),
+    ]
+    blocks = [SharedMemory(create=True, size=max(a.nbytes, 1)) for a in arrays]
+    for array, block in zip(arrays, blocks):
+        np.ndarray(array.shape, array.dtype, buffer=block.buf)[:] = array
+
+    pending = {}
+    best, stale = np.inf, 0
+    try:
+        while candidates or pending:
+            while candidates and len(pending) < max_pending and (
+                stale < patience
+            ):
+                order = candidates.pop(0)
+                future = executor.submit(
+                    _fit_shared_series,
+                    blocks[0].name,
+                    blocks[1].name,
+                    size,
+                    order,
+                )
+                pending[future] = order
+            if not pending:
+                break
 
-    return predictions, forecast
+            done, _ = wait(
+                pending, timeout=timeout, return_when=FIRST_COMPLETED
+            )
+            if not done:
+                raise TimeoutError(
+                    f"No model was fitted within {timeout} seconds."
+                )
+            for future in done:
+                order = pending.pop(future)
+                try:
+                    fit = future.result()
+                except CancelledError:
+                    return
+                except Exception:  # e.g. numerical errors with some orders
+                    stale += 1
+                    continue
+                score = getattr(fit, criterion)
+                if score < best:
+                    best, stale = score, 0
+                else:
+                    stale += 1
+                yield OrderSearchResult(order, fit.aic, fit.bic, fit)
+    finally:
+        for future in pending:
+            future.cancel()
+        _release_when_done(list(pending), blocks)
+        if own_executor:
+            executor.shutdown(wait=False, cancel_futures=True)